@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from planning.compaction import MISSION_MODES, MODE_PASSES, MAX_TRIGGER_DURATION_S, TRIGGER_DURATION_PARAM
+from planning.kinematics import (
+    OBJECTIVE_TIME, OBJECTIVES, DEFAULT_TURN_RATE_DEG_S, DEFAULT_CLIMB_RATE_M_S, DEFAULT_DESCENT_RATE_M_S, FlightLimits,
+)
+from planning.mission import DEFAULT_SERVO_CHANNEL, DEFAULT_PWM_HIGH, DEFAULT_PWM_LOW
+from planning.pipeline import MissionPlanner
+from planning.sweep import ROUTE_GREEDY, ROUTE_MODES
+from state_format import load_state
+
+# Headless mission generation: no Qt / QtWebEngine imports anywhere in this module or its imports.
+#
+#   python batch_missions.py state1.txt state2.txt ... -o missions_batch -j 8
+
+logger = logging.getLogger(__name__)
+
+
+def process_file(path, output_dir, servo_channel=DEFAULT_SERVO_CHANNEL, pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW,
+                 mission_mode=MODE_PASSES, route_mode=ROUTE_GREEDY, compare=False, objective=OBJECTIVE_TIME,
+                 flight_limits=None, tank_l=None, max_flight_s=None):
+    """Worker entry point: all missions of one planner state file."""
+    start = time.perf_counter()
+    prefix = os.path.splitext(os.path.basename(path))[0]
+    planner = MissionPlanner.from_state(
+        load_state(path), servo_channel=servo_channel, pwm_high=pwm_high, pwm_low=pwm_low,
+        mission_mode=mission_mode, route_mode=route_mode, objective=objective, flight_limits=flight_limits,
+        tank_l=tank_l, max_flight_s=max_flight_s, compare=compare,
+    )
+    missions = planner.write_missions(
+        output_dir, prefix,
+        on_error=lambda color, e: logger.warning("%s: skipping %s: %s", prefix, color, e),
+    )
+    summary = {"input": path, "missions": missions, "seconds": time.perf_counter() - start}
+    if compare:
+        # Greedy against grid sweep for every colour that was written (planned once, with the missions)
+        summary["route_comparison"] = {
+            mission["color"]: mission["route_comparison"] for mission in missions if "route_comparison" in mission
+        }
+    return summary
+
+
+def run_batch(paths, output_dir, jobs=None, **mission_options):
+    """Process planner state files in parallel across CPU cores. Returns the per-file summaries."""
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(process_file, path, output_dir, **mission_options): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"input": path, "error": str(e), "missions": []}
+                print(f"{path}: failed: {e}")
+            else:
+                written = [mission for mission in summary["missions"] if "file" in mission]
+                files = sum(len(mission["files"]) for mission in written)
+                items = sum(mission["items"] for mission in written)
+                upload_s = sum(mission["upload_s"] for mission in written)
+                flight_min = sum(mission["flight_time_s"] for mission in written) / 60
+                print(f"{path}: {files} mission(s), {items} items (upload ~{upload_s:.0f} s), "
+                      f"~{flight_min:.1f} min aloft, in {summary['seconds']:.2f} s")
+                for mission in written:
+                    if mission.get("trigger_duration_s"):
+                        print(f"  {mission['color']}: set {TRIGGER_DURATION_PARAM} to "
+                              f"{mission['trigger_duration_s']:.2f} s")
+                    if "sorties" in mission:
+                        print(f"  {mission['color']}: {len(mission['sorties'])} sorties, "
+                              + ", ".join(f"{sortie['liquid_l']:.1f} L / {sortie['flight_time_s'] / 60:.1f} min"
+                                          for sortie in mission["sorties"]))
+                for color, comparison in summary.get("route_comparison", {}).items():
+                    print(f"  {color}: greedy {comparison['greedy_m']:.1f} m / {comparison['greedy_turns']} turns, "
+                          f"sweep {comparison['sweep_m']:.1f} m / {comparison['sweep_turns']} turns "
+                          f"({comparison['saving_pct']:+.1f} %)"
+                          + (f", flight {comparison['greedy_flight_s']:.0f} s / {comparison['sweep_flight_s']:.0f} s"
+                             if "sweep_flight_s" in comparison else "")
+                          + f", flown: {comparison['route']}")
+            summaries.append(summary)
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate .waypoints missions for every colour of saved planner states.")
+    parser.add_argument("inputs", nargs="+", help="planner state files written by 'Save File' (.ppstate or JSON .txt)")
+    parser.add_argument("-o", "--output", default="missions_batch", help="output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--servo-channel", type=int, default=DEFAULT_SERVO_CHANNEL)
+    parser.add_argument("--pwm-high", type=int, default=DEFAULT_PWM_HIGH)
+    parser.add_argument("--pwm-low", type=int, default=DEFAULT_PWM_LOW)
+    parser.add_argument("--mission-mode", choices=MISSION_MODES, default=MODE_PASSES,
+                        help="passes: six items per pass; merged: collinear passes merged into one run; "
+                             "triggered: merged, evenly spaced runs sprayed by distance trigger (the sprayer "
+                             f"wired as camera trigger, {TRIGGER_DURATION_PARAM} set to the parcel flight time "
+                             f"printed per colour; refused above {MAX_TRIGGER_DURATION_S:g} s or when it differs "
+                             "within a mission)")
+    parser.add_argument("--route-mode", choices=ROUTE_MODES, default=ROUTE_GREEDY,
+                        help="greedy: nearest neighbour + local search; sweep: fixed serpentine over the parcel "
+                             "columns / rows, fast and deterministic but not shorter than greedy (ties on regular "
+                             "layouts, longer with mixed colours; see --compare-routes)")
+    parser.add_argument("--compare-routes", action="store_true",
+                        help="also plan every colour with both route planners and report the difference; "
+                             "with --route-mode sweep the greedy route is flown where the sweep is worse")
+    parser.add_argument("--objective", choices=OBJECTIVES, default=OBJECTIVE_TIME,
+                        help="optimize routes for estimated flight time (default) or path length")
+    parser.add_argument("--turn-rate", type=float, default=DEFAULT_TURN_RATE_DEG_S, help="yaw rate in deg/s")
+    parser.add_argument("--climb-rate", type=float, default=DEFAULT_CLIMB_RATE_M_S, help="m/s")
+    parser.add_argument("--descent-rate", type=float, default=DEFAULT_DESCENT_RATE_M_S, help="m/s")
+    parser.add_argument("--power", type=float, default=None, help="average power in W, to report battery energy")
+    parser.add_argument("--tank-l", type=float, default=None,
+                        help="tank capacity in L; larger colours are split into sorties (one file each)")
+    parser.add_argument("--max-flight-min", type=float, default=None,
+                        help="flight time limit of one sortie in minutes, takeoff to landing")
+    parser.add_argument("--summary", help="write a JSON summary of all runs to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    summaries = run_batch(
+        args.inputs,
+        args.output,
+        jobs=args.jobs,
+        servo_channel=args.servo_channel,
+        pwm_high=args.pwm_high,
+        pwm_low=args.pwm_low,
+        mission_mode=args.mission_mode,
+        route_mode=args.route_mode,
+        compare=args.compare_routes,
+        objective=args.objective,
+        flight_limits=FlightLimits(
+            args.turn_rate, args.climb_rate, args.descent_rate, args.power
+        ),
+        tank_l=args.tank_l,
+        max_flight_s=args.max_flight_min * 60 if args.max_flight_min else None,
+    )
+    if args.summary:
+        with open(args.summary, "w") as summary_file:
+            json.dump(summaries, summary_file, indent=4)
+
+    return 1 if any("error" in summary for summary in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Benchmarks for grid generation, path planning and export.
+
+    python benchmarks/run_benchmarks.py                       # all layouts, JSON to benchmarks/results/
+    python benchmarks/run_benchmarks.py --quick               # 6x5 and 20x10 only
+    python benchmarks/run_benchmarks.py --compare old.json    # print the ratio against an earlier run
+
+Every case runs on a synthetic field (fixed corners, fixed random seed) so results are comparable
+between commits. Timings are wall-clock seconds over several repeats (min / median / mean); peak
+memory is measured in a separate run under tracemalloc.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# The benchmarks import the application modules from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from parcel_gen import ParcelGenerator
+from distance_matrix import DistanceMatrixService
+from planning.common import BUTTON_COLORS
+from planning.passes import generate_passes, parcels_of_color, parcel_ids_by_color, pass_grid_indices, passes_per_parcel
+from planning.route import plan_route
+from planning.sweep import plan_sweep
+from planning.kinematics import FlightTimeModel
+from planning.mission import mission_lines, MissionWriter
+from planning.compaction import MODE_TRIGGERED, MissionReducer
+from planning.report import report_lines
+from planning.sorties import split_route
+
+LAYOUTS = [(6, 5), (20, 10), (50, 25), (100, 50), (200, 100)]
+QUICK_LAYOUTS = [(6, 5), (20, 10)]
+DISTRIBUTIONS = ["single", "columns", "random"]
+
+# Synthetic field geometry: parcels of 10 x 20 m with 1 m gaps, two passes of 5 m per parcel
+PARCEL_WIDTH = 10.0
+PARCEL_HEIGHT = 20.0
+GAP = 1.0
+SPRAYING_WIDTH = 5.0
+ACC_BUFFER = 2.0
+ALTITUDE = 3.0
+GROUND_SPEED = 1.5
+TRIGGER_GROUND_SPEED = 5.0
+# Sortie limits of mission.sorties: liquid per pass and tank, flight time per sortie, flown fast
+# enough to reach the far corner of the largest layout and back within one sortie
+LIQUID_PER_PASS_L = 0.5
+TANK_L = 10.0
+MAX_FLIGHT_S = 1800.0
+SORTIE_GROUND_SPEED = 5.0
+ORIGIN = (37.325, -6.02884)
+
+# Seed of the "random" colour distribution
+SEED = 1234
+
+DEFAULT_REPEAT = 5
+# Stop repeating a case once it has used this many seconds
+MAX_CASE_SECONDS = 20.0
+
+
+def field_corners(count_x, count_y, bearing_deg=20.0):
+    """[top-left, top-right, bottom-right, bottom-left] of a rotated field that fits the grid exactly."""
+    width = count_x * (PARCEL_WIDTH + GAP) - GAP
+    height = count_y * (PARCEL_HEIGHT + GAP) - GAP
+    theta = np.radians(bearing_deg)
+    axis_x = np.array([np.cos(theta), -np.sin(theta)])  # east/north of the top edge
+    axis_y = np.array([-np.sin(theta), -np.cos(theta)])  # down the left edge
+    local = [np.zeros(2), axis_x * width, axis_x * width + axis_y * height, axis_y * height]
+
+    lat0, lon0 = ORIGIN
+    meters_per_deg_lat = 111320.0
+    meters_per_deg_lon = 111320.0 * np.cos(np.radians(lat0))
+    return [[lat0 + north / meters_per_deg_lat, lon0 + east / meters_per_deg_lon] for east, north in local]
+
+
+def color_codes(count_x, count_y, distribution):
+    """Row-major parcel colours for a distribution."""
+    total = count_x * count_y
+    if distribution == "single":
+        return [BUTTON_COLORS[0]] * total
+    if distribution == "columns":
+        # One colour per column, cycling through six liquids
+        return [BUTTON_COLORS[(k % count_x) % 6] for k in range(total)]
+    if distribution == "random":
+        rng = random.Random(SEED)
+        return [rng.choice(BUTTON_COLORS[:6]) for _ in range(total)]
+    raise ValueError(f"Unknown distribution: {distribution}")
+
+
+class Case:
+    """Prepared inputs of one layout / colour distribution."""
+
+    def __init__(self, count_x, count_y, distribution):
+        self.count_x = count_x
+        self.count_y = count_y
+        self.distribution = distribution
+        self.corners = field_corners(count_x, count_y)
+        self.colors = color_codes(count_x, count_y, distribution)
+
+        self.generator = self.make_generator()
+        self.parcels = self.generator.generate_parcel_coordinates()
+        self.projection = self.generator.projection
+        self.used_colors = sorted(set(self.colors))
+        self.passes = {
+            color: generate_passes(parcels_of_color(self.parcels, color), self.projection, PARCEL_WIDTH, SPRAYING_WIDTH)
+            for color in self.used_colors
+        }
+        self.routes = {color: self.plan(color) for color in self.used_colors}
+        parcel_ids = parcel_ids_by_color(self.parcels)
+        num_passes = passes_per_parcel(PARCEL_WIDTH, SPRAYING_WIDTH)
+        self.grid_indices = {color: pass_grid_indices(parcel_ids[color], count_x, num_passes) for color in self.used_colors}
+
+    @property
+    def name(self):
+        return f"{self.count_x}x{self.count_y}/{self.distribution}"
+
+    def make_generator(self):
+        generator, _ = ParcelGenerator.create(
+            self.corners, PARCEL_WIDTH, PARCEL_HEIGHT, GAP, GAP, self.count_x, self.count_y,
+            is_fit=False, colors=self.colors,
+        )
+        return generator
+
+    def plan(self, color):
+        tops, bottoms = self.passes[color]
+        return plan_route(tops, bottoms, self.projection, ACC_BUFFER)
+
+    # Benchmarked operations
+
+    def grid_create(self):
+        return self.make_generator()
+
+    def grid_coordinates(self):
+        return self.generator.generate_parcel_coordinates()
+
+    def path_passes(self):
+        for color in self.used_colors:
+            generate_passes(parcels_of_color(self.parcels, color), self.projection, PARCEL_WIDTH, SPRAYING_WIDTH)
+
+    def path_scanning(self):
+        for color in self.used_colors:
+            self.plan(color)
+
+    def path_scanning_time(self):
+        # Same planner with flight time as the objective
+        model = FlightTimeModel(SORTIE_GROUND_SPEED, ACC_BUFFER)
+        for color in self.used_colors:
+            tops, bottoms = self.passes[color]
+            plan_route(tops, bottoms, self.projection, ACC_BUFFER, cost_model=model)
+
+    def path_sweep(self):
+        for color in self.used_colors:
+            tops, bottoms = self.passes[color]
+            columns, rows, strips = self.grid_indices[color]
+            plan_sweep(tops, bottoms, columns, rows, strips, self.projection, ACC_BUFFER)
+
+    def path_total_distance(self):
+        # A fresh service each time, so the path-length cache does not hide the work
+        service = DistanceMatrixService()
+        for route in self.routes.values():
+            service.path_length(route.path)
+
+    def mission_serialize(self):
+        for route in self.routes.values():
+            "\n".join(mission_lines(ORIGIN, ALTITUDE, GROUND_SPEED, route.path, route.parcel_points))
+
+    def mission_write(self):
+        # Streamed straight to a file, pass by pass (written to the null device)
+        for route in self.routes.values():
+            with MissionWriter(os.devnull, ORIGIN, ALTITUDE, GROUND_SPEED) as writer:
+                writer.add_route(route.path, route.parcel_points)
+
+    def mission_reduce(self):
+        # Collinear merging and trigger detection, streamed like mission.write
+        reducer = MissionReducer(MODE_TRIGGERED)
+        for route in self.routes.values():
+            # Fast enough to fly a parcel within the longest trigger duration
+            with MissionWriter(os.devnull, ORIGIN, ALTITUDE, TRIGGER_GROUND_SPEED) as writer:
+                writer.add_runs(reducer.runs(route.path, route.parcel_points))
+
+    def mission_sorties(self):
+        # Split every route under tank and flight time limits (cut positions by dynamic programming)
+        model = FlightTimeModel(SORTIE_GROUND_SPEED, ACC_BUFFER)
+        for route in self.routes.values():
+            split_route(route, self.projection, model, LIQUID_PER_PASS_L, ORIGIN, ALTITUDE, TANK_L, MAX_FLIGHT_S)
+
+    def report_build(self):
+        info = {
+            'button_names': {str(i + 1): f"Liquid {i + 1}" for i in range(len(BUTTON_COLORS))},
+            'width': PARCEL_WIDTH,
+            'height': PARCEL_HEIGHT,
+            'gap_x': GAP,
+            'gap_y': GAP,
+            'count_x': self.count_x,
+            'count_y': self.count_y,
+            'spraying_width': str(SPRAYING_WIDTH),
+            'corners': dict(zip("ABDC", self.corners)),
+            'fit': False,
+            'fit_gap': False,
+        }
+        service = DistanceMatrixService()
+        "".join(report_lines(
+            info, self.parcels, {color: route.path for color, route in self.routes.items()},
+            {}, {}, service.path_length, update_time="benchmark",
+        ))
+
+
+OPERATIONS = [
+    ("grid.create", Case.grid_create),
+    ("grid.coordinates", Case.grid_coordinates),
+    ("path.passes", Case.path_passes),
+    ("path.scanning", Case.path_scanning),
+    ("path.scanning_time", Case.path_scanning_time),
+    ("path.sweep", Case.path_sweep),
+    ("path.total_distance", Case.path_total_distance),
+    ("mission.serialize", Case.mission_serialize),
+    ("mission.write", Case.mission_write),
+    ("mission.reduce", Case.mission_reduce),
+    ("mission.sorties", Case.mission_sorties),
+    ("report.build", Case.report_build),
+]
+
+
+def measure(func, repeat):
+    """Wall-clock timings of `func()` and its tracemalloc peak in a separate run."""
+    timings = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > MAX_CASE_SECONDS:
+            break
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeats": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "peak_bytes": peak,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(layouts, distributions, operations, repeat):
+    results = []
+    for count_x, count_y in layouts:
+        for distribution in distributions:
+            case = Case(count_x, count_y, distribution)
+            for name, operation in operations:
+                stats = measure(lambda: operation(case), repeat)
+                stats.update({
+                    "benchmark": name,
+                    "layout": f"{count_x}x{count_y}",
+                    "parcels": count_x * count_y,
+                    "distribution": distribution,
+                })
+                results.append(stats)
+                print(f"{case.name:<22} {name:<22} {stats['median_s'] * 1000:10.2f} ms  "
+                      f"peak {stats['peak_bytes'] / 1024:10.1f} KiB")
+    return results
+
+
+def compare(results, baseline_path):
+    """Print median ratios against an earlier results file (> 1.0 means slower now)."""
+    with open(baseline_path, 'r') as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {
+        (entry["benchmark"], entry["layout"], entry["distribution"]): entry
+        for entry in baseline.get("results", [])
+    }
+    print(f"\nCompared with {baseline.get('revision') or baseline_path}:")
+    for entry in results:
+        old = previous.get((entry["benchmark"], entry["layout"], entry["distribution"]))
+        if old is None or old["median_s"] <= 0:
+            continue
+        ratio = entry["median_s"] / old["median_s"]
+        memory = entry["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else float("nan")
+        print(f"{entry['layout'] + '/' + entry['distribution']:<22} {entry['benchmark']:<22} "
+              f"time x{ratio:5.2f}  memory x{memory:5.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark grid generation, path planning and export.")
+    parser.add_argument("--quick", action="store_true", help="only the small layouts")
+    parser.add_argument("--layouts", nargs="+", help="layouts as COLSxROWS, e.g. 6x5 50x25")
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=DISTRIBUTIONS)
+    parser.add_argument("--only", nargs="+", help="benchmark names to run (e.g. path.scanning)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("-o", "--output", help="results file (default: benchmarks/results/<revision>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    if args.layouts:
+        layouts = [tuple(int(part) for part in layout.lower().split("x")) for layout in args.layouts]
+    else:
+        layouts = QUICK_LAYOUTS if args.quick else LAYOUTS
+    operations = [op for op in OPERATIONS if not args.only or op[0] in args.only]
+
+    revision = git_revision()
+    results = run(layouts, args.distributions, operations, max(1, args.repeat))
+    document = {
+        "revision": revision,
+        "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{revision or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(document, output_file, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
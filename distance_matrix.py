@@ -0,0 +1,135 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from projection import planar_distance
+
+# Earth's radius in meters
+EARTH_RADIUS_M = 6371000
+
+# Above this many endpoints the full matrix is not materialized ((2n)^2 float64 values)
+MAX_MATRIX_ENDPOINTS = 3000
+
+
+def haversine_pairwise(coords1, coords2):
+    """
+    Vectorized great-circle distance in meters between matching rows of two (N, 2) (lat, lon) arrays.
+    Inputs broadcast, so a single point can be compared against many.
+    """
+    coords1 = np.radians(np.asarray(coords1, dtype=np.float64))
+    coords2 = np.radians(np.asarray(coords2, dtype=np.float64))
+    lat1, lon1 = coords1[..., 0], coords1[..., 1]
+    lat2, lon2 = coords2[..., 0], coords2[..., 1]
+
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0.0, None)))
+
+
+def haversine_cross(coords1, coords2):
+    """Distance matrix in meters between every point of `coords1` and every point of `coords2`."""
+    coords1 = np.asarray(coords1, dtype=np.float64).reshape(-1, 2)
+    coords2 = np.asarray(coords2, dtype=np.float64).reshape(-1, 2)
+    return haversine_pairwise(coords1[:, np.newaxis, :], coords2[np.newaxis, :, :])
+
+
+class EndpointDistanceMatrix:
+    """
+    Pairwise distances between all endpoints of a set of passes, computed in one vectorized call.
+    Endpoints are numbered: top of pass k -> k, bottom of pass k -> n + k.
+
+    With `planar=True` the endpoints are local (east, north) meters and distances are Euclidean,
+    otherwise they are (lat, lon) and distances are great-circle.
+    """
+
+    def __init__(self, tops, bottoms, planar=False):
+        tops = np.asarray(tops, dtype=np.float64).reshape(-1, 2)
+        bottoms = np.asarray(bottoms, dtype=np.float64).reshape(-1, 2)
+        self.n = len(tops)
+        self.endpoints = np.concatenate((tops, bottoms))
+        if planar:
+            self.matrix = planar_distance(self.endpoints[:, np.newaxis, :], self.endpoints[np.newaxis, :, :])
+        else:
+            self.matrix = haversine_cross(self.endpoints, self.endpoints)
+
+    def lookup(self, a, b):
+        """Distance between endpoint numbers `a` and `b` (ints or index arrays)."""
+        return self.matrix[a, b]
+
+    def top(self, k):
+        return k
+
+    def bottom(self, k):
+        return self.n + k
+
+    def pass_lengths(self):
+        """Top-to-bottom length of every pass."""
+        k = np.arange(self.n)
+        return self.matrix[k, k + self.n]
+
+
+class DistanceMatrixService:
+    """
+    Cache of endpoint distance matrices and path lengths shared by the planning stages
+    (path builder, total length label, report).
+
+    Entries are keyed by a digest of the coordinates they were computed from, so the same
+    parcel layout and pass set is only measured once, however often colours are switched
+    or the planner is re-run. Old entries are evicted in least-recently-used order.
+    """
+
+    def __init__(self, max_layouts=16, max_paths=64):
+        self.max_layouts = max_layouts
+        self.max_paths = max_paths
+        self._matrices = OrderedDict()
+        self._path_lengths = OrderedDict()
+
+    @staticmethod
+    def layout_key(*arrays):
+        digest = hashlib.sha1()
+        for array in arrays:
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def endpoint_matrix(self, tops, bottoms, planar=False):
+        """
+        Return the (cached) EndpointDistanceMatrix for these pass endpoints,
+        or None when the pass set is too large to materialize a full matrix.
+        """
+        if 2 * len(tops) > MAX_MATRIX_ENDPOINTS:
+            return None
+
+        key = (planar, self.layout_key(tops, bottoms))
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            matrix = EndpointDistanceMatrix(tops, bottoms, planar=planar)
+            self._remember(self._matrices, key, matrix, self.max_layouts)
+        else:
+            self._matrices.move_to_end(key)
+        return matrix
+
+    def path_length(self, path_coordinates):
+        """Total great-circle length (meters) of a polyline of (lat, lon) points, cached by path."""
+        if path_coordinates is None or len(path_coordinates) < 2:
+            return 0.0
+
+        points = np.asarray(path_coordinates, dtype=np.float64).reshape(-1, 2)
+        key = self.layout_key(points)
+        length = self._path_lengths.get(key)
+        if length is None:
+            length = float(haversine_pairwise(points[:-1], points[1:]).sum())
+            self._remember(self._path_lengths, key, length, self.max_paths)
+        else:
+            self._path_lengths.move_to_end(key)
+        return length
+
+    def clear(self):
+        self._matrices.clear()
+        self._path_lengths.clear()
+
+    @staticmethod
+    def _remember(cache, key, value, max_entries):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
@@ -1,8 +1,8 @@
 import sys
-import folium
 import os
+import json
 import requests
-from PyQt6.QtCore import QUrl, QThread, QTimer, QObject, pyqtSignal, pyqtSlot
+from PyQt6.QtCore import QUrl, QThread, QObject, pyqtSignal, pyqtSlot, pyqtProperty
 from PyQt6.QtWidgets import QApplication, QVBoxLayout, QWidget
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import QWebEngineSettings, QWebEngineProfile
@@ -13,12 +13,23 @@ from functools import partial
 import shutil
 import tempfile
 import configparser
-import email.utils
-
-def is_online():
+import threading
+from tile_prefetch import TilePrefetcher, corners_from_config, TILE_URL, DEFAULT_MIN_ZOOM, DEFAULT_MAX_ZOOM
+from tile_store import TileStore
+from tile_cache import TileMemoryCache
+from map_overlay import MapOverlayManager, DEFAULT_RENDER_MODE, DEFAULT_CANVAS_THRESHOLD
+
+# Connectivity probe defaults; override in the [Network] section of config.ini
+DEFAULT_PROBE_HOST = "server.arcgisonline.com"
+DEFAULT_PROBE_PORT = 443
+DEFAULT_PROBE_TIMEOUT = 3.0
+DEFAULT_CHECK_INTERVAL = 5.0
+DEFAULT_MAX_CHECK_INTERVAL = 60.0
+
+def is_online(host="www.google.com", port=80, timeout=5):
     try:
-        socket.create_connection(("www.google.com", 80), timeout=5)
-        return True
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
     except OSError:
         pass
     return False
@@ -47,8 +58,14 @@ def per_resource_path(relative_path):
 
 class TileServerHandler(SimpleHTTPRequestHandler):
     session = requests.Session()
-
-    def __init__(self, cache_dir, *args, **kwargs):
+    # Shared by all request threads: recently served tiles with their headers precomputed
+    memory_cache = TileMemoryCache()
+    # Bytes of the 'No Tile Found' image, read once
+    no_tile_data = None
+
+    def __init__(self, tile_store, cache_dir, *args, **kwargs):
+        self.tile_store = tile_store
+        # Legacy flat cache ({z}_{x}_{y}.png); read only for tiles not migrated into the store yet
         self.cache_dir = cache_dir
         self.no_tile_image = resource_path("no_tile_found.png")
         super().__init__(*args, **kwargs)
@@ -59,50 +76,43 @@ class TileServerHandler(SimpleHTTPRequestHandler):
             if len(path_parts) == 4:
                 _, z, x, y_png = path_parts
                 y = y_png.replace('.png', '')
-                tile_path = os.path.join(self.cache_dir, f'{z}_{x}_{y}.png')
-
-                if os.path.exists(tile_path):
-                    etag = f"\"{os.path.getmtime(tile_path)}-{os.path.getsize(tile_path)}\""
-                    if self.headers.get("If-None-Match") == etag:
-                        self.send_response(304)
-                        self.send_header("ETag", etag)
-                        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
-                        self.end_headers()
-                        return
-
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'image/png')
-                    self.send_header("Cache-Control", "public, max-age=31536000, immutable")
-                    self.send_header("ETag", etag)
-                    self.send_header("Last-Modified", email.utils.formatdate(os.path.getmtime(tile_path), usegmt=True))
-                    self.end_headers()
-                    with open(tile_path, 'rb') as f:
-                        self.wfile.write(f.read())
+                try:
+                    z, x, y = int(z), int(x), int(y)
+                except ValueError:
+                    self.send_error(404)
+                    return
+
+                # RAM first, then the tile store (and the legacy flat cache until it is migrated)
+                key = (z, x, y)
+                cached = TileServerHandler.memory_cache.get(key)
+                if cached is None:
+                    tile = self.tile_store.get_tile(z, x, y)
+                    if tile is None:
+                        tile = self.import_legacy_tile(z, x, y)
+                    if tile is not None:
+                        cached = TileServerHandler.memory_cache.put(key, *tile)
+
+                if cached is not None:
+                    self.send_tile(cached)
                 else:
                     online = getattr(self.server, "online", False)
                     if online:
                         # Only try to download tiles if online
-                        tile_url = f'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}'
+                        tile_url = TILE_URL.format(z=z, x=x, y=y)
                         try:
-                            response = TileServerHandler.session.get(tile_url, stream=True, timeout=(3, 20))
-                            if response.status_code == 200:
-                                os.makedirs(os.path.dirname(tile_path), exist_ok=True)
-                                with open(tile_path, 'wb') as tile_file:
-                                    for chunk in response.iter_content(1024):
-                                        tile_file.write(chunk)
-                                self.send_response(200)
-                                self.send_header('Content-Type', 'image/png')
-                                self.send_header("Cache-Control", "public, max-age=31536000, immutable")
-                                etag = f"\"{os.path.getmtime(tile_path)}-{os.path.getsize(tile_path)}\""
-                                self.send_header("ETag", etag)
-                                self.end_headers()
-                                with open(tile_path, 'rb') as f:
-                                    self.wfile.write(f.read())
+                            response = TileServerHandler.session.get(tile_url, timeout=(3, 20))
+                            if response.status_code == 200 and response.content:
+                                updated_at = self.tile_store.put_tile(z, x, y, response.content)
+                                self.send_tile(TileServerHandler.memory_cache.put(key, response.content, updated_at))
                             else:
                                 print(f"Tile not available online: {z}/{x}/{y}")
                                 self.serve_no_tile_found_image()
                         except requests.exceptions.RequestException as e:
                             print(f"Error downloading tile {z}/{x}/{y}: {e}")
+                            # The connection may be gone; have the connectivity monitor probe now
+                            download_failed = getattr(self.server, "download_failed", None)
+                            if download_failed is not None:
+                                download_failed()
                             self.serve_no_tile_found_image()
                     else:
                         print(f"Offline, serving 'No Tile Found' image for {z}/{x}/{y}")
@@ -110,26 +120,65 @@ class TileServerHandler(SimpleHTTPRequestHandler):
             else:
                 self.send_error(404)
 
+    def send_tile(self, tile):
+        """Send a CachedTile; its ETag / Last-Modified headers were computed when it was cached."""
+        if self.headers.get("If-None-Match") == tile.etag:
+            self.send_response(304)
+            self.send_header("ETag", tile.etag)
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', tile.content_length)
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.send_header("ETag", tile.etag)
+        self.send_header("Last-Modified", tile.last_modified)
+        self.end_headers()
+        self.wfile.write(tile.data)
+
+    def import_legacy_tile(self, z, x, y):
+        """Move a tile from the old flat cache into the store the first time it is requested."""
+        tile_path = os.path.join(self.cache_dir, f'{z}_{x}_{y}.png')
+        try:
+            with open(tile_path, 'rb') as f:
+                data = f.read()
+            updated_at = os.path.getmtime(tile_path)
+        except OSError:
+            return None
+        if not data:
+            return None
+        self.tile_store.put_tile(z, x, y, data, updated_at)
+        try:
+            os.remove(tile_path)
+        except OSError:
+            pass
+        return data, updated_at
 
     def serve_no_tile_found_image(self):
         """Serve the 'No Tile Found' image from a writable location."""
         try:
-            # Copy the no_tile_found.png to a writable temporary directory
-            temp_dir = tempfile.gettempdir()
-            temp_image_path = os.path.join(temp_dir, 'no_tile_found.png')
+            if TileServerHandler.no_tile_data is None:
+                # Copy the no_tile_found.png to a writable temporary directory
+                temp_dir = tempfile.gettempdir()
+                temp_image_path = os.path.join(temp_dir, 'no_tile_found.png')
+
+                # If the image doesn't already exist in the temp dir, copy it
+                if not os.path.exists(temp_image_path):
+                    shutil.copy(self.no_tile_image, temp_image_path)
 
-            # If the image doesn't already exist in the temp dir, copy it
-            if not os.path.exists(temp_image_path):
-                shutil.copy(self.no_tile_image, temp_image_path)
+                # Read the copied image once; later requests are served from memory
+                if os.path.exists(temp_image_path):
+                    with open(temp_image_path, 'rb') as f:
+                        TileServerHandler.no_tile_data = f.read()
 
-            # Now serve the copied image from the temp directory
-            if os.path.exists(temp_image_path):
+            if TileServerHandler.no_tile_data is not None:
                 try:
                     self.send_response(200)
                     self.send_header('Content-Type', 'image/png')
                     self.end_headers()
-                    with open(temp_image_path, 'rb') as f:
-                        self.wfile.write(f.read())
+                    self.wfile.write(TileServerHandler.no_tile_data)
                 except ConnectionAbortedError as e:
                     print(f"Connection was aborted by the client: {e}")
             else:
@@ -143,23 +192,42 @@ class TileServerHandler(SimpleHTTPRequestHandler):
 
 
 class TileServerThread(QThread):
-    def __init__(self, cache_dir, online, port=8000):
+    # Emitted from the request threads when a tile download fails with a network error
+    downloadFailed = pyqtSignal()
+
+    def __init__(self, tile_store, cache_dir, online, port=8000):
         super().__init__()
+        self.tile_store = tile_store
         self.cache_dir = cache_dir
         self.online = online
         self.no_tile_image = resource_path("no_tile_found.png")
         self.port = port
         self.httpd = None
+        self._migration_cancel = threading.Event()
 
     def run(self):
-        handler = partial(TileServerHandler, self.cache_dir)
+        # Move the old one-file-per-tile cache into the store in the background; tiles requested
+        # before the migration reaches them are imported on demand by the handler
+        threading.Thread(target=self.migrate_flat_cache, name="tile-migration", daemon=True).start()
+
+        handler = partial(TileServerHandler, self.tile_store, self.cache_dir)
         # Threaded server improves tile loading speed significantly (many tiles requested in parallel)
         self.httpd = ThreadingHTTPServer(('localhost', self.port), handler)
         self.httpd.online = self.online
+        self.httpd.download_failed = self.downloadFailed.emit
         print(f"Starting tile server on port {self.port}")
         self.httpd.serve_forever()
 
+    def migrate_flat_cache(self):
+        try:
+            imported = self.tile_store.import_directory(self.cache_dir, remove=True, cancel_event=self._migration_cancel)
+            if imported:
+                print(f"Migrated {imported} cached tiles into {self.tile_store.path}")
+        except Exception as e:
+            print(f"Tile cache migration failed: {e}")
+
     def stop(self):
+        self._migration_cancel.set()
         if self.httpd is not None:
             self.httpd.shutdown()
         print("Tile server stopped")
@@ -170,9 +238,83 @@ class TileServerThread(QThread):
         if self.httpd is not None:
             self.httpd.online = online
 
+class ConnectivityMonitor(QThread):
+    """
+    Probes the tile host off the GUI thread and reports online/offline changes via a signal.
+
+    While the state is stable the probe interval doubles up to `max_interval`, so a long stretch
+    without coverage is not hammered every few seconds; any change resets it to `interval`.
+    """
+    statusChanged = pyqtSignal(bool)
+
+    def __init__(self, host=DEFAULT_PROBE_HOST, port=DEFAULT_PROBE_PORT, timeout=DEFAULT_PROBE_TIMEOUT,
+                 interval=DEFAULT_CHECK_INTERVAL, max_interval=DEFAULT_MAX_CHECK_INTERVAL):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.online = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def run(self):
+        delay = self.interval
+        while not self._stop_event.is_set():
+            online = is_online(self.host, self.port, self.timeout)
+            if online != self.online:
+                self.online = online
+                self.statusChanged.emit(online)
+                delay = self.interval
+            else:
+                delay = min(delay * 2, self.max_interval)
+
+            # Sleep until the next probe, an explicit check_now() or stop()
+            self._wake_event.wait(delay)
+            self._wake_event.clear()
+
+    def check_now(self):
+        """Probe again immediately (e.g. after a failed tile request)."""
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+class TilePrefetchThread(QThread):
+    """Runs a TilePrefetcher for one field off the GUI thread."""
+    progress = pyqtSignal(int, int)
+    prefetchFinished = pyqtSignal(dict)
+
+    def __init__(self, tile_store, corners, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+        super().__init__()
+        self.prefetcher = TilePrefetcher(tile_store)
+        self.corners = corners
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        result = self.prefetcher.prefetch_corners(
+            self.corners,
+            self.min_zoom,
+            self.max_zoom,
+            progress=self.progress.emit,
+            cancel_event=self.cancel_event,
+        )
+        print(f"Tile prefetch finished: {result.as_dict()}")
+        self.prefetchFinished.emit(result.as_dict())
+
+    def cancel(self):
+        self.cancel_event.set()
+
 class MapWidget(QWidget):
     mapReady = pyqtSignal()
     cornerMoved = pyqtSignal(str, float, float)
+    prefetchProgress = pyqtSignal(int, int)
+    prefetchFinished = pyqtSignal(dict)
 
     def __init__(self):
         super().__init__()
@@ -215,31 +357,37 @@ class MapWidget(QWidget):
 
         self.no_tile_image = resource_path("no_tile_found.png")
 
-        # Check if online
-        self.online = is_online()
+        # Single-file tile store (MBTiles layout) next to the legacy cache directory
+        self.tile_store = TileStore(os.path.join(os.path.dirname(self.cache_dir), "map_tiles.mbtiles"))
+
+        # Assume offline until the background monitor's first probe says otherwise
+        self.online = False
 
         # Start the tile server
         self.tile_server_port = 8000
-        self.tile_server_thread = TileServerThread(self.cache_dir, self.online, port=self.tile_server_port)
+        self.tile_server_thread = TileServerThread(self.tile_store, self.cache_dir, self.online, port=self.tile_server_port)
         self.tile_server_thread.start()
 
-        # Regularly check if the app is online
-        self.timer = QTimer(self)
-        self.timer.setInterval(5000)  # Check every 5 seconds
-        self.timer.timeout.connect(self.check_connection)
-        self.timer.start()
-
-        self.satellite_layer = None
+        self.prefetch_thread = None
         # Config file handling
         self.config_file = per_resource_path("config.ini")
+
+        # Keyed overlay layers (parcels, routes) updated through JSON diffs
+        self.overlay = MapOverlayManager(self.view.page().runJavaScript, **self.load_render_settings())
+
+        # Check connectivity in the background; changes arrive through a queued signal
+        self.connectivity_monitor = ConnectivityMonitor(**self.load_network_settings())
+        self.connectivity_monitor.statusChanged.connect(self.on_connection_changed)
+        # A failed tile download triggers an immediate probe instead of waiting out the backoff
+        self.tile_server_thread.downloadFailed.connect(self.connectivity_monitor.check_now)
+        self.connectivity_monitor.start()
         self.map_coords, self.map_zoom = self.load_coordinates_from_config()
 
         # Create and load the map
         self.load_map()
 
-    def check_connection(self):
-        """Periodically check if the app is online and update the tile server."""
-        is_now_online = is_online()
+    def on_connection_changed(self, is_now_online):
+        """Called (in the GUI thread) when the connectivity monitor sees the online state change."""
         if is_now_online != self.online:
             print(f"Connection status changed. Online: {is_now_online}")
             self.online = is_now_online
@@ -248,6 +396,48 @@ class MapWidget(QWidget):
                 # Reload satellite tiles to fetch new tiles
                 self.reload_satellite_tiles()
 
+    def load_network_settings(self):
+        """Connectivity probe settings from the [Network] section of config.ini."""
+        settings = {
+            "host": DEFAULT_PROBE_HOST,
+            "port": DEFAULT_PROBE_PORT,
+            "timeout": DEFAULT_PROBE_TIMEOUT,
+            "interval": DEFAULT_CHECK_INTERVAL,
+            "max_interval": DEFAULT_MAX_CHECK_INTERVAL,
+        }
+        config = configparser.ConfigParser()
+        if os.path.exists(self.config_file):
+            config.read(self.config_file)
+        if 'Network' in config:
+            network = config['Network']
+            try:
+                settings["host"] = network.get("probe_host", settings["host"])
+                settings["port"] = network.getint("probe_port", settings["port"])
+                settings["timeout"] = network.getfloat("probe_timeout", settings["timeout"])
+                settings["interval"] = network.getfloat("check_interval", settings["interval"])
+                settings["max_interval"] = network.getfloat("max_check_interval", settings["max_interval"])
+            except ValueError as e:
+                print(f"Error reading network settings: {e}")
+        return settings
+
+    def load_render_settings(self):
+        """Overlay renderer settings from the [Rendering] section of config.ini."""
+        settings = {
+            "render_mode": DEFAULT_RENDER_MODE,
+            "canvas_threshold": DEFAULT_CANVAS_THRESHOLD,
+        }
+        config = configparser.ConfigParser()
+        if os.path.exists(self.config_file):
+            config.read(self.config_file)
+        if 'Rendering' in config:
+            rendering = config['Rendering']
+            try:
+                settings["render_mode"] = rendering.get("mode", settings["render_mode"]).strip().lower()
+                settings["canvas_threshold"] = rendering.getint("canvas_threshold", settings["canvas_threshold"])
+            except ValueError as e:
+                print(f"Error reading rendering settings: {e}")
+        return settings
+
     def load_coordinates_from_config(self):
         config = configparser.ConfigParser()
 
@@ -280,95 +470,75 @@ class MapWidget(QWidget):
             return (37.32500, -6.02884), 15
 
             
+    def prefetch_field_tiles(self, corners=None, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+        """
+        Download every tile covering the field into the cache in the background.
+        `corners` is a list of (lat, lon); defaults to the [Location] section of config.ini.
+        Returns False if nothing was started (offline, no corners, or a prefetch is already running).
+        """
+        if self.prefetch_thread is not None and self.prefetch_thread.isRunning():
+            return False
+        if corners is None:
+            corners = corners_from_config(self.config_file)
+        if not corners or not self.online:
+            return False
+
+        self.prefetch_thread = TilePrefetchThread(self.tile_store, corners, min_zoom, max_zoom)
+        self.prefetch_thread.progress.connect(self.prefetchProgress)
+        self.prefetch_thread.prefetchFinished.connect(self.prefetchFinished)
+        self.prefetch_thread.start()
+        return True
+
+    def tile_cache_stats(self):
+        """Hit/miss counters and memory use of the tile server's in-memory cache."""
+        return TileServerHandler.memory_cache.stats()
+
+    def cancel_prefetch(self):
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancel()
+
     def closeEvent(self, event):
         """Override the closeEvent to save map coordinates and close."""
+        self.connectivity_monitor.stop()
+        self.connectivity_monitor.wait()
+        # Stop a running prefetch (in-flight downloads finish, nothing new starts)
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancel()
+            self.prefetch_thread.wait()
         # Stop the tile server when closing the application
         self.tile_server_thread.stop()
         self.tile_server_thread.wait()
+        self.tile_store.close()
+        print(f"Tile memory cache: {self.tile_cache_stats()}")
         event.accept()  # Accept the event to proceed with closing the window
 
     def load_map(self):
-        # Reuse the generated HTML when possible (avoids slow folium regeneration on every run)
-        temp_dir = tempfile.gettempdir()
-        map_path = os.path.join(temp_dir, 'parcel_planner_map.html')
-        if os.path.exists(map_path):
-            self.view.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
-            self.view.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
-            self.view.setUrl(QUrl.fromLocalFile(map_path))
-            self.view.loadFinished.connect(self.on_load_finished)
-            return
-
-        # Create a folium map with the OpenStreetMap tiles (low-res)
-        folium_map = folium.Map(
-            location=self.map_coords,
-            zoom_start=self.map_zoom,
-            tiles="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
-            attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
-            control_scale=False,
-            prefer_canvas=False,
-            no_touch=False,
-            disable_3d=False,
-        )
-
-        # Add the high-resolution satellite tile layer from the local tile server
-        self.satellite_layer = folium.TileLayer(
-            tiles=f'http://localhost:{self.tile_server_port}/tiles/{{z}}/{{x}}/{{y}}.png',
-            attr='&copy; <a href="https://www.esri.com/en-us/home">Esri</a>',
-            name='Esri Satellite',
-            max_zoom=20,
-            extra_options={'async': True}
-        )
-        self.satellite_layer.add_to(folium_map)
-
-        # Add a marker to the map
-        # folium.Marker(start_coords, popup='Starting Point').add_to(folium_map)
-
-        leaflet_css = resource_path('web_resources/css/leaflet.css')
-        leaflet_js = resource_path('web_resources/js/leaflet.js')
-
-        folium_map.get_root().header.add_child(folium.Element(f"""
-            <link rel="stylesheet" href="file:///{leaflet_css}" />
-        """))
-        folium_map.get_root().html.add_child(folium.Element(f"""
-            <script src="file:///{leaflet_js}"></script>
-        """))
-        # Enable Qt WebChannel in the generated map so JS can call back into Python.
-        folium_map.get_root().header.add_child(folium.Element("""
-            <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
-        """))
-
-
-        # Save map data to an HTML file (temp, writable)
-        folium_map.save(map_path)
-
+        # Static Leaflet shell; tile URL, centre and zoom are handed over through the WebChannel
+        # bridge when the page asks for them, so nothing has to be generated or cached on disk.
+        self._bridge.set_map_config({
+            'center': [self.map_coords[0], self.map_coords[1]],
+            'zoom': self.map_zoom,
+            'max_zoom': 20,
+            'base_tile_url': "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
+            'base_attribution': '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+            'tile_url': self.satellite_tile_url(),
+            'tile_attribution': '&copy; <a href="https://www.esri.com/en-us/home">Esri</a>',
+        })
 
         # Enable local file access
         self.view.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
         self.view.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
 
-        # Load the map into the QWebEngineView
-        self.view.setUrl(QUrl.fromLocalFile(map_path))
-        self.view.loadFinished.connect(self.on_load_finished)
+        # The shell reports back once window.mapObject exists (the channel comes up after loadFinished)
+        self._bridge.pageReady.connect(self.on_load_finished)
+        self.view.setUrl(QUrl.fromLocalFile(resource_path('web_resources/map_shell.html')))
+
+    def satellite_tile_url(self):
+        return f'http://localhost:{self.tile_server_port}/tiles/{{z}}/{{x}}/{{y}}.png'
 
     def on_load_finished(self):
-        # JavaScript code to ensure mapObject is globally accessible + set up bridge + corner markers
+        # Map shell is up (window.mapObject and window.bridge exist): install the corner marker helpers
         js_code = """
-        if (typeof window.mapObject === 'undefined') {
-            for (let key in window) {
-                if (key.startsWith("map_") && window[key] instanceof L.Map) {
-                    window.mapObject = window[key];  // Store globally accessible mapObject
-                    break;
-                }
-            }
-        }
-
-        // Initialize WebChannel bridge (if available)
-        if (typeof window.bridge === 'undefined' && typeof QWebChannel !== 'undefined' && typeof qt !== 'undefined') {
-            new QWebChannel(qt.webChannelTransport, function(channel) {
-                window.bridge = channel.objects.bridge;
-            });
-        }
-
         // Draggable corner markers (A, B, C, D)
         if (typeof window.cornerMarkers === 'undefined') {
             window.cornerMarkers = {};
@@ -451,10 +621,6 @@ class MapWidget(QWidget):
         }
         """
         def _after_init(_result=None):
-            try:
-                self.update_map_center(self.map_coords[0], self.map_coords[1], self.map_zoom)
-            except Exception:
-                pass
             self.mapReady.emit()
 
         self.view.page().runJavaScript(js_code, _after_init)
@@ -507,12 +673,12 @@ class MapWidget(QWidget):
         if (typeof window.satelliteLayer !== 'undefined') {
             window.mapObject.removeLayer(window.satelliteLayer);
         }
-        window.satelliteLayer = L.tileLayer('http://localhost:{port}/tiles/{z}/{x}/{y}.png', {
+        window.satelliteLayer = L.tileLayer({url}, {
             attribution: '&copy; <a href="https://www.esri.com/en-us/home">Esri</a>',
             maxZoom: 20,
             async: true
         }).addTo(window.mapObject);
-        """.replace("{port}", str(self.tile_server_port))
+        """.replace("{url}", json.dumps(self.satellite_tile_url()))
 
         # Run the JavaScript to update the map
         self.view.page().runJavaScript(js_code)
@@ -533,30 +699,21 @@ class MapWidget(QWidget):
         :param center_lon: Longitude of the map center
         :param zoom_level: Zoom level of the map
         """
-        # Batch the parcel marker additions in one JavaScript call for performance
-        js_code = "var parcels = [];\n"
-
-        for i, parcel_info in enumerate(parcel_coordinates):
-            coordinates = parcel_info['coordinates']  # Coordinates of each parcel
-            color = parcel_info['color']  # Color for the parcel polygon
-            js_code += f"""
-            var parcelCoords{i} = {coordinates};
-            var parcel{i} = L.polygon(parcelCoords{i}, {{
-                color: '{color}',
-                weight: 1,
-                fillOpacity: 0.30
-            }}).addTo(window.mapObject);
-            parcels.push(parcel{i});
-            """
-
-        # Add JavaScript to update the map center and zoom level
-        js_code += f"""
+        # One layer per colour; only colours whose parcels changed are sent to the page
+        self.overlay.set_parcels(parcel_coordinates)
+        self.overlay.flush()
+
+        # Update the map center and zoom level
+        js_code = f"""
         window.mapObject.setView([{center_lat}, {center_lon}], {zoom_level});
         """
-
-        # Run the generated JavaScript in one batch
         self.view.page().runJavaScript(js_code)
 
+    def clear_overlays(self, prefix=""):
+        """Remove overlay layers (all of them, or those whose key starts with `prefix`)."""
+        self.overlay.remove_prefix(prefix)
+        self.overlay.flush()
+
     def save_map_coordinates(self):
         js_code = """
         (function() {
@@ -594,11 +751,30 @@ class MapWidget(QWidget):
 
 class _MapBridge(QObject):
     cornerMoved = pyqtSignal(str, float, float)
+    pageReady = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._map_config = "{}"
+
+    def set_map_config(self, config):
+        """Settings read by web_resources/map_shell.html when it creates the map."""
+        self._map_config = json.dumps(config)
+
+    def _get_map_config(self):
+        return self._map_config
+
+    # JSON string; constant, so the page reads it synchronously from the channel's property cache
+    mapConfig = pyqtProperty(str, fget=_get_map_config, constant=True)
 
     @pyqtSlot(str, float, float)
     def updateCorner(self, name, lat, lon):
         self.cornerMoved.emit(name, lat, lon)
 
+    @pyqtSlot()
+    def mapLoaded(self):
+        self.pageReady.emit()
+
 
 class MainWindow(QWidget):
     def __init__(self):
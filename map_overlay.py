@@ -0,0 +1,169 @@
+import hashlib
+import json
+
+# Coordinates are sent with 7 decimals (about 1 cm), which keeps the JSON compact
+COORD_DECIMALS = 7
+
+PARCELS_PREFIX = "parcels:"
+ROUTE_PREFIX = "route:"
+
+# Render modes: "svg" draws one DOM element per feature, "canvas" batches everything into a single
+# shared canvas; "auto" switches to canvas above the feature threshold
+RENDER_MODES = ("auto", "svg", "canvas")
+DEFAULT_RENDER_MODE = "auto"
+DEFAULT_CANVAS_THRESHOLD = 1000
+
+
+def _flat(points):
+    """[(lat, lng), ...] -> [lat, lng, lat, lng, ...] rounded for transport."""
+    flat = []
+    for lat, lng in points:
+        flat.append(round(float(lat), COORD_DECIMALS))
+        flat.append(round(float(lng), COORD_DECIMALS))
+    return flat
+
+
+def parcel_layer_data(color, parcels, renderer="svg"):
+    """Layer data for all parcel polygons of one colour (items as produced by ParcelGenerator)."""
+    return {
+        "type": "parcels",
+        "renderer": renderer,
+        "color": color,
+        "polygons": [
+            _flat((corner['lat'], corner['lng']) for corner in parcel['coordinates'])
+            for parcel in parcels
+        ],
+    }
+
+
+def route_layer_data(path_coordinates, parcel_points, renderer="svg"):
+    """Layer data for a scanning path and the spray start/end point of every pass."""
+    passes = []
+    for parcel_point in parcel_points:
+        passes.extend(_flat((parcel_point['start'], parcel_point['end'])))
+    return {
+        "type": "route",
+        "renderer": renderer,
+        "path": _flat(path_coordinates),
+        "passes": passes,
+    }
+
+
+class MapOverlayManager:
+    """
+    Python side of the keyed overlay registry in web_resources/js/overlay.js.
+
+    Every overlay is a named layer (one L.layerGroup per key in the page). The manager remembers a
+    digest of what the page currently holds and only sends the layers that changed, plus show/hide
+    toggles, as one JSON diff. Switching between colours that were already drawn costs a few bytes.
+    """
+
+    def __init__(self, run_javascript, render_mode=DEFAULT_RENDER_MODE, canvas_threshold=DEFAULT_CANVAS_THRESHOLD):
+        self._run_javascript = run_javascript
+        self.render_mode = render_mode if render_mode in RENDER_MODES else DEFAULT_RENDER_MODE
+        self.canvas_threshold = int(canvas_threshold)
+        self._digests = {}
+        self._visible = {}
+        self._pending = self._empty_diff()
+
+    @staticmethod
+    def _empty_diff():
+        return {"upsert": {}, "remove": [], "show": [], "hide": []}
+
+    def reset(self):
+        """Forget the page state (call after the page was reloaded)."""
+        self._digests.clear()
+        self._visible.clear()
+        self._pending = self._empty_diff()
+
+    def keys(self, prefix=""):
+        return [key for key in self._digests if key.startswith(prefix)]
+
+    def set_layer(self, key, data, visible=True):
+        """Queue `data` for layer `key` unless the page already holds identical data."""
+        payload = json.dumps(data, separators=(',', ':'))
+        digest = hashlib.sha1(payload.encode()).hexdigest()
+        if self._digests.get(key) != digest:
+            self._digests[key] = digest
+            self._pending["upsert"][key] = data
+            for queued in (self._pending["remove"], self._pending["show"], self._pending["hide"]):
+                if key in queued:
+                    queued.remove(key)
+            # Upserted layers are (re)created visible in the page
+            self._visible[key] = True
+        self.set_visible(key, visible)
+
+    def remove_layer(self, key):
+        if key in self._digests:
+            del self._digests[key]
+            self._visible.pop(key, None)
+            self._pending["upsert"].pop(key, None)
+            self._pending["remove"].append(key)
+
+    def remove_prefix(self, prefix):
+        for key in self.keys(prefix):
+            self.remove_layer(key)
+
+    def set_visible(self, key, visible):
+        if key not in self._digests or self._visible.get(key) == visible:
+            return
+        self._visible[key] = visible
+        show, hide = self._pending["show"], self._pending["hide"]
+        if visible:
+            if key in hide:
+                hide.remove(key)
+            show.append(key)
+        else:
+            if key in show:
+                show.remove(key)
+            hide.append(key)
+
+    def show_only(self, prefix, key):
+        """Show `key` and hide every other layer starting with `prefix`."""
+        for other in self.keys(prefix):
+            self.set_visible(other, other == key)
+
+    def flush(self):
+        """Send the queued diff to the page in one call. Returns the payload size in bytes."""
+        diff = {name: value for name, value in self._pending.items() if value}
+        self._pending = self._empty_diff()
+        if not diff:
+            return 0
+        payload = json.dumps(diff, separators=(',', ':'))
+        # Diffs sent before overlay.js is in the page are queued there and applied once it loads
+        self._run_javascript(
+            f"(function(d){{ if (window.ParcelOverlay) {{ window.ParcelOverlay.apply(d); }} "
+            f"else {{ (window._pendingOverlayDiffs = window._pendingOverlayDiffs || []).push(d); }} }})({payload});"
+        )
+        return len(payload)
+
+    def renderer_for(self, feature_count):
+        """'svg' or 'canvas' for a layer with `feature_count` polygons/markers."""
+        if self.render_mode != "auto":
+            return self.render_mode
+        return "canvas" if feature_count > self.canvas_threshold else "svg"
+
+    # Convenience helpers for the planner's layers
+
+    def set_parcels(self, parcel_coordinates):
+        """One layer per parcel colour; colours that disappeared are removed."""
+        by_color = {}
+        for parcel in parcel_coordinates:
+            by_color.setdefault(parcel['color'], []).append(parcel)
+
+        for key in self.keys(PARCELS_PREFIX):
+            if key[len(PARCELS_PREFIX):] not in by_color:
+                self.remove_layer(key)
+        # All colours share one renderer so the field is drawn consistently
+        renderer = self.renderer_for(len(parcel_coordinates))
+        for color, parcels in by_color.items():
+            self.set_layer(PARCELS_PREFIX + color, parcel_layer_data(color, parcels, renderer))
+
+    def show_route(self, color, path_coordinates, parcel_points):
+        """Draw (or re-show) the route of one colour and hide the routes of the other colours."""
+        key = ROUTE_PREFIX + color
+        # Two endpoint markers per pass
+        renderer = self.renderer_for(2 * len(parcel_points))
+        self.set_layer(key, route_layer_data(path_coordinates, parcel_points, renderer))
+        self.show_only(ROUTE_PREFIX, key)
+        return key
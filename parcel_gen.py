@@ -1,5 +1,5 @@
 import numpy as np
-import math
+from projection import LocalProjection, planar_distance, unit_vector
 
 class ParcelGenerator:
     def __init__(
@@ -33,6 +33,10 @@ class ParcelGenerator:
             is_fit = True
         
         self.is_fit = is_fit
+
+        # Local east-north plane of the field; all grid geometry is done there in meters
+        self.projection = LocalProjection.from_corners(self.area_corners)
+        self.local_corners = self.projection.to_local(self.area_corners)
         
         # Default set of colors if none provided
         self.colors = colors if colors else [
@@ -92,9 +96,9 @@ class ParcelGenerator:
             return
 
         # Calculate the width/height of the bounding area
-        top_left, top_right, bottom_right, bottom_left = [np.array(coord) for coord in self.area_corners]
-        area_width_m = self.haversine_distance(top_left, top_right)
-        area_height_m = self.haversine_distance(top_left, bottom_left)
+        top_left, top_right, bottom_right, bottom_left = self.local_corners
+        area_width_m = float(planar_distance(top_left, top_right))
+        area_height_m = float(planar_distance(top_left, bottom_left))
 
         # Calculate total space needed for (parcel + gap) in x & y directions
         total_parcel_width = (
@@ -148,85 +152,60 @@ class ParcelGenerator:
         if abs(self.gap_y_m) < 1e-12:
             self.gap_y_m = 0.0
 
-    def haversine_distance(self, coord1, coord2):
-        """Calculate the great-circle distance between two points on the Earth's surface in meters."""
-        lat1, lon1 = np.radians(coord1[0]), np.radians(coord1[1])
-        lat2, lon2 = np.radians(coord2[0]), np.radians(coord2[1])
+    def generate_parcel_array(self):
+        """
+        Batched grid engine: compute the corners of every parcel in one NumPy pass.
 
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        Returns a float64 array of shape (N, 4, 2) where N = num_parcels_x * num_parcels_y,
+        parcels are ordered row-major (parcel_id = j * num_parcels_x + i) and the corners are
+        [top_left, top_right, bottom_right, bottom_left], each as (lat, lng).
+        """
+        # Get the corner coordinates in the local plane
+        top_left, top_right, bottom_right, bottom_left = self.local_corners
 
-        a = math.sin(dlat / 2.0) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2.0) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        # Unit vectors along the top edge (columns) and down the left edge (rows)
+        axis_x = unit_vector(top_right - top_left)
+        axis_y = unit_vector(bottom_left - top_left)
 
-        # Earth's radius in meters
-        R = 6371000  
-        return R * c
+        # Offsets of every column and every row
+        move_x = np.arange(self.num_parcels_x, dtype=np.float64) * (self.parcel_width_m + self.gap_x_m)
+        move_y = np.arange(self.num_parcels_y, dtype=np.float64) * (self.parcel_height_m + self.gap_y_m)
 
-    def move_point(self, start_lat, start_lng, distance, bearing):
-        """Move a point a certain distance in a given bearing."""
-        R = 6371000  # Earth's radius in meters
-        lat1 = math.radians(start_lat)
-        lon1 = math.radians(start_lng)
+        # Top-left corner of every parcel, shape (ny, nx, 2)
+        origin = top_left + move_y[:, np.newaxis, np.newaxis] * axis_y + move_x[np.newaxis, :, np.newaxis] * axis_x
 
-        lat2 = math.asin(
-            math.sin(lat1) * math.cos(distance / R) +
-            math.cos(lat1) * math.sin(distance / R) * math.cos(bearing)
-        )
-        lon2 = lon1 + math.atan2(
-            math.sin(bearing) * math.sin(distance / R) * math.cos(lat1),
-            math.cos(distance / R) - math.sin(lat1) * math.sin(lat2)
-        )
+        width = axis_x * self.parcel_width_m
+        height = axis_y * self.parcel_height_m
 
-        return math.degrees(lat2), math.degrees(lon2)
+        corners = np.empty((self.num_parcels_y, self.num_parcels_x, 4, 2), dtype=np.float64)
+        corners[..., 0, :] = origin
+        corners[..., 1, :] = origin + width
+        corners[..., 2, :] = origin + width + height
+        corners[..., 3, :] = origin + height
+
+        # Back to (lat, lng) only once, for the whole grid
+        return self.projection.to_geodetic(corners.reshape(-1, 4, 2))
+
+    def parcel_colors(self):
+        """Return the color of every parcel, in the same order as `generate_parcel_array`."""
+        num_parcels = self.num_parcels_x * self.num_parcels_y
+        # Assign color in a cycle through the colors list
+        return [self.colors[k % len(self.colors)] for k in range(num_parcels)]
 
     def generate_parcel_coordinates(self):
         """
         Main method to generate parcel polygons (4-corner coordinates + color).
         Call after the instance is created (and possibly fitted) to get final results.
+
+        This is a thin list-of-dicts view over `generate_parcel_array`.
         """
-        # Get the corner coordinates
-        top_left, top_right, bottom_right, bottom_left = [np.array(coord) for coord in self.area_corners]
-
-        # Calculate bearings for the top and left edges
-        bearing_x = math.atan2(top_right[1] - top_left[1], top_right[0] - top_left[0])
-        bearing_y = math.atan2(bottom_left[1] - top_left[1], bottom_left[0] - top_left[0])
-
-        # List to store the parcel coordinates
-        parcels = []
-        for j in range(self.num_parcels_y):
-            for i in range(self.num_parcels_x):
-                # Move to the origin of the current parcel (distance along top edge, then down along left edge)
-                move_x = i * (self.parcel_width_m + self.gap_x_m)
-                move_y = j * (self.parcel_height_m + self.gap_y_m)
-
-                # Move horizontally (top edge direction), then vertically (left edge direction)
-                parcel_origin_lat, parcel_origin_lng = self.move_point(top_left[0], top_left[1], move_x, bearing_x)
-                parcel_origin_lat, parcel_origin_lng = self.move_point(parcel_origin_lat, parcel_origin_lng, move_y, bearing_y)
-
-                # Calculate the corners of the parcel
-                parcel_top_left = (parcel_origin_lat, parcel_origin_lng)
-                parcel_top_right = self.move_point(parcel_origin_lat, parcel_origin_lng, self.parcel_width_m, bearing_x)
-                parcel_bottom_right = self.move_point(
-                    parcel_top_right[0], parcel_top_right[1], self.parcel_height_m, bearing_y
-                )
-                parcel_bottom_left = self.move_point(
-                    parcel_origin_lat, parcel_origin_lng, self.parcel_height_m, bearing_y
-                )
-
-                # Assign color in a cycle through the colors list
-                color = self.colors[(j * self.num_parcels_x + i) % len(self.colors)]
-
-                # Store the parcel data
-                parcel = {
-                    'coordinates': [
-                        {"lat": parcel_top_left[0], "lng": parcel_top_left[1]},
-                        {"lat": parcel_top_right[0], "lng": parcel_top_right[1]},
-                        {"lat": parcel_bottom_right[0], "lng": parcel_bottom_right[1]},
-                        {"lat": parcel_bottom_left[0], "lng": parcel_bottom_left[1]},
-                    ],
-                    'color': color
-                }
-                parcels.append(parcel)
-
-        return parcels
+        corners = self.generate_parcel_array().tolist()
+        colors = self.parcel_colors()
+
+        return [
+            {
+                'coordinates': [{"lat": lat, "lng": lng} for lat, lng in parcel_corners],
+                'color': color
+            }
+            for parcel_corners, color in zip(corners, colors)
+        ]
@@ -0,0 +1,278 @@
+import math
+
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QBrush, QColor, QImage, QPen, QPainter
+from PyQt6.QtWidgets import QGraphicsItem, QGraphicsView
+
+# On-screen cell size (px) from which parcels are drawn one by one with outlines. Below it the
+# whole grid is one scaled image (one pixel per parcel), so painting does not depend on the count.
+DETAIL_MIN_PIXELS = 6.0
+
+# Wheel zoom of the grid view
+ZOOM_STEP = 1.25
+MAX_ZOOM = 200.0
+
+DEFAULT_COLOR = "#ffffff"
+
+
+class ParcelGridItem(QGraphicsItem):
+    """
+    The whole parcel grid as a single scene item.
+
+    Parcels are not items of their own: their geometry follows from the grid origin, parcel size
+    and gaps, hit tests are arithmetic (cell_at), and colours live in a flat row-major list that
+    is mirrored in a count_x x count_y image used for the low level-of-detail rendering.
+    """
+
+    def __init__(self, on_click=None):
+        super().__init__()
+        self.on_click = on_click
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+        self.count_x = 0
+        self.count_y = 0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.cell_width = 0.0
+        self.cell_height = 0.0
+        self.gap_x = 0.0
+        self.gap_y = 0.0
+
+        self.colors = []  # row-major parcel colours (#rrggbb)
+        self.image = QImage()
+        self._brushes = {}
+        self.outline_pen = QPen(QColor("black"), 0)  # cosmetic: one pixel at any zoom
+
+    # Geometry
+
+    @property
+    def pitch_x(self):
+        return self.cell_width + self.gap_x
+
+    @property
+    def pitch_y(self):
+        return self.cell_height + self.gap_y
+
+    def set_layout(self, count_x, count_y, offset_x, offset_y, cell_width, cell_height, gap_x, gap_y):
+        """
+        Place the grid. Returns True if the number of rows or columns changed (parcel ids are
+        row-major, so every colour is then reset to white and has to be set again).
+        """
+        self.prepareGeometryChange()
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.gap_x = gap_x
+        self.gap_y = gap_y
+
+        if (count_x, count_y) == (self.count_x, self.count_y):
+            self.update()
+            return False
+
+        self.count_x = count_x
+        self.count_y = count_y
+        self.colors = [DEFAULT_COLOR] * (count_x * count_y)
+        self.image = QImage(max(count_x, 1), max(count_y, 1), QImage.Format.Format_RGB32)
+        self.image.fill(QColor(DEFAULT_COLOR))
+        self.update()
+        return True
+
+    def boundingRect(self):
+        if not self.count_x or not self.count_y:
+            return QRectF()
+        width = self.count_x * self.pitch_x - self.gap_x
+        height = self.count_y * self.pitch_y - self.gap_y
+        # Slack for the cosmetic outline
+        return QRectF(self.offset_x - 1, self.offset_y - 1, width + 2, height + 2)
+
+    def cell_rect(self, parcel_id):
+        row, column = divmod(parcel_id, self.count_x)
+        return QRectF(
+            self.offset_x + column * self.pitch_x,
+            self.offset_y + row * self.pitch_y,
+            self.cell_width,
+            self.cell_height,
+        )
+
+    def cell_at(self, pos):
+        """Parcel id under the item position `pos`, or None for gaps and points outside the grid."""
+        if self.pitch_x <= 0 or self.pitch_y <= 0:
+            return None
+        x = pos.x() - self.offset_x
+        y = pos.y() - self.offset_y
+        column = math.floor(x / self.pitch_x)
+        row = math.floor(y / self.pitch_y)
+        if not (0 <= column < self.count_x and 0 <= row < self.count_y):
+            return None
+        if x - column * self.pitch_x > self.cell_width or y - row * self.pitch_y > self.cell_height:
+            return None
+        return row * self.count_x + column
+
+    def visible_range(self, rect):
+        """(first_column, last_column, first_row, last_row) of the cells intersecting `rect`."""
+        first_column = max(0, math.floor((rect.left() - self.offset_x) / self.pitch_x))
+        last_column = min(self.count_x - 1, math.floor((rect.right() - self.offset_x) / self.pitch_x))
+        first_row = max(0, math.floor((rect.top() - self.offset_y) / self.pitch_y))
+        last_row = min(self.count_y - 1, math.floor((rect.bottom() - self.offset_y) / self.pitch_y))
+        return first_column, last_column, first_row, last_row
+
+    # Colours
+
+    def _brush(self, color):
+        brush = self._brushes.get(color)
+        if brush is None:
+            brush = self._brushes[color] = QBrush(QColor(color))
+        return brush
+
+    def color(self, parcel_id):
+        return self.colors[parcel_id]
+
+    def set_color(self, parcel_id, color):
+        """Colour one parcel; only its own rectangle is repainted."""
+        color = QColor(color).name()
+        if self.colors[parcel_id] == color:
+            return
+        self.colors[parcel_id] = color
+        row, column = divmod(parcel_id, self.count_x)
+        self.image.setPixelColor(column, row, QColor(color))
+        self.update(self.cell_rect(parcel_id).adjusted(-1, -1, 1, 1))
+
+    def set_colors(self, colors):
+        """Replace all colours (row-major sequence of count_x * count_y colour names)."""
+        self.colors = [QColor(color).name() for color in colors]
+        for parcel_id, color in enumerate(self.colors):
+            row, column = divmod(parcel_id, self.count_x)
+            self.image.setPixelColor(column, row, QColor(color))
+        self.update()
+
+    def fill(self, color):
+        color = QColor(color)
+        self.colors = [color.name()] * (self.count_x * self.count_y)
+        self.image.fill(color)
+        self.update()
+
+    # Painting and input
+
+    def paint(self, painter, option, widget=None):
+        if not self.count_x or not self.count_y or self.pitch_x <= 0 or self.pitch_y <= 0:
+            return
+
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if min(self.cell_width, self.cell_height) * lod < DETAIL_MIN_PIXELS:
+            # Overview: one pixel per parcel, scaled over the grid (gaps are below a pixel here)
+            target = QRectF(
+                self.offset_x, self.offset_y,
+                self.count_x * self.pitch_x - self.gap_x, self.count_y * self.pitch_y - self.gap_y,
+            )
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+            painter.drawImage(target, self.image)
+            return
+
+        # Detail: only the exposed cells, one drawRects call per colour
+        first_column, last_column, first_row, last_row = self.visible_range(option.exposedRect)
+        rects_by_color = {}
+        for row in range(first_row, last_row + 1):
+            y = self.offset_y + row * self.pitch_y
+            row_start = row * self.count_x
+            for column in range(first_column, last_column + 1):
+                rect = QRectF(self.offset_x + column * self.pitch_x, y, self.cell_width, self.cell_height)
+                rects_by_color.setdefault(self.colors[row_start + column], []).append(rect)
+
+        painter.setPen(self.outline_pen)
+        for color, rects in rects_by_color.items():
+            painter.setBrush(self._brush(color))
+            painter.drawRects(rects)
+
+    def mousePressEvent(self, event):
+        parcel_id = self.cell_at(event.pos())
+        if parcel_id is None or self.on_click is None:
+            event.ignore()
+            return
+        self.on_click(event, parcel_id)
+
+
+class GridView(QGraphicsView):
+    """Graphics view of the parcel grid with wheel zoom around the cursor."""
+
+    def __init__(self, scene, parent=None):
+        super().__init__(scene, parent)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+
+    def fitInView(self, rect, mode=Qt.AspectRatioMode.IgnoreAspectRatio):
+        super().fitInView(rect, mode)
+        # Zoom is measured relative to the fitted view
+        self._fit_scale = self.transform().m11()
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            super().wheelEvent(event)
+            return
+        fit_scale = getattr(self, "_fit_scale", None) or self.transform().m11()
+        if fit_scale <= 0:
+            return
+        current = self.transform().m11() / fit_scale
+        target = min(MAX_ZOOM, max(1.0, current * ZOOM_STEP ** steps))
+        factor = target / current
+        self.scale(factor, factor)
+        event.accept()
+
+
+class ColorUsage:
+    """
+    Running colour counts of the grid editor, kept in step with ParcelField.parcel_colors.
+
+    add() and remove() are O(1), so click validation never scans the grid: uses of a colour
+    overall (`total`), per column (`in_column`) and the number of filled (non-white) parcels per
+    row are always at hand. rebuild() recounts once when the grid shape changes.
+    """
+
+    EMPTY_COLORS = ("white", DEFAULT_COLOR)
+
+    def __init__(self, count_x=0, count_y=0):
+        self.reset(count_x, count_y)
+
+    def reset(self, count_x, count_y):
+        self.count_x = count_x
+        self.count_y = count_y
+        self.by_color = {}  # colour -> parcels
+        self.by_column = {}  # (column, colour) -> parcels
+        self.filled_by_row = [0] * count_y  # row -> non-white parcels
+
+    def rebuild(self, count_x, count_y, parcel_colors):
+        """Recount from a parcel_id -> (colour, x, y) mapping."""
+        self.reset(count_x, count_y)
+        for parcel_id, color_info in parcel_colors.items():
+            self.add(parcel_id, color_info[0])
+
+    def _change(self, parcel_id, color, delta):
+        self.by_color[color] = self.by_color.get(color, 0) + delta
+        # Ids left over from a larger grid still count towards the colour totals, not the cells
+        if self.count_x and 0 <= parcel_id < self.count_x * self.count_y:
+            row, column = divmod(parcel_id, self.count_x)
+            key = (column, color)
+            self.by_column[key] = self.by_column.get(key, 0) + delta
+            if color not in self.EMPTY_COLORS:
+                self.filled_by_row[row] += delta
+
+    def add(self, parcel_id, color):
+        self._change(parcel_id, color, 1)
+
+    def remove(self, parcel_id, color):
+        self._change(parcel_id, color, -1)
+
+    def total(self, color):
+        return self.by_color.get(color, 0)
+
+    def in_column(self, column, color):
+        return self.by_column.get((column, color), 0)
+
+    def used_colors(self):
+        """Colour -> uses of every colour in use, white excluded."""
+        return {color: count for color, count in self.by_color.items() if count > 0 and color not in self.EMPTY_COLORS}
+
+    def rows_with_empty_parcels(self):
+        """0-based rows that still have at least one white or uncolored parcel."""
+        return [row for row, filled in enumerate(self.filled_by_row) if filled < self.count_x]
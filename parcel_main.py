@@ -1,16 +1,25 @@
+import time
+
+# Process start, used for the cold start times reported in the log; taken before the Qt imports,
+# which are most of the startup
+PROCESS_START = time.perf_counter()
+
 import sys
-from PyQt6.QtWidgets import QApplication, QMainWindow, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout, QWidget, QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsTextItem, QSplitter, QFormLayout, QPushButton, QGridLayout, QSizePolicy, QMessageBox, QGraphicsEllipseItem, QFileDialog
-from PyQt6.QtCore import Qt, QUrl, QEvent, pyqtSignal, QSystemSemaphore, QSharedMemory, QThread
+from PyQt6.QtWidgets import QApplication, QMainWindow, QLabel, QLineEdit, QVBoxLayout, QHBoxLayout, QWidget, QGraphicsScene, QGraphicsTextItem, QSplitter, QFormLayout, QPushButton, QGridLayout, QSizePolicy, QMessageBox, QGraphicsEllipseItem, QFileDialog
+from PyQt6.QtCore import Qt, QEvent, pyqtSignal, QSystemSemaphore, QSharedMemory, QThread, QCoreApplication
 from PyQt6.QtGui import QBrush, QColor, QIcon, QAction, QPixmap, QRegion, QPainterPath
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEngineSettings
-import time
 import logging
 from logging.handlers import RotatingFileHandler
+from tracing import configure_levels, start_queue_logging, get_tracer
+from parcel_grid import ParcelGridItem, GridView, ColorUsage
 import os
-import json
 import configparser
 from PyQt6.QtCore import QTranslator, QLocale
+
+# Largest grid the editor accepts (the grid is painted by a single item, see parcel_grid.py)
+MAX_COUNT_X = 500
+MAX_COUNT_Y = 500
+
 if getattr(sys, 'frozen', False):
     import pyi_splash
 
@@ -91,16 +100,17 @@ def create_logger():
     # Use the pre-generated log file name
     log_file = log_file_path
 
-    # Configure the root logger
+    # Configure the root logger; verbosity (root and per subsystem) comes from [Logging] in config.ini
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    configure_levels(resource_path("config.ini"), logger)
 
     # Prevent adding duplicate handlers
     if not hasattr(logger, 'handler_set'):
         handler = RotatingFileHandler(log_file, maxBytes=1000000, backupCount=3)
         formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        # Records are queued and written by a background listener, off the GUI thread
+        start_queue_logging(handler, logger)
         logger.handler_set = True  # Custom attribute to prevent re-adding handlers
 
     return logger
@@ -108,6 +118,10 @@ def create_logger():
 # Initialize the logger in the main module
 logger = create_logger()
 
+# Per-subsystem tracers (levels set in the [Logging] section of config.ini)
+field_tracer = get_tracer("parcel.field")
+state_tracer = get_tracer("parcel.state")
+
 
 class AppState:
     def __init__(self):
@@ -325,24 +339,30 @@ class ParcelField(QWidget):
         logger.debug("ParcelField initialized")
 
         self.scene = QGraphicsScene(self)
-        self.view = QGraphicsView(self.scene, self)
+        self.view = GridView(self.scene, self)
 
         layout = QVBoxLayout()
         layout.addWidget(self.view)
         self.setLayout(layout)
         self.margin = 20
 
-        self.parcels = []
+        self.count_x = 0
+        self.count_y = 0
         self.current_color = QColor("white")
         self.parcel_colors = {}  # Dictionary to store parcel color mappings
-        self.parcel_identifiers = {}  # Initialize the dictionary for parcel identifiers
+        self.color_usage = ColorUsage()  # Counters over parcel_colors (per colour, column and row)
         self.color_buttons = [] 
         self.corner_labels = {}  # Dictionary to store references to corner labels
+        self.corner_circles = {}  # Circles drawn behind the corner labels
+
+        # Scene items reused across update_field calls: the whole grid is one item
+        self.grid = ParcelGridItem(on_click=self.on_parcel_click)
+        self.scene.addItem(self.grid)
+        self.axis_labels = None  # (x_label, y_label)
 
 
     def update_field(self, width, height, gap_x, gap_y, count_x, count_y, structure_changed=False):
-        logger.debug(f"updating field with the value of: {width, height, gap_x, gap_y, count_x, count_y}")
-        saved_colors = self.get_colored_parcels()
+        field_tracer.debug("updating field", width=width, height=height, gap_x=gap_x, gap_y=gap_y, count_x=count_x, count_y=count_y)
         self.count_x = count_x
         self.count_y = count_y
 
@@ -367,40 +387,42 @@ class ParcelField(QWidget):
         offset_x = self.margin + (available_width - (count_x * scaled_width + (count_x - 1) * scaled_gap_x)) / 2
         offset_y = self.margin
 
-        self.scene.clear()
-        self.parcels.clear()
-        self.parcel_identifiers.clear()
-
-        for j in range(count_y):
-            for i in range(count_x):
-                x = offset_x + i * (scaled_width + scaled_gap_x)
-                y = offset_y + j * (scaled_height + scaled_gap_y)
-                parcel = QGraphicsRectItem(x, y, scaled_width, scaled_height)
-                parcel.setBrush(QColor("white"))
-                parcel.setFlag(QGraphicsRectItem.GraphicsItemFlag.ItemIsSelectable)
-                parcel.setFlag(QGraphicsRectItem.GraphicsItemFlag.ItemIsFocusable)
-                parcel_id = j * count_x + i
-                self.parcel_identifiers[parcel] = parcel_id
-                parcel.mousePressEvent = self.on_parcel_click
-                self.scene.addItem(parcel)
-                self.parcels.append(parcel)
+        # Geometry only: the grid item computes every parcel rectangle from these numbers
+        ids_changed = self.grid.set_layout(
+            count_x, count_y, offset_x, offset_y, scaled_width, scaled_height, scaled_gap_x, scaled_gap_y
+        )
 
         self.add_axis_labels(total_parcel_width, total_parcel_height, scale_factor, offset_x, offset_y)
-        self.view.setScene(self.scene)
-        self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
         self.add_corner_labels(scaled_width, scaled_height, scaled_gap_x, scaled_gap_y, offset_x, offset_y, count_x, count_y)
-        self.restore_parcels_with_colors(saved_colors)
+
+        # The scene rect only ever grows on its own; shrink it to the grid so fitInView matches it
+        self.scene.setSceneRect(self.scene.itemsBoundingRect())
+        self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
         if structure_changed:
-            valid_parcel_ids = set(self.parcel_identifiers.values())
-            self.parcel_colors = {pid: color_info for pid, color_info in self.parcel_colors.items() if pid in valid_parcel_ids}
+            total = count_x * count_y
+            self.parcel_colors = {pid: color_info for pid, color_info in self.parcel_colors.items() if 0 <= pid < total}
+        if structure_changed or ids_changed:
+            # Rows and columns of the ids moved: recount once
+            self.color_usage.rebuild(count_x, count_y, self.parcel_colors)
 
         # Restore colors for the parcels
-        self.restore_parcels_with_colors(self.parcel_colors)
+        if ids_changed:
+            # Parcel ids are row-major, so a new column count moves ids between cells: repaint all of them
+            self.repaint_parcels()
+        else:
+            self.restore_parcels_with_colors(self.parcel_colors)
 
+    def repaint_parcels(self):
+        """Set every parcel's colour from parcel_colors (white when uncolored)."""
+        colors = ["white"] * (self.count_x * self.count_y)
+        for parcel_id, color_info in self.parcel_colors.items():
+            if 0 <= parcel_id < len(colors):
+                colors[parcel_id] = color_info[0]
+        self.grid.set_colors(colors)
 
-    
     def add_corner_labels(self, parcel_width, parcel_height, gap_x, gap_y, offset_x, offset_y, count_x, count_y):
-        """Add A, B, C, D markers at the corners of the parcel grid."""
+        """Add (or move) A, B, C, D markers at the corners of the parcel grid."""
         logger.debug("adding corner labels A, B, C, D")
 
         # Coordinates for A (Top-left corner of the first parcel)
@@ -424,11 +446,19 @@ class ParcelField(QWidget):
         self.add_label_to_corner("D", x_d, y_d)
 
     def add_label_to_corner(self, text, x, y):
-        """Helper function to add a label with a circle at a given position."""
-        logger.debug(f"Adding label {text} at position ({x}, {y})")
-        
-        # Draw a small circle
+        """Helper function to add a label with a circle at a given position (or move an existing one)."""
+        field_tracer.sampled("adding label", every=100, text=text, x=x, y=y)
+
         circle_radius = 10
+        if text in self.corner_labels:
+            # Already in the scene: only the position changes
+            self.corner_circles[text].setRect(x - circle_radius, y - circle_radius, circle_radius * 2, circle_radius * 2)
+            label = self.corner_labels[text]
+            bounding_rect = label.boundingRect()
+            label.setPos(x - bounding_rect.width() / 2, y - bounding_rect.height() / 2)
+            return
+
+        # Draw a small circle
         circle = QGraphicsEllipseItem(x - circle_radius, y - circle_radius, circle_radius * 2, circle_radius * 2)
         circle.setBrush(QBrush(Qt.GlobalColor.white))
         self.scene.addItem(circle)
@@ -446,28 +476,34 @@ class ParcelField(QWidget):
         label.setDefaultTextColor(Qt.GlobalColor.black)
         self.scene.addItem(label)
 
-        # Store the label in the corner_labels dictionary
+        # Store the label (and its circle) so later updates can move them
         self.corner_labels[text] = label
+        self.corner_circles[text] = circle
 
 
 
     def add_axis_labels(self, total_width, total_height, scale_factor, offset_x, offset_y):
-        logger.debug(f"adding axis labels with the value of: {total_width, total_height, scale_factor, offset_x, offset_y}")
+        field_tracer.debug("adding axis labels", total_width=total_width, total_height=total_height, scale_factor=scale_factor, offset_x=offset_x, offset_y=offset_y)
         displayed_width = total_width * scale_factor
         displayed_height = total_height * scale_factor
 
-        x_label = QGraphicsTextItem(self.tr("Total X: {0}m").format(total_width))
-        y_label = QGraphicsTextItem(self.tr("Total Y: {0}m").format(total_height))
+        if self.axis_labels is None:
+            x_label = QGraphicsTextItem()
+            y_label = QGraphicsTextItem()
+            if app_state.night_mode:
+                x_label.setDefaultTextColor(QColor("white"))
+                y_label.setDefaultTextColor(QColor("white"))
+            self.scene.addItem(x_label)
+            self.scene.addItem(y_label)
+            self.axis_labels = (x_label, y_label)
+        x_label, y_label = self.axis_labels
+
+        x_label.setPlainText(self.tr("Total X: {0}m").format(total_width))
+        y_label.setPlainText(self.tr("Total Y: {0}m").format(total_height))
 
         x_label.setPos(offset_x + displayed_width / 2 - x_label.boundingRect().width() / 2, self.total_height - self.margin + 5)
         y_label.setPos(self.margin - y_label.boundingRect().width() - 5, offset_y + displayed_height / 2 - y_label.boundingRect().height() / 2)
 
-        self.scene.addItem(x_label)
-        self.scene.addItem(y_label)
-
-        if app_state.night_mode:
-            self.update_text_item_colors("white")
-
     def set_current_color(self, button_widget, color):
         if isinstance(color, QColor):
             self.current_color = color
@@ -485,14 +521,30 @@ class ParcelField(QWidget):
         self.current_color_button = button_widget
 
 
+    def set_parcel_color(self, parcel_id, color_info):
+        """Record a parcel's (colour, x, y) and keep the usage counters in step."""
+        previous = self.parcel_colors.get(parcel_id)
+        if previous is not None:
+            self.color_usage.remove(parcel_id, previous[0])
+        self.parcel_colors[parcel_id] = color_info
+        self.color_usage.add(parcel_id, color_info[0])
+
+    def remove_parcel_color(self, parcel_id):
+        previous = self.parcel_colors.pop(parcel_id, None)
+        if previous is not None:
+            self.color_usage.remove(parcel_id, previous[0])
+
+    def clear_parcel_colors(self):
+        self.parcel_colors.clear()
+        self.color_usage.reset(self.count_x, self.count_y)
+
     def get_colored_parcels(self):
         logger.debug("getting colored parcels")
         return self.parcel_colors
 
     def reset_parcels(self):
         logger.debug("reseting parcels")
-        for parcel in self.parcels:
-            parcel.setBrush(QColor("white"))
+        self.grid.fill("white")
 
     def restore_parcels_with_colors(self, parcel_data):
         """
@@ -500,95 +552,80 @@ class ParcelField(QWidget):
         """
         logger.debug("Restoring parcel colors")
 
-        # Create a mapping from parcel_id to parcel
-        parcel_id_to_parcel = {self.parcel_identifiers[parcel]: parcel for parcel in self.parcels}
-
-        for parcel_id_str, value in parcel_data.items():
+        total = self.count_x * self.count_y
+        for parcel_id_str, value in list(parcel_data.items()):
             parcel_id = int(parcel_id_str)
             color, x, y = value
 
-            # Get the parcel directly from the mapping
-            parcel = parcel_id_to_parcel.get(parcel_id)
-            if parcel:
-                parcel.setBrush(QBrush(QColor(color)))
-                self.parcel_colors[parcel_id] = (color, x, y)
+            # Parcel ids index the grid directly
+            if 0 <= parcel_id < total:
+                self.grid.set_color(parcel_id, color)
+                self.set_parcel_color(parcel_id, (color, x, y))
 
-    def on_parcel_click(self, event):
+    def on_parcel_click(self, event, parcel_id):
         logger.debug(self.tr("A parcel clicked"))
-        parcel = self.scene.itemAt(event.scenePos(), self.view.transform())
-
-        if isinstance(parcel, QGraphicsRectItem):
-            parcel_id = self.parcel_identifiers.get(parcel)  # Get the parcel ID using the parcel identifier dictionary
-
-            if parcel_id is not None:
-                # Left-click changes the parcel's color to the currently selected color
-                if event.button() == Qt.MouseButton.LeftButton:
-                    # Calculate the row and column numbers for the clicked parcel
-                    column_number = parcel_id % self.count_x  # Calculate column
-                    row_number = parcel_id // self.count_x  # Calculate row
-                    user_choice = None  # Initialize user_choice to avoid UnboundLocalError
-
-                    # Initialize warning message
-                    warning_message = ""
-
-                    # Check for the same color in the entire column
-                    for row in range(self.count_y):
-                        check_parcel_id = row * self.count_x + column_number
-                        if check_parcel_id in self.parcel_colors:
-                            check_parcel_color = self.parcel_colors[check_parcel_id][0]
-                            if check_parcel_color == self.current_color.name():
-                                warning_message += self.tr("Another parcel in the same column has the same color.\n")
-                                break  # Exit loop once a match is found
-
-                    # If the warning condition is triggered, ask the user
-                    if warning_message:
-                        user_choice = self.show_warning_rep(
-                            self.tr("Duplicate Color"),
-                            self.tr("{0} Do you want to apply this color?").format(warning_message)
-                        )
-                        # If the user clicks "Cancel", return without applying the color
-                        if user_choice == self.tr("Cancel"):
-                            return  # Exit without applying the color
-
-                    # Check if the current color has already been used `count_x` times (the column count)
-                    color_usage_count = sum(
-                        1 for color_data in self.parcel_colors.values()
-                        if color_data[0] == self.current_color.name()
-                    )
-
-                    if color_usage_count >= self.count_x:
-                        # Notify the user about the usage count and ask if they want to exceed it
-                        user_choice = self.show_warning_rep(
-                            self.tr("Color Usage Limit Reached"),
-                            self.tr(
-                                "The color '{0}' has been used {1} times, which is as much as the column number ({2}).\nDo you want to exceed this limit?"
-                            ).format(self.hex_to_color_name(self.current_color.name()), color_usage_count, self.count_x)
-                        )
-                        if user_choice == self.tr("Cancel"):
-                            return  # Prevent applying the color
-
-                    # Save the previous color in case we need to revert
-                    previous_color = self.parcel_colors.get(parcel_id, (self.tr("white"), parcel.rect().x(), parcel.rect().y()))[0]
-                    
-                    # Apply the color
-                    self.parcel_colors[parcel_id] = (self.current_color.name(), parcel.rect().x(), parcel.rect().y())
-                    parcel.setBrush(QBrush(self.current_color))
-
-                    # If the user cancels, revert to the previous color (though this should never reach here as we handle cancel above)
-                    if user_choice == self.tr("Cancel"):
-                        self.parcel_colors[parcel_id] = (previous_color, parcel.rect().x(), parcel.rect().y())
-                        parcel.setBrush(QBrush(QColor(previous_color)))
-
-                # Right-click resets the parcel's color to white
-                elif event.button() == Qt.MouseButton.RightButton:
-                    if parcel_id in self.parcel_colors:
-                        del self.parcel_colors[parcel_id]
-                    parcel.setBrush(QBrush(QColor(self.tr("white"))))
+        # The grid item resolved the click to a parcel id arithmetically
+        parcel_rect = self.grid.cell_rect(parcel_id)
+
+        # Left-click changes the parcel's color to the currently selected color
+        if event.button() == Qt.MouseButton.LeftButton:
+            # Calculate the row and column numbers for the clicked parcel
+            column_number = parcel_id % self.count_x  # Calculate column
+            row_number = parcel_id // self.count_x  # Calculate row
+            user_choice = None  # Initialize user_choice to avoid UnboundLocalError
+
+            # Initialize warning message
+            warning_message = ""
+
+            # Check for the same color in the entire column (counted, not scanned)
+            if self.color_usage.in_column(column_number, self.current_color.name()) > 0:
+                warning_message += self.tr("Another parcel in the same column has the same color.\n")
+
+            # If the warning condition is triggered, ask the user
+            if warning_message:
+                user_choice = self.show_warning_rep(
+                    self.tr("Duplicate Color"),
+                    self.tr("{0} Do you want to apply this color?").format(warning_message)
+                )
+                # If the user clicks "Cancel", return without applying the color
+                if user_choice == self.tr("Cancel"):
+                    return  # Exit without applying the color
+
+            # Check if the current color has already been used `count_x` times (the column count)
+            color_usage_count = self.color_usage.total(self.current_color.name())
+
+            if color_usage_count >= self.count_x:
+                # Notify the user about the usage count and ask if they want to exceed it
+                user_choice = self.show_warning_rep(
+                    self.tr("Color Usage Limit Reached"),
+                    self.tr(
+                        "The color '{0}' has been used {1} times, which is as much as the column number ({2}).\nDo you want to exceed this limit?"
+                    ).format(self.hex_to_color_name(self.current_color.name()), color_usage_count, self.count_x)
+                )
+                if user_choice == self.tr("Cancel"):
+                    return  # Prevent applying the color
+
+            # Save the previous color in case we need to revert
+            previous_color = self.parcel_colors.get(parcel_id, (self.tr("white"), parcel_rect.x(), parcel_rect.y()))[0]
+
+            # Apply the color
+            self.set_parcel_color(parcel_id, (self.current_color.name(), parcel_rect.x(), parcel_rect.y()))
+            self.grid.set_color(parcel_id, self.current_color)
+
+            # If the user cancels, revert to the previous color (though this should never reach here as we handle cancel above)
+            if user_choice == self.tr("Cancel"):
+                self.set_parcel_color(parcel_id, (previous_color, parcel_rect.x(), parcel_rect.y()))
+                self.grid.set_color(parcel_id, previous_color)
+
+        # Right-click resets the parcel's color to white
+        elif event.button() == Qt.MouseButton.RightButton:
+            self.remove_parcel_color(parcel_id)
+            self.grid.set_color(parcel_id, "white")
 
         event.accept()
 
     def show_warning(self, title, content):
-        logger.debug(f"showing warning with the value of: {title, content}")
+        logger.debug("showing warning with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setText(self.tr(title))
@@ -610,7 +647,7 @@ class ParcelField(QWidget):
             return "Cancel"
     
     def show_warning_rep(self, title, content):
-        logger.debug(f"showing warning with the value of: {title, content}")
+        logger.debug("showing warning with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setText(self.tr(title))  # Use self.tr for title translation
@@ -666,30 +703,10 @@ class ParcelField(QWidget):
         """
         logger.debug("Checking for overused colors and rows with empty parcels.")
 
-        # Initialize a dictionary to count usage of each color
-        color_usage_counts = {}
-
-        # Initialize a list to keep track of rows with empty parcels
-        empty_rows = []
-
-        # Count the usage of each color (excluding white)
-        for color_data in self.parcel_colors.values():
-            color = color_data[0]
-            if color != "white":
-                color_usage_counts[color] = color_usage_counts.get(color, 0) + 1
-
-        # Check for empty parcels in each row
-        for row in range(self.count_y):
-            empty_parcel_found = False
-
-            # Check each parcel in the row
-            for parcel_id in range(row * self.count_x, (row + 1) * self.count_x):
-                if parcel_id not in self.parcel_colors or self.parcel_colors[parcel_id][0] == "white":
-                    empty_parcel_found = True
-                    break  # No need to check the rest of the row
-
-            if empty_parcel_found:
-                empty_rows.append(row + 1)  # Use row+1 for display (1-indexed)
+        # Usage of each color (excluding white) and the rows with empty parcels, both from the
+        # counters maintained on every assignment instead of a scan of the grid
+        color_usage_counts = self.color_usage.used_colors()
+        empty_rows = [row + 1 for row in self.color_usage.rows_with_empty_parcels()]  # Use row+1 for display (1-indexed)
 
         # Check if any color exceeds the number of columns (count_x)
         overused_colors = {}
@@ -729,12 +746,12 @@ class ParcelField(QWidget):
         """
         Fill all parcels that have not been clicked (not colored) with brown color.
         """
-        for parcel in self.parcels:
-            parcel_id = self.parcel_identifiers[parcel]
+        for parcel_id in range(self.count_x * self.count_y):
             if parcel_id not in self.parcel_colors:
                 # Fill with default brown color if not already colored
-                parcel.setBrush(QBrush(QColor("white")))
-                self.parcel_colors[parcel_id] = ("white", parcel.rect().x(), parcel.rect().y())
+                self.grid.set_color(parcel_id, "white")
+                parcel_rect = self.grid.cell_rect(parcel_id)
+                self.set_parcel_color(parcel_id, ("white", parcel_rect.x(), parcel_rect.y()))
 
     def update_text_item_colors(self, color):
         """Update the text color of all QGraphicsTextItem elements in the scene."""
@@ -771,12 +788,10 @@ class MainWindow(QMainWindow):
 
         self.setWindowTitle("Parcel Planner")
         self.translator = QTranslator()
-        self.map_view = QWebEngineView()
-        self.map_view.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-        self.map_view.setUrl(QUrl("http://localhost:8000/map.html"))
-        from planner import PlannerMainWindow
-        self.second_window = PlannerMainWindow()
-        self.second_window.hide()
+        # The planner window (map view, tile server, connectivity monitor) is built on the first
+        # 'Plan' click, see _build_planner_window
+        self.second_window = None
+        self._startup_reported = False
         self.file_opened = False
         self.prev_count_x = None
         self.prev_count_y = None
@@ -968,6 +983,33 @@ class MainWindow(QMainWindow):
         super().showEvent(event)
         self.setWindowState(Qt.WindowState.WindowMaximized)  # Ensure the window is in maximized state
 
+        if not self._startup_reported:
+            self._startup_reported = True
+            logger.info("Cold start: grid editor shown after %.0f ms", (time.perf_counter() - PROCESS_START) * 1000)
+
+    def _build_planner_window(self):
+        """
+        Create the planner window on first use (imports the map stack). Returns it.
+
+        Building it blocks the GUI thread, so it is only done when the user asks for the planner,
+        never while the grid is being edited.
+        """
+        if self.second_window is None:
+            started = time.perf_counter()
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                from planner import PlannerMainWindow
+                self.second_window = PlannerMainWindow()
+                self.second_window.hide()
+            finally:
+                QApplication.restoreOverrideCursor()
+            logger.info(
+                "Planner window ready after %.0f ms (built in %.0f ms)",
+                (time.perf_counter() - PROCESS_START) * 1000,
+                (time.perf_counter() - started) * 1000,
+            )
+        return self.second_window
+
     def load_settings_from_config(self):
         config = configparser.ConfigParser()
         if os.path.exists(self.config_file):
@@ -1161,28 +1203,29 @@ class MainWindow(QMainWindow):
 
         # Create a file dialog for selecting the file to open
         file_dialog = QFileDialog(self)
-        file_dialog.setWindowTitle("Open Text File")
-        file_dialog.setNameFilter("Text Files (*.txt)")
+        file_dialog.setWindowTitle("Open Planner State")
+        file_dialog.setNameFilters(["Planner State (*.ppstate *.txt)", "All Files (*)"])
         file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)  # Only allow selecting existing files
 
         if file_dialog.exec():  # If a file is selected
             file_path = file_dialog.selectedFiles()[0]
-            logger.info(f"File selected: {file_path}")
+            logger.info("File selected: %s", file_path)
 
-            # Open the file and parse the JSON data
+            # Open the file and parse the state (binary .ppstate or JSON)
             try:
-                with open(file_path, 'r') as file:
-                    loaded_data = json.load(file)  # Parse the JSON data
-                    logger.info(f"Loaded data: {loaded_data}")
-                    
-                    # Call a method to restore the state using the loaded data
-                    self.restore_app_state(loaded_data)
+                # Imported here: it pulls in numpy, which the grid editor does not need at startup
+                from state_format import load_state
+                loaded_data = load_state(file_path)
+                state_tracer.debug("loaded app state", file=file_path, keys=list(loaded_data))
+
+                # Call a method to restore the state using the loaded data
+                self.restore_app_state(loaded_data)
             except Exception as e:
-                logger.error(f"Error opening or parsing file: {e}")
+                logger.error("Error opening or parsing file: %s", e)
                 self.show_warning("Open Failed", f"Failed to open app state: {e}")
 
     def restore_app_state(self, data):
-        logger.debug(f"Restoring app state with data: {data}")
+        state_tracer.debug("restoring app state", keys=list(data))
 
         try:
 
@@ -1218,7 +1261,7 @@ class MainWindow(QMainWindow):
             self.count_x_input.setText(str(self.count_x))
             self.count_y_input.setText(str(self.count_y))
 
-            logger.debug(f"Restored UI fields: {self.width}, {self.height}, {self.gap_x}, {self.gap_y}, {self.count_x}, {self.count_y}")
+            logger.debug("Restored UI fields: %s, %s, %s, %s, %s, %s", self.width, self.height, self.gap_x, self.gap_y, self.count_x, self.count_y)
 
             # Unblock signals after all fields have been updated
             self.width_input.blockSignals(False)
@@ -1244,7 +1287,7 @@ class MainWindow(QMainWindow):
             self.show_info("Restore Successful", "Planner state has been restored successfully.")
             self.file_opened = True
         except Exception as e:
-            logger.error(f"Error restoring app state: {e}")
+            logger.error("Error restoring app state: %s", e)
             self.show_warning("Restore Failed", f"Failed to restore app state: {e}")
             
 
@@ -1267,17 +1310,17 @@ class MainWindow(QMainWindow):
         file_dialog = QFileDialog(self)
         file_dialog.setWindowTitle("Save File")
         file_dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
-        file_dialog.setNameFilter("Text Files (*.txt)")
-        file_dialog.setDefaultSuffix("txt")  # Default file extension
+        file_dialog.setNameFilters(["Planner State (*.ppstate)", "Text Files (*.txt)"])
+        file_dialog.setDefaultSuffix("ppstate")  # Default file extension
 
         # Generate a default filename based on the current timestamp
-        default_file_name = f"app_state_{time.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+        default_file_name = f"app_state_{time.strftime('%Y-%m-%d_%H-%M-%S')}.ppstate"
         file_dialog.selectFile(default_file_name)  # Automatically fill in the file name
 
         # If the user selects a file and clicks save
         if file_dialog.exec():
             save_path = file_dialog.selectedFiles()[0]  # Get the file path
-            logger.info(f"Saving file to: {save_path}")
+            logger.info("Saving file to: %s", save_path)
 
             # Collect the application state
             app_state_data = {
@@ -1300,17 +1343,17 @@ class MainWindow(QMainWindow):
             }
 
             try:
-                # Save the app state data to the chosen file in JSON format
-                with open(save_path, 'w') as save_file:
-                    json.dump(app_state_data, save_file, indent=4)
-                logger.info(f"Application state successfully saved to {save_path}")
+                # Save the app state data: compact binary for .ppstate, JSON for anything else
+                from state_format import save_state
+                save_state(save_path, app_state_data)
+                logger.info("Application state successfully saved to %s", save_path)
                 self.show_info("Save Successful", "App state has been saved successfully.")
             except Exception as e:
-                logger.error(f"Failed to save file: {e}")
+                logger.error("Failed to save file: %s", e)
                 self.show_warning("Save Failed", f"Failed to save app state: {e}")
 
     def show_info(self, title, content):
-            logger.debug(f"showing info with the value of: {title, content}")
+            logger.debug("showing info with the value of: %s", (title, content))
             msg = QMessageBox()
             msg.setIcon(QMessageBox.Icon.Information)  # Set the icon to Information
             msg.setText(title)
@@ -1324,7 +1367,7 @@ class MainWindow(QMainWindow):
                 print("User clicked OK")
 
     def show_warning(self, title, content):
-        logger.debug(f"showing warning with the value of: {title, content}")
+        logger.debug("showing warning with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setText(self.tr(title))  # Use self.tr for title translation
@@ -1355,7 +1398,7 @@ class MainWindow(QMainWindow):
             self.width = new_width  # Update only if the conversion is successful
         except ValueError:
             if self.width_input.text() != "":
-                logger.error(f"Invalid input for width: {self.width_input.text()}")
+                logger.error("Invalid input for width: %s", self.width_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for width: {self.width_input.text()}")
                 self.width_input.setText(str(self.width))  # Revert to last valid input
             valid_inputs = False
@@ -1365,7 +1408,7 @@ class MainWindow(QMainWindow):
             self.height = new_height
         except ValueError:
             if self.height_input.text() != "":
-                logger.error(f"Invalid input for height: {self.height_input.text()}")
+                logger.error("Invalid input for height: %s", self.height_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for height: {self.height_input.text()}")
                 self.height_input.setText(str(self.height))
             valid_inputs = False
@@ -1375,7 +1418,7 @@ class MainWindow(QMainWindow):
             self.gap_x = new_gap_x
         except ValueError:
             if self.gap_x_input.text() != "":
-                logger.error(f"Invalid input for gap X: {self.gap_x_input.text()}")
+                logger.error("Invalid input for gap X: %s", self.gap_x_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for gap X: {self.gap_x_input.text()}")
                 self.gap_x_input.setText(str(self.gap_x))
             valid_inputs = False
@@ -1385,7 +1428,7 @@ class MainWindow(QMainWindow):
             self.gap_y = new_gap_y
         except ValueError:
             if self.gap_y_input.text() != "":
-                logger.error(f"Invalid input for gap Y: {self.gap_y_input.text()}")
+                logger.error("Invalid input for gap Y: %s", self.gap_y_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for gap Y: {self.gap_y_input.text()}")
                 self.gap_y_input.setText(str(self.gap_y))
             valid_inputs = False
@@ -1396,13 +1439,13 @@ class MainWindow(QMainWindow):
                 structure_changed = True
             self.prev_count_x = new_count_x
             self.count_x = new_count_x
-            if int(self.count_x_input.text()) > 20:
-                self.count_x = 20
+            if int(self.count_x_input.text()) > MAX_COUNT_X:
+                self.count_x = MAX_COUNT_X
             elif int(self.count_x_input.text()) == 0:
                 self.count_x = 1
         except ValueError:
             if self.count_x_input.text() != "":
-                logger.error(f"Invalid input for count X: {self.count_x_input.text()}")
+                logger.error("Invalid input for count X: %s", self.count_x_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for count X: {self.count_x_input.text()}")
                 self.count_x_input.setText(str(self.count_x))
             valid_inputs = False
@@ -1413,13 +1456,13 @@ class MainWindow(QMainWindow):
                 structure_changed = True
             self.prev_count_y = new_count_y
             self.count_y = new_count_y
-            if int(self.count_y_input.text()) > 10:
-                self.count_y = 10
+            if int(self.count_y_input.text()) > MAX_COUNT_Y:
+                self.count_y = MAX_COUNT_Y
             elif int(self.count_y_input.text()) == 0:
                 self.count_y = 1
         except ValueError:
             if self.count_y_input.text() != "":
-                logger.error(f"Invalid input for count Y: {self.count_y_input.text()}")
+                logger.error("Invalid input for count Y: %s", self.count_y_input.text())
                 self.show_warning("Invalid Input", f"Invalid input for count Y: {self.count_y_input.text()}")
                 self.count_y_input.setText(str(self.count_y))
             valid_inputs = False
@@ -1434,7 +1477,7 @@ class MainWindow(QMainWindow):
         """
         Dynamically update the number of color buttons based on count_y value.
         """
-        logger.debug(f"Updating color buttons to match count_y={count_y}")
+        logger.debug("Updating color buttons to match count_y=%s", count_y)
 
         # Remove all current color buttons from the layout
         for i in reversed(range(self.color_layout.count())):
@@ -1442,8 +1485,8 @@ class MainWindow(QMainWindow):
             if widget is not None:
                 widget.setParent(None)
 
-        # Now, create new buttons according to the count_y value
-        for i in range(count_y):
+        # Now, create new buttons according to the count_y value (one per liquid, at most one per colour)
+        for i in range(min(count_y, len(self.color_button_widgets))):
             button_color = self.color_button_widgets[i].color_name
             button_widget = self.color_button_widgets[i]
             self.color_layout.addWidget(button_widget, i // 2, i % 2)
@@ -1453,7 +1496,7 @@ class MainWindow(QMainWindow):
 
 
     def show_warning(self, title, content):
-        logger.debug(f"showing warning with the value of: {title, content}")
+        logger.debug("showing warning with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setText(title)
@@ -1469,14 +1512,14 @@ class MainWindow(QMainWindow):
     def clear_parcels(self):
         logger.debug("clearing parcels")
         self.parcel_field.reset_parcels()
-        self.parcel_field.parcel_colors.clear()
+        self.parcel_field.clear_parcel_colors()
 
     def set_button_names(self, button_names):
         logger.debug("setting button name")
         self.button_names = button_names
 
     def initialize_params(self, app_state):
-        logger.debug(f"initializing with the params: {app_state}")
+        logger.debug("initializing with the params: %s", app_state)
         print(app_state.count_x)
         self.width = app_state.width
         self.height = app_state.height
@@ -1516,7 +1559,7 @@ class MainWindow(QMainWindow):
         self.restore_state()
         
     def planning(self):
-        logger.debug(f"changing page to planning")
+        logger.debug("changing page to planning")
         # Before moving to the planning window, check if all colors are used
         # Fill non-clicked parcels with white before switching to the planning window
         self.parcel_field.fill_non_clicked_parcels()
@@ -1561,7 +1604,8 @@ class MainWindow(QMainWindow):
             self.count_y,
             self.colored_parcels
         )
-        # Initialize second window with saved state
+        # Initialize second window with saved state (built on the first click)
+        self._build_planner_window()
         self.second_window.initialize_with_parcels(sorted_parcel_dict)
         self.second_window.initialize_params(app_state, self.translator)
         load_translations(QApplication.instance())  # Reapply the translation to the app
@@ -1576,7 +1620,7 @@ class MainWindow(QMainWindow):
         self.hide()
 
     def restore_state(self):
-        logger.debug(f"restoring state")
+        logger.debug("restoring state")
         # Restore the button names and layout parameters
         self.button_names = app_state.button_names
         self.width_input.setText(str(app_state.width))
@@ -1623,13 +1667,17 @@ class MainWindow(QMainWindow):
             self.save_config()
             event.accept()  # Close the window
         elif user_choice == "quit_without_saving":
-            self.second_window.map_widget.save_map_coordinates()
-            self.second_window.save_config()
+            if self.second_window is not None:
+                self.second_window.map_widget.save_map_coordinates()
+                self.second_window.save_config()
             event.accept()  # Close the window without saving
         else:
             event.ignore()  # Cancel the close event
 
 if __name__ == "__main__":
+    # QtWebEngine is imported lazily (with the planner window), after the QApplication exists;
+    # it requires shared OpenGL contexts to be enabled before that
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
 
     # Set application icon
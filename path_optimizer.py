@@ -0,0 +1,347 @@
+import math
+import time
+import numpy as np
+from projection import extend_segments
+
+# Default time budget (seconds) for the 2-opt / Or-opt improvement stage
+DEFAULT_TIME_BUDGET_S = 0.1
+
+# Improvements smaller than this (meters, or seconds with a cost model) are treated as noise
+IMPROVEMENT_EPS = 1e-6
+
+
+class EndpointGridIndex:
+    """
+    Uniform grid bucket index over 2D points with removal and nearest-neighbour queries.
+    Used to find the closest unvisited pass endpoint without scanning every pass.
+    """
+
+    def __init__(self, points_xy, cell_size=None):
+        self.points = np.asarray(points_xy, dtype=np.float64).reshape(-1, 2)
+        self.remaining = len(self.points)
+
+        if self.remaining == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0
+            self.max_ring = 0
+            self.buckets = {}
+            return
+
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+
+        # Aim for roughly two points per cell
+        if cell_size is None:
+            area = max(extent[0], 1e-3) * max(extent[1], 1e-3)
+            cell_size = math.sqrt(2.0 * area / self.remaining)
+        self.cell_size = max(float(cell_size), 1e-3)
+
+        cells = np.floor((self.points - self.origin) / self.cell_size).astype(np.int64)
+        self.max_ring = int(cells.max()) + 1
+
+        self.buckets = {}
+        for idx, (cx, cy) in enumerate(cells.tolist()):
+            self.buckets.setdefault((cx, cy), set()).add(idx)
+        self._cells = cells
+
+    def remove(self, idx):
+        """Remove a point from the index (no-op if already removed)."""
+        key = (int(self._cells[idx, 0]), int(self._cells[idx, 1]))
+        bucket = self.buckets.get(key)
+        if bucket is not None and idx in bucket:
+            bucket.discard(idx)
+            if not bucket:
+                del self.buckets[key]
+            self.remaining -= 1
+
+    def nearest(self, x, y):
+        """
+        Return (index, distance) of the closest remaining point, or (None, inf) if empty.
+        Searches rings of cells outwards and stops once no closer point can exist.
+        """
+        if self.remaining <= 0:
+            return None, float('inf')
+
+        cx = int(math.floor((x - self.origin[0]) / self.cell_size))
+        cy = int(math.floor((y - self.origin[1]) / self.cell_size))
+
+        # If the query lies outside the grid, start from the first ring that can contain points
+        outside = max(-cx, cx - self.max_ring, -cy, cy - self.max_ring, 0)
+        ring = max(outside - 1, 0)
+        far_ring = outside + self.max_ring + 1
+
+        best_idx = None
+        best_dist = float('inf')
+
+        while ring <= far_ring:
+            # Any point in this ring is at least (ring - 1) cells away
+            if best_idx is not None and (ring - 1) * self.cell_size > best_dist:
+                break
+
+            for key in self._ring_cells(cx, cy, ring):
+                bucket = self.buckets.get(key)
+                if not bucket:
+                    continue
+                for idx in bucket:
+                    px, py = self.points[idx]
+                    dist = math.hypot(px - x, py - y)
+                    if dist < best_dist or (dist == best_dist and idx < best_idx):
+                        best_dist = dist
+                        best_idx = idx
+            ring += 1
+
+        return best_idx, best_dist
+
+    @staticmethod
+    def _ring_cells(cx, cy, ring):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+
+class ScanPathOptimizer:
+    """
+    Orders spray passes into a short route.
+
+    Each pass has two endpoints (top and bottom) and may be flown in either direction.
+    The route always starts with pass 0 flown top-to-bottom, matching the planner.
+
+      1) Greedy nearest neighbour over a grid bucket index of pass endpoints.
+      2) Optional improvement stage (2-opt with direction flips, Or-opt segment moves)
+         that runs until a local optimum is reached or the time budget is spent.
+
+    Route costs are measured between buffered endpoints, numbered like EndpointDistanceMatrix:
+    top of pass k -> k, bottom of pass k -> n + k. When a `distance_matrix` is given its
+    precomputed distances are used, otherwise planar distances between the buffered endpoints.
+    With a `cost_model` (planning.kinematics.FlightTimeModel) the improvement stage minimizes
+    flight time instead (connection legs plus the turns at both of their ends): the route is first
+    improved by length exactly as without a model, which is cheap and does most of the work, then
+    refined by flight time within a second budget of the same size. The refined route is kept only
+    when the model's estimate of the whole route (cost_model.estimate, with the legs from and back
+    to `home_xy` when given) is no slower than that of the length-optimized one.
+    """
+
+    def __init__(self, tops_xy, bottoms_xy, buffer_m=0.0, time_budget_s=DEFAULT_TIME_BUDGET_S, distance_matrix=None,
+                 cost_model=None, home_xy=None):
+        self.tops = np.asarray(tops_xy, dtype=np.float64).reshape(-1, 2)
+        self.bottoms = np.asarray(bottoms_xy, dtype=np.float64).reshape(-1, 2)
+        self.n = len(self.tops)
+        self.buffer_m = float(buffer_m or 0.0)
+        self.time_budget_s = time_budget_s
+        self.distance_matrix = distance_matrix
+        self.cost_model = cost_model
+        self.home_xy = home_xy  # included in the route estimates of the cost model when given
+        self._timed = False  # True while the improvement stage minimizes flight time
+
+        # Acceleration buffers extend each pass beyond both ends. The buffered top/bottom do not
+        # depend on the flight direction, so the route cost can be measured between them directly.
+        self.buffered_tops, self.buffered_bottoms = extend_segments(self.tops, self.bottoms, self.buffer_m)
+        self.endpoints = np.concatenate((self.buffered_tops, self.buffered_bottoms))
+        if cost_model is not None:
+            # Heading of a pass leaving through each endpoint (entering through it is the opposite)
+            along = self.buffered_bottoms - self.buffered_tops
+            lengths = np.hypot(along[:, 0], along[:, 1])[:, np.newaxis]
+            along = along / np.where(lengths > 0, lengths, 1.0)
+            self.exit_headings = np.concatenate((-along, along))
+
+    def solve(self, improve=True):
+        """
+        Returns (order, reversed_flags):
+          order: list of pass indices in flight order
+          reversed_flags: list of bools, True when the pass is flown bottom-to-top
+        """
+        if self.n == 0:
+            return [], []
+
+        order, flips = self.greedy()
+        if improve and self.n > 2 and (self.time_budget_s is None or self.time_budget_s > 0):
+            order, flips = self.improve(order, flips)
+            if self.cost_model is not None:
+                self._timed = True
+                try:
+                    refined = self.improve(order, flips)
+                finally:
+                    self._timed = False
+                if self.route_estimate(*refined) <= self.route_estimate(order, flips):
+                    order, flips = refined
+        return order, flips
+
+    def greedy(self):
+        """Nearest-neighbour tour using the endpoint grid index (endpoint 2k = top, 2k+1 = bottom)."""
+        endpoints = np.empty((2 * self.n, 2), dtype=np.float64)
+        endpoints[0::2] = self.tops
+        endpoints[1::2] = self.bottoms
+        index = EndpointGridIndex(endpoints)
+
+        order = [0]
+        flips = [False]
+        index.remove(0)
+        index.remove(1)
+        current = self.buffered_bottoms[0]
+
+        for _ in range(self.n - 1):
+            endpoint, _ = index.nearest(current[0], current[1])
+            pass_index = endpoint // 2
+            flipped = (endpoint % 2) == 1  # Entering through the bottom means flying bottom-to-top
+            index.remove(2 * pass_index)
+            index.remove(2 * pass_index + 1)
+            order.append(pass_index)
+            flips.append(flipped)
+            current = self.buffered_tops[pass_index] if flipped else self.buffered_bottoms[pass_index]
+
+        return order, flips
+
+    def route_length(self, order, flips):
+        """Transition length (meters) between consecutive buffered passes; pass lengths are constant."""
+        if len(order) < 2:
+            return 0.0
+        entry, exit_ = self._oriented(order, flips)
+        return float(self._cost(exit_[:-1], entry[1:]).sum())
+
+    def route_time(self, order, flips):
+        """Transition flight time (seconds) under the cost model; pass times are constant."""
+        if len(order) < 2:
+            return 0.0
+        entry, exit_ = self._oriented(order, flips)
+        return float(self._flight_time(exit_[:-1], entry[1:]).sum())
+
+    def route_estimate(self, order, flips):
+        """Flight time (seconds) of the whole route as estimated by the cost model (passes and home legs included)."""
+        entry, exit_ = self._oriented(order, flips)
+        path_xy = np.empty((2 * len(entry), 2), dtype=np.float64)
+        path_xy[0::2] = self.endpoints[entry]
+        path_xy[1::2] = self.endpoints[exit_]
+        return self.cost_model.estimate(path_xy, self.home_xy).total_s
+
+    def _oriented(self, order, flips):
+        """Entry and exit endpoint numbers of every pass in route order."""
+        order = np.asarray(order, dtype=np.int64)
+        flips = np.asarray(flips, dtype=bool)
+        entry = np.where(flips, order + self.n, order)
+        exit_ = np.where(flips, order, order + self.n)
+        return entry, exit_
+
+    def _cost(self, a, b):
+        """Vectorized cost between endpoint numbers (broadcasting)."""
+        if self._timed:
+            return self._flight_time(a, b)
+        if self.distance_matrix is not None:
+            return self.distance_matrix.lookup(a, b)
+        diff = self.endpoints[a] - self.endpoints[b]
+        return np.hypot(diff[..., 0], diff[..., 1])
+
+    def _flight_time(self, a, b):
+        """Cost-model time from leaving through endpoint `a` to entering through endpoint `b`."""
+        return self.cost_model.transition_time(
+            self.endpoints[a], self.exit_headings[a], self.endpoints[b], -self.exit_headings[b]
+        )
+
+    def improve(self, order, flips):
+        """
+        Local search under the time budget:
+          - 2-opt: reverse a run of passes (which also flips each pass's direction);
+            a run of length one is a plain direction flip.
+          - Or-opt: move a run of 1-3 passes elsewhere, optionally flipped.
+        Position 0 stays fixed as the start of the route.
+        """
+        deadline = None if self.time_budget_s is None else time.perf_counter() + self.time_budget_s
+        order = np.asarray(order, dtype=np.int64)
+        flips = np.asarray(flips, dtype=bool)
+        entry, exit_ = self._oriented(order, flips)
+
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, self.n):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return order.tolist(), flips.tolist()
+                if self._two_opt_move(i, order, flips, entry, exit_):
+                    improved = True
+                for seg_len in (1, 2, 3):
+                    if self._or_opt_move(i, seg_len, order, flips, entry, exit_):
+                        improved = True
+                        break
+
+        return order.tolist(), flips.tolist()
+
+    def _two_opt_move(self, i, order, flips, entry, exit_):
+        """Best reversal of positions i..j (j >= i); applied in place if it shortens the route."""
+        n = self.n
+        prev_exit = exit_[i - 1]
+        j = np.arange(i, n)
+
+        removed = self._cost(prev_exit, entry[i]) + np.append(self._cost(exit_[j[:-1]], entry[j[:-1] + 1]), 0.0)
+        # After reversal, pass i (flipped) exits through its old entry
+        added = self._cost(prev_exit, exit_[j]) + np.append(self._cost(entry[i], entry[j[:-1] + 1]), 0.0)
+
+        delta = added - removed
+        best = int(np.argmin(delta))
+        if delta[best] >= -IMPROVEMENT_EPS:
+            return False
+
+        j = i + best
+        order[i:j + 1] = order[i:j + 1][::-1]
+        flips[i:j + 1] = ~flips[i:j + 1][::-1]
+        new_entry = exit_[i:j + 1][::-1].copy()
+        new_exit = entry[i:j + 1][::-1].copy()
+        entry[i:j + 1] = new_entry
+        exit_[i:j + 1] = new_exit
+        return True
+
+    def _or_opt_move(self, i, seg_len, order, flips, entry, exit_):
+        """Best relocation of the run starting at position i; applied in place if it helps."""
+        n = self.n
+        last = i + seg_len - 1
+        if last >= n:
+            return False
+
+        seg_entry = entry[i]
+        seg_exit = exit_[last]
+
+        # Gain from cutting the run out and joining its neighbours
+        gain = self._cost(exit_[i - 1], seg_entry)
+        if last + 1 < n:
+            gain += self._cost(seg_exit, entry[last + 1]) - self._cost(exit_[i - 1], entry[last + 1])
+
+        # Candidate insertion points: after position p, for p outside [i - 1, last]
+        p = np.concatenate((np.arange(0, i - 1), np.arange(last + 1, n)))
+        if len(p) == 0:
+            return False
+        has_next = p + 1 < n
+        next_entry = entry[np.where(has_next, p + 1, 0)]
+
+        base = np.where(has_next, self._cost(exit_[p], next_entry), 0.0)
+        forward = self._cost(exit_[p], seg_entry) + np.where(has_next, self._cost(seg_exit, next_entry), 0.0) - base
+        backward = self._cost(exit_[p], seg_exit) + np.where(has_next, self._cost(seg_entry, next_entry), 0.0) - base
+
+        use_backward = backward < forward
+        cost = np.where(use_backward, backward, forward)
+        best = int(np.argmin(cost))
+        if cost[best] - gain >= -IMPROVEMENT_EPS:
+            return False
+
+        target = int(p[best])
+        reverse = bool(use_backward[best])
+
+        seg_order = order[i:last + 1].copy()
+        seg_flips = flips[i:last + 1].copy()
+        seg_in = entry[i:last + 1].copy()
+        seg_out = exit_[i:last + 1].copy()
+        if reverse:
+            seg_order = seg_order[::-1]
+            seg_flips = ~seg_flips[::-1]
+            seg_in, seg_out = seg_out[::-1].copy(), seg_in[::-1].copy()
+
+        rest = np.concatenate((np.arange(0, i), np.arange(last + 1, n)))
+        insert_at = int(np.searchsorted(rest, target)) + 1
+
+        for array, segment in ((order, seg_order), (flips, seg_flips), (entry, seg_in), (exit_, seg_out)):
+            remaining = array[rest]
+            array[:] = np.concatenate((remaining[:insert_at], segment, remaining[insert_at:]))
+        return True
@@ -1,16 +1,35 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QMainWindow, QHBoxLayout, QWidget, QSplitter, QLabel, QLineEdit, QFormLayout, QPushButton, QGridLayout, QSizePolicy, QRadioButton, QCheckBox, QMessageBox, QToolBar, QFileDialog, QScrollArea, QComboBox, QToolButton
+from PyQt6.QtWidgets import QApplication, QMainWindow, QHBoxLayout, QWidget, QSplitter, QLabel, QLineEdit, QFormLayout, QPushButton, QGridLayout, QSizePolicy, QRadioButton, QCheckBox, QMessageBox, QToolBar, QFileDialog, QScrollArea, QComboBox, QToolButton, QProgressDialog
 from PyQt6.QtCore import Qt, QEvent
 from PyQt6.QtGui import QColor, QIcon, QAction, QIntValidator
-import math
 from parcel_main import app_state
 from parcel_gen import ParcelGenerator
+from projection import LocalProjection, unit_vector, extend_segments
+from distance_matrix import DistanceMatrixService
+from tracing import get_tracer
+from map_overlay import PARCELS_PREFIX, ROUTE_PREFIX
+from planning import parse_float, color_name, calculate_velocity, mission_file_name, MissionWriter
+from planning.layout import color_codes_list, fitted_parcel_size
+from planning.common import normalize_color
+from planning.passes import generate_passes, parcels_of_color, parcel_ids_by_color, pass_grid_indices, passes_per_parcel
+from planning.route import plan_route
+from planning.sweep import ROUTE_GREEDY, ROUTE_SWEEP, plan_routes, plan_sweep, preferred_route
+from planning.kinematics import (
+    OBJECTIVE_TIME, OBJECTIVE_DISTANCE, DEFAULT_TURN_RATE_DEG_S, DEFAULT_CLIMB_RATE_M_S, DEFAULT_DESCENT_RATE_M_S,
+    FlightLimits, FlightTimeModel,
+)
+from planning.pipeline import MissionPlanner, PlanningError
+from planning.sorties import split_route
+from planning.compaction import (
+    MODE_PASSES, MODE_MERGED, MODE_TRIGGERED, MAX_TRIGGER_DURATION_S, TRIGGER_DURATION_PARAM, MissionReducer, MissionStats,
+)
+from planning.report import report_lines as build_report_lines
+from state_format import load_state, save_state, STATE_EXTENSION
 import os
 import configparser
 import time
 from parcel_main import ColorButtonWidget
 import logging
-import json
 from main import MapWidget
 from PyQt6.QtCore import QTranslator, QLocale
 from PyQt6.QtCore import QTimer
@@ -30,6 +49,11 @@ sys.stdout.reconfigure(encoding='utf-8')
 # Get the logger instance
 logger = logging.getLogger(__name__)
 
+# Per-subsystem tracers (levels set in the [Logging] section of config.ini)
+path_tracer = get_tracer("planner.path")
+mission_tracer = get_tracer("planner.mission")
+state_tracer = get_tracer("planner.state")
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for development and for PyInstaller """
     try:
@@ -71,9 +95,9 @@ class PlannerMainWindow(QMainWindow):
         self.setWindowTitle("Parcel Planner")
         self.translator = QTranslator()
         self.colored_parcels = {}
-        self.parcel_js_references = []
-        self.parcel_marker_js_references = []
         self.parcel_coordinates = None
+        # Local east-north plane of the field (built from the corners in save())
+        self.projection = None
         self.current_color = None
         self.path_coordinates = []
         self.paths_by_color = {}
@@ -81,7 +105,11 @@ class PlannerMainWindow(QMainWindow):
         self.button_name = None
         self.button_params = {}
         self.parcel_points_by_color = {}
+        # Route (planning.route.Route) behind each colour's path, with the local points it was planned on
+        self.routes_by_color = {}
         self.color_codes_list = []
+        # Cached endpoint distance matrices and path lengths, shared by path builder, label and report
+        self.distance_service = DistanceMatrixService()
 
         # Replace the ParcelField with a QWebEngineView for the map
         logger.debug("map initialized")
@@ -92,6 +120,8 @@ class PlannerMainWindow(QMainWindow):
         try:
             self.map_widget.mapReady.connect(self._sync_corners_to_map)
             self.map_widget.cornerMoved.connect(self._on_corner_moved)
+            self.map_widget.prefetchProgress.connect(self._on_prefetch_progress)
+            self.map_widget.prefetchFinished.connect(self._on_prefetch_finished)
         except Exception:
             pass
 
@@ -103,9 +133,8 @@ class PlannerMainWindow(QMainWindow):
         logger.debug("Setting up UI")
         self.create_toolbar()
         form_layout = QFormLayout()
+        # Overlay key of the route currently shown on the map (see map_overlay.py)
         self.current_path = None
-        self.current_start_marker = None
-        self.current_end_marker = None
         self._corner_labels = {}
 
         #self.clear_button = QPushButton(self.tr("Clear Parcels"))
@@ -228,6 +257,11 @@ class PlannerMainWindow(QMainWindow):
         self.generate_mission.clicked.connect(lambda: self.create_mavlink_script(self.path))
         self.generate_mission.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
 
+        # Plans and writes the mission of every colour in one go
+        self.export_all_missions_button = QPushButton(self.tr("Export All Missions"))
+        self.export_all_missions_button.clicked.connect(self.export_all_missions)
+        self.export_all_missions_button.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
         # Ensure default corner markers show up once the map is loaded
         QTimer.singleShot(0, self._sync_corners_to_map)
         self._corner_pick_target = None
@@ -241,6 +275,11 @@ class PlannerMainWindow(QMainWindow):
         #form_layout.addRow(self.clear_button)
         form_layout.addRow(self.total_length_label)
 
+        # Estimated minutes aloft of the current route (planning.kinematics), once the speed is known
+        self.flight_time_label = QLabel("")
+        self.flight_time_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        form_layout.addRow(self.flight_time_label)
+
         right_panel = QWidget()
         right_panel.setLayout(form_layout)
 
@@ -347,11 +386,70 @@ class PlannerMainWindow(QMainWindow):
         advanced_layout.addRow(self.tr("Spray On"), self.pwm_high_input)
         advanced_layout.addRow(self.tr("Spray Off"), self.pwm_low_input)
 
+        # Mission size: one run per pass, collinear passes merged, or merged with distance-triggered spraying
+        self.mission_mode_combo = QComboBox()
+        self.mission_mode_combo.addItem(self.tr("One run per pass"), MODE_PASSES)
+        self.mission_mode_combo.addItem(self.tr("Merge straight passes"), MODE_MERGED)
+        self.mission_mode_combo.addItem(self.tr("Merge + distance trigger"), MODE_TRIGGERED)
+        self.mission_mode_combo.setToolTip(self.tr(
+            "Distance trigger: the sprayer must be wired as the camera trigger and {0} set to the time one "
+            "parcel takes to fly (parcel length / ground speed, at most {1:g} s); the value is shown when "
+            "the mission is saved."
+        ).format(TRIGGER_DURATION_PARAM, MAX_TRIGGER_DURATION_S))
+        advanced_layout.addRow(self.tr("Mission Items"), self.mission_mode_combo)
+
+        # Route planner: greedy nearest neighbour with local search, or serpentine grid sweep
+        self.route_mode_combo = QComboBox()
+        self.route_mode_combo.addItem(self.tr("Greedy (optimized)"), ROUTE_GREEDY)
+        self.route_mode_combo.addItem(self.tr("Grid sweep"), ROUTE_SWEEP)
+        self.route_mode_combo.setToolTip(self.tr(
+            "Grid sweep: a fixed serpentine over the parcel columns or rows, parcel by parcel. Fast and "
+            "predictable, but not shorter than the greedy route: it ties on regular layouts and is longer "
+            "when the colours are mixed."
+        ))
+        self.route_mode_combo.currentIndexChanged.connect(self.change_route_settings)
+        advanced_layout.addRow(self.tr("Route Planner"), self.route_mode_combo)
+
+        # Grid sweep against the greedy route: both are planned, the greedy route is flown where the sweep is worse
+        self.compare_routes_checkbox = QCheckBox(self.tr("Compare with greedy route"))
+        self.compare_routes_checkbox.setToolTip(self.tr(
+            "Also plan the greedy route and fly it where the grid sweep is slower or longer; both are shown "
+            "on the path length. Plans take as long as with the greedy planner."
+        ))
+        self.compare_routes_checkbox.setEnabled(False)  # grid sweep only
+        self.compare_routes_checkbox.toggled.connect(self.change_route_settings)
+        advanced_layout.addRow(self.compare_routes_checkbox)
+
+        # Route objective and the vehicle limits of the flight-time model
+        self.objective_combo = QComboBox()
+        self.objective_combo.addItem(self.tr("Flight time"), OBJECTIVE_TIME)
+        self.objective_combo.addItem(self.tr("Path length"), OBJECTIVE_DISTANCE)
+        self.objective_combo.currentIndexChanged.connect(self.change_route_settings)
+        advanced_layout.addRow(self.tr("Optimize For"), self.objective_combo)
+
+        self.turn_rate_input = QLineEdit(str(DEFAULT_TURN_RATE_DEG_S))
+        self.climb_rate_input = QLineEdit(str(DEFAULT_CLIMB_RATE_M_S))
+        self.descent_rate_input = QLineEdit(str(DEFAULT_DESCENT_RATE_M_S))
+        for limit_input in (self.turn_rate_input, self.climb_rate_input, self.descent_rate_input):
+            limit_input.editingFinished.connect(self.change_route_settings)
+        advanced_layout.addRow(self.tr("Turn Rate (deg/s)"), self.turn_rate_input)
+        advanced_layout.addRow(self.tr("Climb Rate (m/s)"), self.climb_rate_input)
+        advanced_layout.addRow(self.tr("Descent Rate (m/s)"), self.descent_rate_input)
+
+        # Sortie limits: larger missions are split into one mission per tank / battery (empty: no limit)
+        self.tank_input = QLineEdit()
+        self.tank_input.setPlaceholderText(self.tr("No limit"))
+        self.max_flight_input = QLineEdit()
+        self.max_flight_input.setPlaceholderText(self.tr("No limit"))
+        advanced_layout.addRow(self.tr("Tank (L)"), self.tank_input)
+        advanced_layout.addRow(self.tr("Max Flight (min)"), self.max_flight_input)
+
         self.advanced_container.setVisible(False)
         form_layout.addRow(self.advanced_toggle)
         form_layout.addRow(self.advanced_container)
 
         form_layout.addRow(self.generate_mission)
+        form_layout.addRow(self.export_all_missions_button)
         form_layout.addRow(self.generate_report)
 
         self.width_label = QLabel(self.tr("Parcel Width: {0} meters").format(3.0))
@@ -472,11 +570,69 @@ class PlannerMainWindow(QMainWindow):
         pwm_low = _to_int(self.pwm_low_input.text(), 1000)
         return channel_number, pwm_high, pwm_low
 
+    def _get_flight_limits(self):
+        """FlightLimits from the advanced settings, with the defaults for invalid input."""
+        def _to_float(text, default):
+            try:
+                value = self._parse_float(text)
+            except ValueError:
+                return default
+            return value if value > 0 else default
+
+        return FlightLimits(
+            _to_float(self.turn_rate_input.text(), DEFAULT_TURN_RATE_DEG_S),
+            _to_float(self.climb_rate_input.text(), DEFAULT_CLIMB_RATE_M_S),
+            _to_float(self.descent_rate_input.text(), DEFAULT_DESCENT_RATE_M_S),
+        )
+
+    def _get_sortie_limits(self):
+        """(tank_l, max_flight_s) from the advanced settings; None for empty or invalid input (no limit)."""
+        def _to_limit(text):
+            try:
+                value = self._parse_float(text)
+            except ValueError:
+                return None
+            return value if value > 0 else None
+
+        tank_l = _to_limit(self.tank_input.text())
+        max_flight_min = _to_limit(self.max_flight_input.text())
+        return tank_l, max_flight_min * 60 if max_flight_min else None
+
+    def _flight_model(self):
+        """FlightTimeModel of the calculated ground speed, or None until the velocity is calculated."""
+        ground_speed_m_s = (getattr(self, "velocity_results", None) or {}).get("ground_speed_m_s")
+        if not ground_speed_m_s:
+            return None
+        try:
+            return FlightTimeModel(ground_speed_m_s, self.acc_buffer, self._get_flight_limits())
+        except ValueError:
+            return None
+
+    def _mission_home_and_altitude(self):
+        """(home (lat, lon), altitude) for flight-time estimates; either is None when not valid."""
+        try:
+            home = (self._parse_float(self.top_left_lat_input.text()), self._parse_float(self.top_left_lon_input.text()))
+        except ValueError:
+            home = None
+        try:
+            altitude = self._parse_float(self.set_alt_input.text())
+        except ValueError:
+            altitude = None
+        return home, altitude
+
+    def _get_route_mode(self):
+        """Route planner of planning.sweep selected in the advanced settings."""
+        return self.route_mode_combo.currentData() or ROUTE_GREEDY
+
+    def _get_mission_mode(self):
+        """Mission mode of planning.compaction selected in the advanced settings."""
+        return self.mission_mode_combo.currentData() or MODE_PASSES
+
     def _parse_float(self, text):
         """
         Accept both comma and dot as decimal separators.
         """
-        return float(str(text).strip().replace(",", "."))
+        return parse_float(text)
 
     def _normalize_number_inputs(self):
         """
@@ -573,35 +729,20 @@ class PlannerMainWindow(QMainWindow):
                 self.acc_buffer = 2.0
             return
 
+    def change_route_settings(self):
+        # Routes of the other planner / objective are stale; replan the current colour
+        self.compare_routes_checkbox.setEnabled(self._get_route_mode() == ROUTE_SWEEP)
+        self.paths_by_color.clear()
+        self.clear_routes()
+        if self.current_color is not None and self.get_all_parcels():
+            self.generate_path()
+
     def update_spray_width(self):
         # Clear paths by color
         self.paths_by_color.clear()
 
-        # Prepare JavaScript code to batch all operations
-        js_code = ""
-
-        # Remove the previous path if it exists
-        if self.current_path is not None:
-            js_code += f"{self.current_path}.remove();\n"
-            self.current_path = None  # Reset the current path reference
-
-        # Remove the previous start and end markers if they exist
-        if self.current_start_marker is not None:
-            js_code += f"{self.current_start_marker}.remove();\n"
-            self.current_start_marker = None  # Reset the current start marker reference
-
-        if self.current_end_marker is not None:
-            js_code += f"{self.current_end_marker}.remove();\n"
-            self.current_end_marker = None  # Reset the current end marker reference
-
-        # Remove previous parcel markers
-        if hasattr(self, 'parcel_marker_js_references') and self.parcel_marker_js_references:
-            for marker_ref in self.parcel_marker_js_references:
-                js_code += f"{marker_ref}.remove();\n"
-            self.parcel_marker_js_references = []  # Clear the references after removal
-
-        # Run the accumulated JavaScript code in a single call
-        self.map_widget.view.page().runJavaScript(js_code)
+        # Routes were planned for the old width; drop them from the map in one diff
+        self.clear_routes()
 
         # Update the spraying width from the input
         # self.spraying_width = self.spraying_width_input.text()
@@ -690,45 +831,13 @@ class PlannerMainWindow(QMainWindow):
                 return
 
 
-        # Assuming width and height are in meters
-        parcel_area_m2 = self.width * self.height  # width and height should be in meters
-        sup_aplicada_m2 = number_of_parcels * parcel_area_m2
-        # print(f"Total application area (sup_aplicada_m2): {sup_aplicada_m2:.2f} m²")
-
-        # Calculate total required solution (caldo necesario) in liters
-        caldo_necesario = (application_dose * sup_aplicada_m2) / 10000  # Convert m² to hectares
-        # print(f"Total required solution (caldo_necesario): {caldo_necesario:.2f} L")
-
-        # Calculate solution needed per parcel
-        caldo_per_plot = caldo_necesario / (number_of_parcels * self.width / spraying_width)
-        # print(f"Solution needed per parcel (caldo_per_plot): {caldo_per_plot:.2f} L")
-
-        # Assume number of nozzles (boquillas)
-        # print(f"Number of nozzles (boquillas): {nozzle_number}")
-
-        # Total flow rate in L/min
-        flow_rate_total_L_min = nozzle_rate * nozzle_number
-        # print(f"Total flow rate (flow_rate_total_L_min): {flow_rate_total_L_min:.2f} L/min")
-
-        # Convert total flow rate to L/s
-        flow_rate_total_L_s = flow_rate_total_L_min / 60  # 60 seconds in a minute
-        # print(f"Total flow rate (flow_rate_total_L_s): {flow_rate_total_L_s:.4f} L/s")
-
-        # Length of each plot (longitud_plot) is the parcel height
-        longitud_plot = self.height
-        # print(f"Length of each plot (longitud_plot): {longitud_plot:.2f} m")
-
-        # Time per plot in seconds
-        time_per_plot_s = caldo_per_plot / flow_rate_total_L_s
-        # print(f"Time per plot (time_per_plot_s): {time_per_plot_s:.2f} seconds")
-
-        # Ground speed in m/s
-        ground_speed_m_s = longitud_plot / time_per_plot_s
-        # print(f"Ground speed (ground_speed_m_s): {ground_speed_m_s:.3f} m/s")
-
-        # Ground speed in km/h
-        ground_speed_km_h = ground_speed_m_s * 3.6
-        # print(f"Ground speed (ground_speed_km_h): {ground_speed_km_h:.3f} km/h")
+        # Ground speed from the dose, nozzle flow and parcel geometry (planning.velocity)
+        velocity_results = calculate_velocity(
+            self.width, self.height, number_of_parcels, spraying_width,
+            application_dose, nozzle_rate, nozzle_number,
+        )
+        ground_speed_m_s = velocity_results["ground_speed_m_s"]
+        ground_speed_km_h = velocity_results["ground_speed_km_h"]
 
         # Update the label or store the calculated values as needed
         self.calculated_speed_label.setText(f"Calculated Ground Speed: {ground_speed_km_h:.2f} km/h - {ground_speed_m_s:.2f} m/s")
@@ -746,15 +855,7 @@ class PlannerMainWindow(QMainWindow):
         }
         
         # Optionally, store the results in a dictionary or class attributes
-        self.velocity_results = {
-            "caldo_necesario_L": caldo_necesario,
-            "caldo_per_plot_L": caldo_per_plot,
-            "flow_rate_total_L_min": flow_rate_total_L_min,
-            "flow_rate_total_L_s": flow_rate_total_L_s,
-            "time_per_plot_s": time_per_plot_s,
-            "ground_speed_m_s": ground_speed_m_s,
-            "ground_speed_km_h": ground_speed_km_h,
-        }
+        self.velocity_results = velocity_results
 
 
     def create_toolbar(self):
@@ -780,6 +881,20 @@ class PlannerMainWindow(QMainWindow):
         self.save_action.triggered.connect(self.save_file)  # Connect to a custom function
         self.file_menu.addAction(self.save_action)
 
+        # Create the 'Map' menu (offline tile cache)
+        self.map_menu = menu_bar.addMenu(self.tr("Map"))
+
+        # Download every tile of the field so it stays available without coverage
+        self.prefetch_action = QAction(self.tr("Download Field Tiles"), self)
+        self.prefetch_action.setStatusTip(self.tr("Cache the satellite tiles of the field for offline use"))
+        self.prefetch_action.triggered.connect(self.prefetch_tiles)
+        self.map_menu.addAction(self.prefetch_action)
+
+        self.cancel_prefetch_action = QAction(self.tr("Cancel Tile Download"), self)
+        self.cancel_prefetch_action.setEnabled(False)
+        self.cancel_prefetch_action.triggered.connect(self.map_widget.cancel_prefetch)
+        self.map_menu.addAction(self.cancel_prefetch_action)
+
         # Create the 'Settings' menu
         self.settings_menu = menu_bar.addMenu(self.tr("Settings"))
 
@@ -803,6 +918,36 @@ class PlannerMainWindow(QMainWindow):
         # Set the default checked language (e.g., English as default)
         self.lang_action_en.setChecked(True)
 
+    def prefetch_tiles(self):
+        """Start caching the tiles of the field (corners A-D, or [Location] in config.ini)."""
+        try:
+            corners = list(self._get_corner_coords().values())
+        except ValueError:
+            corners = None  # Fall back to the saved location in config.ini
+
+        if not self.map_widget.online:
+            self.show_warning(self.tr("Offline"), self.tr("Tiles can only be downloaded while online."))
+            return
+        if not self.map_widget.prefetch_field_tiles(corners):
+            self.show_warning(self.tr("Tile Download"), self.tr("A tile download is already running or no field coordinates are set."))
+            return
+
+        self.prefetch_action.setEnabled(False)
+        self.cancel_prefetch_action.setEnabled(True)
+        self.statusBar().showMessage(self.tr("Downloading field tiles..."))
+
+    def _on_prefetch_progress(self, done, total):
+        self.statusBar().showMessage(self.tr("Downloading field tiles: {0}/{1}").format(done, total))
+
+    def _on_prefetch_finished(self, result):
+        self.prefetch_action.setEnabled(True)
+        self.cancel_prefetch_action.setEnabled(False)
+        if result.get("cancelled"):
+            message = self.tr("Tile download cancelled: {0} downloaded, {1} already cached, {2} failed")
+        else:
+            message = self.tr("Tile download finished: {0} downloaded, {1} already cached, {2} failed")
+        self.statusBar().showMessage(message.format(result["downloaded"], result["cached"], result["failed"]))
+
     def change_language(self, language):
         # Remove the old translator if any
         if self.translator is not None:
@@ -901,6 +1046,9 @@ class PlannerMainWindow(QMainWindow):
         self.file_menu.setTitle(self.tr("File"))
         self.save_action.setText(self.tr("Save"))
         self.open_action.setText(self.tr("Open"))
+        self.map_menu.setTitle(self.tr("Map"))
+        self.prefetch_action.setText(self.tr("Download Field Tiles"))
+        self.cancel_prefetch_action.setText(self.tr("Cancel Tile Download"))
         self.settings_menu.setTitle(self.tr("Settings"))
         self.night_mode_action.setText(self.tr("Night Mode"))
         self.language_menu.setTitle(self.tr("Change Language"))
@@ -912,6 +1060,7 @@ class PlannerMainWindow(QMainWindow):
         self.save_button.setText(self.tr("Process"))
         self.generate_report.setText(self.tr("Generate Report"))
         self.generate_mission.setText(self.tr("Save the mission"))
+        self.export_all_missions_button.setText(self.tr("Export All Missions"))
 
         # Update labels for coordinates
         self.top_left.setText(self.tr("Coordinate A"))
@@ -975,24 +1124,24 @@ class PlannerMainWindow(QMainWindow):
         # Create a file dialog for selecting the file to open
         file_dialog = QFileDialog(self)
         file_dialog.setWindowTitle("Open Planner State")
-        file_dialog.setNameFilter("TXT Files (*.txt)")
+        file_dialog.setNameFilters(["Planner State (*.ppstate *.txt)", "All Files (*)"])
         file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
 
         if file_dialog.exec():
             file_path = file_dialog.selectedFiles()[0]
-            logger.info(f"File selected: {file_path}")
+            logger.info("File selected: %s", file_path)
 
             try:
-                with open(file_path, 'r') as file:
-                    loaded_data = json.load(file)
-                    logger.info(f"Loaded data: {loaded_data}")
-                    self.restore_app_state(loaded_data)
+                # Binary (.ppstate) and JSON states are told apart by their first bytes
+                loaded_data = load_state(file_path)
+                state_tracer.debug("loaded planner state", file=file_path, keys=list(loaded_data))
+                self.restore_app_state(loaded_data)
             except Exception as e:
-                logger.error(f"Error opening or parsing file: {e}")
+                logger.error("Error opening or parsing file: %s", e)
                 self.show_warning(self.tr("Open Failed"), self.tr(f"Failed to open planner state: {e}"))
 
     def restore_app_state(self, data):
-        logger.debug(f"Restoring planner state with data: {data}")
+        state_tracer.debug("restoring planner state", keys=list(data))
 
         try:
             # Restore the parameters from the loaded data
@@ -1011,6 +1160,7 @@ class PlannerMainWindow(QMainWindow):
             fit = data['fit']
             fit_gap = data['fit_gap']
             self.parcel_coordinates = data.get('parcel_coordinates', None)
+            self.projection = None
             self.button_params = data["params"]
             self.acc_buffer = data["acc_buffer"]
             # self.paths_by_color = data.get('paths_by_color', {})
@@ -1076,7 +1226,7 @@ class PlannerMainWindow(QMainWindow):
             self.file_opened = True
             # Find the button with the greatest button number
             max_button_number = int(max(self.button_params.keys()))  # Get the largest button number
-            logger.debug(f"Setting current color to button with greatest number: {max_button_number}")
+            logger.debug("Setting current color to button with greatest number: %s", max_button_number)
             app_state.button_names = self.button_names
             app_state.width = self.width
             app_state.height = self.height
@@ -1111,75 +1261,79 @@ class PlannerMainWindow(QMainWindow):
             logger.info("Planner state restored successfully.")
             self.show_info("Restore Successful", "Planner state has been restored successfully.")
         except Exception as e:
-            logger.error(f"Error restoring planner state: {e}")
+            logger.error("Error restoring planner state: %s", e)
             self.show_warning(self.tr("Restore Failed"), self.tr(f"Failed to restore planner state: {e}"))
 
 
+    def collect_app_state(self):
+        """Planner state as written by save_file (and read by MissionPlanner.from_state)."""
+        # if self.fit.isChecked():  # If 'fit' option is selected, use the fitted dimensions
+        #     width_to_save = self.exact_width
+        #     height_to_save = self.exact_height
+        #     gap_x_to_save = self.gap_x  # These values are calculated in the `save` function
+        #     gap_y_to_save = self.gap_y
+        # else:  # Otherwise, use the original values
+        width_to_save = self.width
+        height_to_save = self.height
+        gap_x_to_save = self.gap_x
+        gap_y_to_save = self.gap_y
+
+        return {
+            'button_names': self.button_names,
+            'width': width_to_save,  # Save the correct width
+            'height': height_to_save,  # Save the correct height
+            'gap_x': gap_x_to_save,  # Save the correct gap_x
+            'gap_y': gap_y_to_save,  # Save the correct gap_y
+            'count_x': self.count_x,
+            'count_y': self.count_y,
+            'colored_parcels': self.colored_parcels,
+            'location': [
+                [self.top_left_lat_input.text(), self.top_left_lon_input.text()],
+                [self.top_right_lat_input.text(), self.top_right_lon_input.text()],
+                [self.bot_left_lat_input.text(), self.bot_left_lon_input.text()],
+                [self.bot_right_lat_input.text(), self.bot_right_lon_input.text()]
+            ],
+            'spraying_width': self.spraying_width_input.text(),
+            'fit': self.fit.isChecked(),
+            'fit_gap': self.fit_gap.isChecked(),
+            'parcel_coordinates': self.parcel_coordinates,
+            'paths_by_color': self.paths_by_color,
+            'params': self.button_params,
+            'acc_buffer': self.acc_buffer
+        }
+
     def save_file(self):
         logger.debug("Save file action triggered")
         try:
 
             # Collect the application state
-            # if self.fit.isChecked():  # If 'fit' option is selected, use the fitted dimensions
-            #     width_to_save = self.exact_width
-            #     height_to_save = self.exact_height
-            #     gap_x_to_save = self.gap_x  # These values are calculated in the `save` function
-            #     gap_y_to_save = self.gap_y
-            # else:  # Otherwise, use the original values
-            width_to_save = self.width
-            height_to_save = self.height
-            gap_x_to_save = self.gap_x
-            gap_y_to_save = self.gap_y
-
-            app_state_data = {
-                'button_names': self.button_names,
-                'width': width_to_save,  # Save the correct width
-                'height': height_to_save,  # Save the correct height
-                'gap_x': gap_x_to_save,  # Save the correct gap_x
-                'gap_y': gap_y_to_save,  # Save the correct gap_y
-                'count_x': self.count_x,
-                'count_y': self.count_y,
-                'colored_parcels': self.colored_parcels,
-                'location': [
-                    [self.top_left_lat_input.text(), self.top_left_lon_input.text()],
-                    [self.top_right_lat_input.text(), self.top_right_lon_input.text()],
-                    [self.bot_left_lat_input.text(), self.bot_left_lon_input.text()],
-                    [self.bot_right_lat_input.text(), self.bot_right_lon_input.text()]
-                ],
-                'spraying_width': self.spraying_width_input.text(),
-                'fit': self.fit.isChecked(),
-                'fit_gap': self.fit_gap.isChecked(),
-                'parcel_coordinates': self.parcel_coordinates,
-                'paths_by_color': self.paths_by_color,
-                'params': self.button_params,
-                'acc_buffer': self.acc_buffer
-            }
+            app_state_data = self.collect_app_state()
 
             # Create a save file dialog
             file_dialog = QFileDialog(self)
             file_dialog.setWindowTitle("Save Planner State")
             file_dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
-            file_dialog.setNameFilter("TXT Files (*.txt)")
-            file_dialog.setDefaultSuffix("txt")
+            file_dialog.setNameFilters(["Planner State (*.ppstate)", "TXT Files (*.txt)"])
+            file_dialog.setDefaultSuffix("ppstate")
 
             # Generate a default filename
-            default_file_name = f"planner_state_{time.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+            default_file_name = f"planner_state_{time.strftime('%Y-%m-%d_%H-%M-%S')}{STATE_EXTENSION}"
             file_dialog.selectFile(default_file_name)
 
             if file_dialog.exec():
                 save_path = file_dialog.selectedFiles()[0]
-                logger.info(f"Saving planner state to: {save_path}")
+                logger.info("Saving planner state to: %s", save_path)
 
                 try:
-                    with open(save_path, 'w') as save_file:
-                        json.dump(app_state_data, save_file, indent=4)
+                    # Compact binary for .ppstate, the JSON layout for anything else (.txt)
+                    save_state(save_path, app_state_data)
                     logger.info("Planner state saved successfully.")
                     self.show_info("Save Successful", "Planner state has been saved successfully.")
                 except Exception as e:
-                    logger.error(f"Failed to save planner state: {e}")
+                    logger.error("Failed to save planner state: %s", e)
                     self.show_warning(self.tr("Save Failed"), self.tr(f"Failed to save planner state: {e}"))
         except Exception as e:
-                logger.error(f"Failed to save planner state: {e}")
+                logger.error("Failed to save planner state: %s", e)
                 self.show_warning(self.tr("Save Failed"), self.tr(f"Failed to save planner state: {e}"))
 
 
@@ -1192,27 +1346,7 @@ class PlannerMainWindow(QMainWindow):
           - `{parcel_id: "#rrggbb"}`
           - `{parcel_id: ("#rrggbb", x, y)}` (or JSON list variant)
         """
-        if not colored_parcels:
-            return []
-
-        by_id = {}
-        for parcel_id, value in colored_parcels.items():
-            try:
-                parcel_index = int(parcel_id)
-            except (TypeError, ValueError):
-                continue
-
-            if isinstance(value, (list, tuple)) and value:
-                color = value[0]
-            else:
-                color = value
-
-            by_id[parcel_index] = color
-
-        if total_parcels is None:
-            total_parcels = (max(by_id.keys()) + 1) if by_id else 0
-
-        return [by_id.get(i, "white") for i in range(total_parcels)]
+        return color_codes_list(colored_parcels, total_parcels)
 
     def _set_colored_parcels(self, colored_parcels):
         self.colored_parcels = colored_parcels or {}
@@ -1224,11 +1358,11 @@ class PlannerMainWindow(QMainWindow):
         self.color_codes_list = self._build_color_codes_list(self.colored_parcels, total_parcels=total_parcels)
 
     def initialize_with_parcels(self, colored_parcels):
-        logger.debug(f"initializing with the parcels of:  {colored_parcels}")
+        state_tracer.debug("initializing with parcels", colored_parcels=colored_parcels)
         self._set_colored_parcels(colored_parcels)
 
     def initialize_params(self, app_state, tr=None):
-        logger.debug(f"initializing with the params of: {app_state}")
+        logger.debug("initializing with the params of: %s", app_state)
         print(app_state.count_x)
         if tr is not None:
             self.translator = tr
@@ -1246,6 +1380,7 @@ class PlannerMainWindow(QMainWindow):
         self.paths_by_color = {}
         self.current_color = None
         self.parcel_coordinates = None
+        self.projection = None
         self.button_params = {int(key): value for key, value in app_state.button_params.items()}
         self.acc_buffer = app_state.acc_buffer
         
@@ -1381,7 +1516,7 @@ class PlannerMainWindow(QMainWindow):
         if button_number in self.button_params:
             params = self.button_params[button_number]
         else:
-            logger.warning(f"No saved params found for button {button_number}. Using default params.")
+            logger.warning("No saved params found for button %s. Using default params.", button_number)
             # Assign default params if not present
             self.button_params[button_number] = default_params
             params = default_params
@@ -1417,51 +1552,8 @@ class PlannerMainWindow(QMainWindow):
 
         # Create a map of color to button name
         self.color_to_button_map = {widget.color_hex: widget.button_name for widget in self.color_button_widgets}
-        update_time = time.strftime('%Y-%m-%d %H:%M:%S')
-
-        report_lines = []
-        report_lines.append("Parcel Layout Report\n")
-        report_lines.append(f"\nUpdated on {update_time}\n")
-        report_lines.append("="*50 + "\n")
-        
-        # Add general information
-        report_lines.append("General Layout Information:\n")
-        report_lines.append(f"Liquid Names: {self.button_names}\n")
-        report_lines.append(f"Parcel Width: {width_to_report:.2f} meters\n")  # Use fitted or default width
-        report_lines.append(f"Parcel Height: {height_to_report:.2f} meters\n")  # Use fitted or default height
-        report_lines.append(f"Gap X: {gap_x_to_report:.2f} meters\n")  # Use fitted or default gap_x
-        report_lines.append(f"Gap Y: {gap_y_to_report:.2f} meters\n")  # Use fitted or default gap_y
-        report_lines.append(f"Count X: {self.count_x}\n")
-        report_lines.append(f"Count Y: {self.count_y}\n")
-        
-        # Add spray width and corner coordinates
-        report_lines.append(f"Spraying Width: {self.spraying_width_input.text()}\n")
-        report_lines.append(f"A Coordinates: ({round(self._parse_float(self.top_left_lat_input.text()), 7)}, {round(self._parse_float(self.top_left_lon_input.text()), 7)})\n")
-        report_lines.append(f"B Coordinates: ({round(self._parse_float(self.top_right_lat_input.text()), 7)}, {round(self._parse_float(self.top_left_lon_input.text()), 7)})\n")
-        report_lines.append(f"C Coordinates: ({round(self._parse_float(self.bot_left_lat_input.text()), 7)}, {round(self._parse_float(self.bot_left_lon_input.text()), 7)})\n")
-        report_lines.append(f"D Coordinates: ({round(self._parse_float(self.bot_right_lat_input.text()), 7)}, {round(self._parse_float(self.bot_right_lon_input.text()), 7)})\n")
-        report_lines.append(f"Fit area: {app_state.fit}\n")
-        report_lines.append(f"Parcel size preserved: {app_state.fit_gap}\n")
-        report_lines.append("\n")
-
-        # Add parcel structure and colors
-        report_lines.append("Parcel Structure and Colors:\n")
-        for i, parcel_info in enumerate(self.parcel_coordinates):
-            coordinates = parcel_info['coordinates']
-            color = parcel_info['color']
-            # Find the button name corresponding to the color using the color_to_button_map
-            button_name = self.color_to_button_map.get(color, "Unknown")
-
-            report_lines.append(f"Parcel {i+1}:\n")
-            report_lines.append(f"  Color: {self.hex_to_color_name(color)}\n")
-            report_lines.append(f"  Liquid Name: {button_name}\n")
-            report_lines.append("  Coordinates:\n")
-            for coord in coordinates:
-                report_lines.append(f"    - Lat: {round(float(coord['lat']), 7)}, Lon: {round(float(coord['lng']), 7)}\n")
-            report_lines.append("\n")
 
         # Ensure paths are generated for all colors
-        report_lines.append("Generated Paths by Color:\n")
         for parcel_info in self.parcel_coordinates:
             color = parcel_info['color']
             if color == "white":
@@ -1470,41 +1562,29 @@ class PlannerMainWindow(QMainWindow):
                 self.current_color = color  # Set current color
                 self.generate_path()  # Generate the path if it doesn't exist
 
-
-        if self.paths_by_color:
-            for color, paths in self.paths_by_color.items():
-                report_lines.append(f"  Color: {self.hex_to_color_name(color)}\n")
-                button_name = self.color_to_button_map.get(color, "Unkown")
-                report_lines.append(f"  Liquid Name: {button_name}\n")
-                            # Find the button number associated with the color
-                button_number = None
-                for btn_widget in self.color_button_widgets:
-                    if btn_widget.color_hex == color:
-                        button_number = btn_widget.button_number
-                        break
-                
-                # Append parameters for the button, if found
-                if button_number and button_number in self.button_params:
-                    params = self.button_params[button_number]
-                    report_lines.append(f"  Parameters:\n")
-                    report_lines.append(f"    Application Dose: {params.get('application_dose', 'N/A')}\n")
-                    report_lines.append(f"    Nozzle Rate: {params.get('nozzle_rate', 'N/A')}\n")
-                    report_lines.append(f"    Nozzle Number: {params.get('nozzle_number', 'N/A')}\n")
-                    report_lines.append(f"    Altitude: {params.get('altitude', 'N/A')}\n")
-                    report_lines.append(f"    {self.calculated_speed_label.text()}\n")
-                else:
-                    report_lines.append(f"  Parameters: Not available\n")
-
-                report_lines.append(f"  Path Coordinates:\n")
-                for i in range(0, len(paths), 2):
-                    report_lines.append(f"    Segment {i // 2 + 1}:\n")
-                    report_lines.append(f"      Start: Lat: {round(float(paths[i][0]), 7)}, Lon: {round(float(paths[i][1]), 7)}\n")
-                    report_lines.append(f"      End: Lat: {round(float(paths[i+1][0]), 7)}, Lon: {round(float(paths[i+1][1]), 7)}\n")
-                report_lines.append("\n")
-        else:
-            report_lines.append("  No paths generated yet.\n")
-
-        report_lines.append("="*50 + "\n")
+        # The report text itself is built by planning.report
+        info = {
+            'button_names': self.button_names,
+            'width': width_to_report,  # Use fitted or default width
+            'height': height_to_report,  # Use fitted or default height
+            'gap_x': gap_x_to_report,
+            'gap_y': gap_y_to_report,
+            'count_x': self.count_x,
+            'count_y': self.count_y,
+            'spraying_width': self.spraying_width_input.text(),
+            'corners': self._get_corner_coords(),
+            'fit': app_state.fit,
+            'fit_gap': app_state.fit_gap,
+        }
+        report_lines = build_report_lines(
+            info,
+            self.parcel_coordinates,
+            self.paths_by_color,
+            self.color_to_button_map,
+            self.button_params,
+            self.calculate_total_distance,
+            speed_text=self.calculated_speed_label.text(),
+        )
 
         file_path = os.path.join(reports_dir, f"{app_state.timestamp}_parcel_report.txt")
 
@@ -1514,70 +1594,28 @@ class PlannerMainWindow(QMainWindow):
         self.show_info("Report created successfully", f"Report generated and saved at '{file_path}'")
 
     def hex_to_color_name(self, hex_code):
-        hex_color_dict = {
-            "#ff0000": "Red",
-            "#0000ff": "Blue",
-            "#ffff00": "Yellow",
-            "#00ffff": "Cyan",
-            "#ff00ff": "Magenta",
-            "#808080": "Gray",
-            "#8b0000": "Dark red",
-            "#006400": "Dark green",
-            "#00008b": "Dark blue",
-            "#b8860b": "Dark yellow",
-            "#ffffff": "White",
-            # Add more colors as needed
-        }
+        return color_name(hex_code)
 
-        hex_code = hex_code.lower()
-        
-        # Ensure the hex code starts with '#'
-        if not hex_code.startswith("#"):
-            hex_code = "#" + hex_code
-
-        return hex_color_dict.get(hex_code, "White")
 
+    def clear_routes(self):
+        """Remove every drawn route (path, pass points and S/F markers) from the map."""
+        had_path = self.current_path is not None
+        self.current_path = None
+        self.map_widget.clear_overlays(ROUTE_PREFIX)
+        return had_path
 
     def clear_parcels(self):
         logger.debug("clearing parcels")
-        # Batch JS code to remove parcels
-        js_code = ""
-
-        # Remove parcel polygons
-        if self.parcel_js_references:
-            for js_ref in self.parcel_js_references:
-                js_code += f"{js_ref}.remove();\n"  # Batch remove parcels in one go
-            self.parcel_js_references = []  # Clear the list of references
-
-        # Remove the current path
-        if self.current_path is not None:
-            js_code += f"{self.current_path}.remove();\n"
+        # Parcels and routes are keyed overlay layers; removing them is a single diff
+        if self.clear_routes():
             self.update_total_length_label(0)
-            self.current_path = None
-
-        # Remove the start and end markers
-        if self.current_start_marker is not None:
-            js_code += f"{self.current_start_marker}.remove();\n"
-            self.current_start_marker = None
-        if self.current_end_marker is not None:
-            js_code += f"{self.current_end_marker}.remove();\n"
-            self.current_end_marker = None
-
-        # Remove parcel markers
-        if hasattr(self, 'parcel_marker_js_references') and self.parcel_marker_js_references:
-            for marker_ref in self.parcel_marker_js_references:
-                js_code += f"{marker_ref}.remove();\n"
-            self.parcel_marker_js_references = []
-
-        # Only run JavaScript if there is something to remove
-        if js_code.strip():
-            self.map_widget.view.page().runJavaScript(js_code)
+        self.map_widget.clear_overlays(PARCELS_PREFIX)
 
 
 
 
     def set_button_names(self, button_names):
-        logger.debug(f"setting button names with the value of: {button_names}")
+        logger.debug("setting button names with the value of: %s", button_names)
         self.button_names = button_names
         self.color_to_button_map = {widget.color_hex: widget.button_name for widget in self.color_button_widgets}
 
@@ -1605,11 +1643,11 @@ class PlannerMainWindow(QMainWindow):
 
 
     def set_current_color(self, button, color):
-        logger.debug(f"setting current color with the value of: {button}, {color}")
+        logger.debug("setting current color with the value of: %s, %s", button, color)
 
         # If there's a previously selected button, save its parameters
         if self.prev_button is not None and not self.file_opened:
-            logger.debug(f"Saving params for previous button: {self.prev_button.button_number}")
+            logger.debug("Saving params for previous button: %s", self.prev_button.button_number)
             self.button_params[self.prev_button.button_number] = {
                 "application_dose": self.application_dose_input.text(),
                 "nozzle_rate": self.nozzle_rate_input.text(),
@@ -1639,7 +1677,7 @@ class PlannerMainWindow(QMainWindow):
 
         # Load the current button's params if available; otherwise, use defaults
         if button.button_number in self.button_params:
-            logger.debug(f"Loading params for current button: {button.button_number}")
+            logger.debug("Loading params for current button: %s", button.button_number)
             self.params = self.button_params[button.button_number]
         else:
             # Set default params if the button doesn't have saved params
@@ -1686,7 +1724,7 @@ class PlannerMainWindow(QMainWindow):
 
 
     def update_button_text(self, color_hex):
-        logger.debug(f"updating button text with the value of: {color_hex}")
+        logger.debug("updating button text with the value of: %s", color_hex)
         """Update the button text based on the selected color's hex code."""
         # Map the hex color to the button name using the color_to_button_map
         self.color_to_button_map = {widget.color_hex: widget.button_name for widget in self.color_button_widgets}
@@ -1701,9 +1739,10 @@ class PlannerMainWindow(QMainWindow):
 
     def save(self):
         logger.debug("saving field coordinates")
-        self.clear_parcels()
+        # Parcel layers are diffed by generate_parcels below, only the routes are dropped here
+        if self.clear_routes():
+            self.update_total_length_label(0)
         self.paths_by_color = {}
-        self.current_path = None
 
         try:
             t_l_lat = self._parse_float(self.top_left_lat_input.text())
@@ -1725,6 +1764,7 @@ class PlannerMainWindow(QMainWindow):
             [b_r_lat, b_r_lon],  # Bottom-right
             [b_l_lat, b_l_lon]   # Bottom-left
         ]
+        self.projection = LocalProjection.from_corners(area_corners)
         self.width = app_state.width
         self.height = app_state.height
         self.gap_x = app_state.gap_x
@@ -1736,34 +1776,10 @@ class PlannerMainWindow(QMainWindow):
         app_state.fit_gap = preserve_parcel_size
         if is_fit:
             # Calculate the distance between the corners (top-left and top-right for width, top-left and bottom-left for height)
-            top_left = (t_l_lat, t_l_lon)
-            top_right = (t_r_lat, t_r_lon)
-            bottom_left = (b_l_lat, b_l_lon)
-
-            # Calculate total width and height using haversine formula or simple Euclidean distance
-            def haversine(lat1, lon1, lat2, lon2):
-                from math import radians, cos, sin, sqrt, atan2
-                
-                # Approximate radius of earth in km
-                R = 6371.0
-                
-                lat1, lon1 = radians(lat1), radians(lon1)
-                lat2, lon2 = radians(lat2), radians(lon2)
-
-                dlat = lat2 - lat1
-                dlon = lon2 - lon1
-                
-                a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-                c = 2 * atan2(sqrt(a), sqrt(1 - a))
-                
-                return R * c * 1000  # Return distance in meters
-
-            total_width = haversine(t_l_lat, t_l_lon, t_r_lat, t_r_lon)  # Distance between top-left and top-right corners
-            total_height = haversine(t_l_lat, t_l_lon, b_l_lat, b_l_lon)  # Distance between top-left and bottom-left corners
-
-            # Calculate the new parcel width, height, gap_x, and gap_y based on the total area and the number of parcels
-            self.exact_width = total_width / self.count_x  # Adjust width to fit within the area
-            self.exact_height = total_height / self.count_y  # Adjust height to fit within the area
+            # Fit the parcel width and height to the edges of the area (top edge / left edge)
+            self.exact_width, self.exact_height, total_width, total_height = fitted_parcel_size(
+                self.projection, area_corners, self.count_x, self.count_y
+            )
             self.width = round(self.exact_width)
             self.height = round(self.exact_height)
 
@@ -1829,30 +1845,6 @@ class PlannerMainWindow(QMainWindow):
             return
         
 
-        js_code = "var parcels = [];\n"  # Initialize the parcels array
-        for i, parcel_info in enumerate(self.parcel_coordinates):
-            coordinates = parcel_info['coordinates']
-            color = parcel_info['color']
-            js_code += f"""
-            var parcelCoords{i} = {coordinates};
-            var parcel{i} = new google.maps.Polygon({{
-                paths: parcelCoords{i},
-                editable: false,
-                draggable: false,
-                strokeColor: '#000000',
-                strokeOpacity: 0.8,
-                strokeWeight: 1,
-                fillColor: '{color}',
-                fillOpacity: 0.35,
-                map: map
-            }});
-            parcels.push(parcel{i});
-            """
-            self.parcel_js_references.append(f"parcel{i}")
-
-        # Optionally run the JavaScript to add these polygons to the map:
-        # self.map_widget.view.page().runJavaScript(js_code)
-
         # Re-center the map on the middle of the field
         center_lat = (t_l_lat + b_l_lat + t_r_lat + b_r_lat) / 4
         center_lon = (t_l_lon + b_r_lon + t_r_lon + b_l_lon) / 4
@@ -1863,7 +1855,7 @@ class PlannerMainWindow(QMainWindow):
         self.change_language(app_state.language)
 
     def window(self, window):
-        logger.debug(f"window defined for the value of: {window}")
+        logger.debug("window defined for the value of: %s", window)
         self.main_window = window
 
     def back(self):
@@ -1906,14 +1898,14 @@ class PlannerMainWindow(QMainWindow):
         self.hide()
 
     def get_color(self, i):
-        logger.debug(f"color getting for the value of: {i}")
+        logger.debug("color getting for the value of: %s", i)
         try:
             return self.color_codes_list[i]
         except:
             return "#964B00"
         
     def show_warning(self, title, content):
-        logger.debug(f"showing warning with the value of: {title, content}")
+        logger.debug("showing warning with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setText(self.tr(title))
@@ -1929,7 +1921,7 @@ class PlannerMainWindow(QMainWindow):
             print("User clicked Cancel or closed the dialog")
 
     def show_info(self, title, content):
-        logger.debug(f"showing info with the value of: {title, content}")
+        logger.debug("showing info with the value of: %s", (title, content))
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Icon.Information)  # Set the icon to Information
         msg.setText(title)
@@ -1948,7 +1940,7 @@ class PlannerMainWindow(QMainWindow):
     
     def calculate_top_center(self, top_left, top_right):
         """Calculates the top center of a parcel"""
-        logger.debug(f"calculating top center for the value of: {top_left, top_right}")
+        path_tracer.sampled("calculating top center", top_left=top_left, top_right=top_right)
         lat1, lon1 = float(top_left['lat']), float(top_left['lng'])
         lat2, lon2 = float(top_right['lat']), float(top_right['lng'])
         center_lat = (lat1 + lat2) / 2
@@ -1957,7 +1949,7 @@ class PlannerMainWindow(QMainWindow):
 
     def calculate_bottom_center(self, bottom_left, bottom_right):
         """Calculates the bottom center of a parcel"""
-        logger.debug(f"calculating bottom center for the value of: {bottom_left, bottom_right}")
+        path_tracer.sampled("calculating bottom center", bottom_left=bottom_left, bottom_right=bottom_right)
         lat1, lon1 = float(bottom_left['lat']), float(bottom_left['lng'])
         lat2, lon2 = float(bottom_right['lat']), float(bottom_right['lng'])
         center_lat = (lat1 + lat2) / 2
@@ -1990,7 +1982,7 @@ class PlannerMainWindow(QMainWindow):
 
         # Check if the path for the current color already exists
         if self.current_color in self.paths_by_color:
-            logger.debug(f"Path for color {self.current_color} already exists. Displaying saved path.")
+            path_tracer.debug("path for color already exists, displaying saved path", color=self.current_color)
             self.path = self.paths_by_color[self.current_color]
             parcel_points = self.parcel_points_by_color.get(self.current_color, [])
             self.draw_path_on_map(self.path, parcel_points)
@@ -1998,37 +1990,35 @@ class PlannerMainWindow(QMainWindow):
             self.update_total_length_label(total_distance)
             return True  # Exit the method since the path is already generated
 
-        # Check if the parcel height can be fully divided by the spraying width (float-safe)
-        ratio = self.width / spraying_width
-        nearest = round(ratio)
-        if nearest <= 0 or abs(ratio - nearest) > 1e-6:
+        # Generate the passes of every parcel of this color at once in the local plane
+        # (planning.passes); the parcel height must be a whole number of spraying widths
+        selected = parcels_of_color(all_parcels, self.current_color)
+        try:
+            tops, bottoms = generate_passes(selected, self._field_projection(), self.width, spraying_width)
+        except ValueError:
             self.show_warning(self.tr("Spraying Width Error"), self.tr("The parcel height cannot be evenly divided by the spraying width."))
             return
 
-        # Prepare to store the parcel points and paths
-        if self.current_color in self.paths_by_color:
-            self.paths_by_color[self.current_color] = []
-            self.parcel_points_by_color[self.current_color] = []
-
-        num_passes = max(1, int(round(ratio)))
         color_parcels = []
-        parcel_points = []
-        path = []
-
-        # Generate the passes and calculate top and bottom coordinates for each parcel
-        for parcel in all_parcels:
-            if parcel['color'] == self.current_color:
-                for i in range(num_passes):
-                    # Calculate the top and bottom coordinates for each pass
-                    factor = (i + 0.5) * spraying_width / self.width  # How far from top to bottom
-                    pass_top = self.calculate_intermediate_point(parcel['coordinates'][0], parcel['coordinates'][1], factor)
-                    pass_bottom = self.calculate_intermediate_point(parcel['coordinates'][3], parcel['coordinates'][2], factor)
-                    color_parcels.append({'top_center': pass_top, 'bottom_center': pass_bottom})
-                    path.append(pass_top)
-                    path.append(pass_bottom)
-                    self.path_color = parcel['color']
-                    # Store the parcel points to redisplay later
-                    parcel_points.append({'top': pass_top, 'bottom': pass_bottom})
+        if selected:
+            self.path_color = self.current_color
+            # Back to (lat, lon) once for all passes, in parcel order
+            tops = self.projection.to_geodetic(tops).tolist()
+            bottoms = self.projection.to_geodetic(bottoms).tolist()
+            color_parcels = [
+                {'top_center': tuple(pass_top), 'bottom_center': tuple(pass_bottom)}
+                for pass_top, pass_bottom in zip(tops, bottoms)
+            ]
+            if self._get_route_mode() == ROUTE_SWEEP:
+                # Grid column / row / strip of every pass for the grid sweep (parcel ids are row-major)
+                parcel_ids = parcel_ids_by_color(all_parcels).get(normalize_color(self.current_color), [])
+                columns, rows, strips = pass_grid_indices(
+                    parcel_ids, self.count_x, passes_per_parcel(self.width, spraying_width)
+                )
+                for color_parcel, column, row, strip in zip(color_parcels, columns.tolist(), rows.tolist(), strips.tolist()):
+                    color_parcel['column'] = column
+                    color_parcel['row'] = row
+                    color_parcel['strip'] = strip
 
         # Check if multiple parcels exist for scanning
         if len(color_parcels) > 1:
@@ -2062,124 +2052,106 @@ class PlannerMainWindow(QMainWindow):
 
 
     def calculate_total_distance(self, path_coordinates):
-        logger.debug(f"Calculating total distance for path: {path_coordinates}")
-        total_distance = 0
-        for i in range(len(path_coordinates) - 1):
-            total_distance += self.haversine_distance(path_coordinates[i], path_coordinates[i + 1])
-        return total_distance
+        path_tracer.debug("calculating total distance", path=path_coordinates)
+        # Vectorized and cached per path, so redisplaying a colour does not redo the trig
+        return self.distance_service.path_length(path_coordinates)
+
+    def _field_projection(self):
+        """
+        Local east-north plane used for all pass and buffer geometry.
+        Normally built from the field corners in save(); a restored state without a save()
+        falls back to the first parcel corner as the origin.
+        """
+        if self.projection is None:
+            origin = self.parcel_coordinates[0]['coordinates'][0] if self.parcel_coordinates else None
+            if origin is not None:
+                self.projection = LocalProjection(float(origin['lat']), float(origin['lng']))
+            else:
+                self.projection = LocalProjection(*self._get_corner_coords()["A"])
+        return self.projection
 
     def calculate_intermediate_point(self, point1, point2, factor):
         """
         Calculate an intermediate point between two points, determined by the factor.
         Factor should be a value between 0 and 1, where 0 is point1 and 1 is point2.
         """
-        logger.debug(f"calculating intermediate point with the value of: {point1, point2, factor}")
-        lat1, lon1 = float(point1['lat']), float(point1['lng'])
-        lat2, lon2 = float(point2['lat']), float(point2['lng'])
-        
-        intermediate_lat = lat1 + factor * (lat2 - lat1)
-        intermediate_lon = lon1 + factor * (lon2 - lon1)
-        
-        return (intermediate_lat, intermediate_lon)
+        projection = self._field_projection()
+        start, end = projection.to_local([
+            (float(point1['lat']), float(point1['lng'])),
+            (float(point2['lat']), float(point2['lng'])),
+        ])
+        return projection.point_to_geodetic(start + factor * (end - start))
 
     def create_scanning_path(self, parcels):
-        logger.debug(f"creating scanning path with the value of: {parcels}")
+        path_tracer.debug("creating scanning path", passes=len(parcels))
         """
         This function ensures each parcel is fully scanned from top-to-bottom or bottom-to-top,
         then transitions to the next parcel's center (either top or bottom) based on the shortest distance.
+
+        The pass order comes from ScanPathOptimizer: a greedy nearest-neighbour tour over a grid
+        index of pass endpoints, refined by 2-opt / Or-opt within a small time budget. Passes that
+        carry their grid 'column' / 'row' / 'strip' (grid sweep selected) are flown as a serpentine sweep
+        instead; only when compared is the greedy route planned as well, and flown where the sweep is worse.
         """
-        # Start at the first parcel
-        current_index = 0
-        n = len(parcels)
-        visited = [False] * n
-        visited[current_index] = True
-        path = []
-        total_distance = 0
-        parcel_points = []
-
-        # Initially start scanning the first parcel from top to bottom
-        parcels[current_index]['top_center_unbuffered'] = parcels[current_index]['top_center']
-        parcels[current_index]['bottom_center_unbuffered'] = parcels[current_index]['bottom_center']
-        parcels[current_index]['top_center'], parcels[current_index]['bottom_center'] = self.add_acceleration_buffer(
-            parcels[current_index]['top_center'],
-            parcels[current_index]['bottom_center'],
-            self.acc_buffer
-        )
-        path.append(parcels[current_index]['top_center'])
-        path.append(parcels[current_index]['bottom_center'])
-        parcel_points.append({
-            'start': parcels[current_index]['top_center_unbuffered'],
-            'end': parcels[current_index]['bottom_center_unbuffered']
-        })
-        current_position = parcels[current_index]['bottom_center']
-        total_distance += self.haversine_distance(parcels[current_index]['top_center'], current_position)
-
-        for _ in range(n - 1):
-            nearest_index = None
-            nearest_distance = float('inf')
-            next_position = None
-            next_scan_order = None
-
-            # Find the nearest unvisited parcel by comparing distances to top and bottom centers
-            for i in range(n):
-                if not visited[i]:
-                    # Calculate distance from current position to both top and bottom of the next parcel
-                    distance_to_top = self.haversine_distance(current_position, parcels[i]['top_center'])
-                    distance_to_bottom = self.haversine_distance(current_position, parcels[i]['bottom_center'])
-
-                    # Choose the shorter distance and decide the scan order
-                    if distance_to_top < distance_to_bottom:
-                        distance = distance_to_top
-                        scan_order = 'top_to_bottom'
-                        position = parcels[i]['top_center']
-                    else:
-                        distance = distance_to_bottom
-                        scan_order = 'bottom_to_top'
-                        position = parcels[i]['bottom_center']
-
-                    if distance < nearest_distance:
-                        nearest_distance = distance
-                        nearest_index = i
-                        next_scan_order = scan_order
-                        next_position = position
-
-            # Now, based on the chosen scan order, scan the next parcel
-            if next_scan_order == 'top_to_bottom':
-                parcels[nearest_index]['top_center_unbuffered'] = parcels[nearest_index]['top_center']
-                parcels[nearest_index]['bottom_center_unbuffered'] = parcels[nearest_index]['bottom_center']
-                parcels[nearest_index]['top_center'], parcels[nearest_index]['bottom_center'] = self.add_acceleration_buffer(
-                    parcels[nearest_index]['top_center'],
-                    parcels[nearest_index]['bottom_center'],
-                    self.acc_buffer
+        if not parcels:
+            return [], 0, []
+
+        # Project pass endpoints to the local plane of the field (meters)
+        projection = self._field_projection()
+        tops = projection.to_local([parcel['top_center'] for parcel in parcels])
+        bottoms = projection.to_local([parcel['bottom_center'] for parcel in parcels])
+
+        # Once the ground speed is known, routes are chosen by estimated flight time (planning.kinematics)
+        flight_model = self._flight_model()
+        cost_model = flight_model if self.objective_combo.currentData() == OBJECTIVE_TIME else None
+        home, altitude = self._mission_home_and_altitude()
+
+        self.total_length_label.setToolTip("")
+        if 'column' in parcels[0]:
+            grid = (
+                [parcel['column'] for parcel in parcels], [parcel['row'] for parcel in parcels],
+                [parcel['strip'] for parcel in parcels],
+            )
+            if self.compare_routes_checkbox.isChecked():
+                # Grid sweep against the greedy route (planning.sweep); the sweep is flown only when it is no worse
+                with path_tracer.span("grid sweep and optimized pass order", passes=len(parcels)):
+                    greedy, sweep, comparison = plan_routes(
+                        tops, bottoms, *grid, projection, self.acc_buffer, distance_service=self.distance_service,
+                        cost_model=cost_model, home=home,
+                    )
+                route = preferred_route(greedy, sweep, comparison)
+                logger.info(
+                    "Grid sweep %.1f m / %d turns, greedy %.1f m / %d turns (%+.1f %%), flying the %s route",
+                    comparison['sweep_m'], comparison['sweep_turns'],
+                    comparison['greedy_m'], comparison['greedy_turns'], comparison['saving_pct'], comparison['route'],
                 )
-                path.append(parcels[nearest_index]['top_center'])
-                path.append(parcels[nearest_index]['bottom_center'])
-                parcel_points.append({
-                    'start': parcels[nearest_index]['top_center_unbuffered'],
-                    'end': parcels[nearest_index]['bottom_center_unbuffered']
-                })
-                total_distance += nearest_distance
-                total_distance += self.haversine_distance(parcels[nearest_index]['top_center'], parcels[nearest_index]['bottom_center'])
-                current_position = parcels[nearest_index]['bottom_center']
+                self.total_length_label.setToolTip(self.tr(
+                    "Grid sweep: {0:.1f} m, {1} turns\nGreedy: {2:.1f} m, {3} turns\nFlown: {4}"
+                ).format(
+                    comparison['sweep_m'], comparison['sweep_turns'], comparison['greedy_m'], comparison['greedy_turns'],
+                    self.tr("grid sweep") if comparison['route'] == ROUTE_SWEEP else self.tr("greedy"),
+                ))
             else:
-                parcels[nearest_index]['bottom_center_unbuffered'] = parcels[nearest_index]['bottom_center']
-                parcels[nearest_index]['top_center_unbuffered'] = parcels[nearest_index]['top_center']
-                parcels[nearest_index]['bottom_center'], parcels[nearest_index]['top_center'] = self.add_acceleration_buffer(
-                    parcels[nearest_index]['bottom_center'],
-                    parcels[nearest_index]['top_center'],
-                    self.acc_buffer
+                # Serpentine grid sweep over the parcel columns / rows (planning.sweep), linear in the passes
+                with path_tracer.span("grid sweep", passes=len(parcels)):
+                    route = plan_sweep(tops, bottoms, *grid, projection, self.acc_buffer, cost_model=cost_model)
+        else:
+            # Optimized pass order with acceleration buffers (planning.route); endpoint matrices are
+            # cached per layout by the shared distance service
+            with path_tracer.span("optimized pass order", passes=len(parcels)):
+                route = plan_route(
+                    tops, bottoms, projection, self.acc_buffer, distance_service=self.distance_service,
+                    cost_model=cost_model, home=home,
                 )
-                path.append(parcels[nearest_index]['bottom_center'])
-                path.append(parcels[nearest_index]['top_center'])
-                parcel_points.append({
-                    'start': parcels[nearest_index]['bottom_center_unbuffered'],
-                    'end': parcels[nearest_index]['top_center_unbuffered']
-                })
-                total_distance += nearest_distance
-                total_distance += self.haversine_distance(parcels[nearest_index]['bottom_center'], parcels[nearest_index]['top_center'])
-                current_position = parcels[nearest_index]['top_center']
-
-            visited[nearest_index] = True
+        path, parcel_points = route.path, route.parcel_points
+        self.routes_by_color[self.current_color] = route
+
+        if flight_model is not None:
+            self.update_flight_time_label(flight_model.estimate_route(route, projection, home, altitude))
+        else:
+            self.update_flight_time_label(None)
+
+        total_distance = self.calculate_total_distance(path)
 
         return path, total_distance, parcel_points
 
@@ -2195,174 +2167,50 @@ class PlannerMainWindow(QMainWindow):
         :param distance: The distance to extend (in meters).
         :return: The new start and end coordinates with extended path.
         """
-        logger.debug(f"adding acceleration buffer with the value of: {start_point, end_point, distance}")
-        # Convert lat/lng to radians
-        lat1, lon1 = math.radians(start_point[0]), math.radians(start_point[1])
-        lat2, lon2 = math.radians(end_point[0]), math.radians(end_point[1])
-
-        # Calculate the bearing (direction) from start_point to end_point
-        bearing = math.atan2(math.sin(lon2 - lon1) * math.cos(lat2),
-                            math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(lon2 - lon1))
-
-        # Earth's radius in meters
-        R = 6371000
-
-        # Extend the start point by `-distance` meters (going backwards)
-        extended_start_lat = math.asin(math.sin(lat1) * math.cos(distance / R) +
-                                    math.cos(lat1) * math.sin(distance / R) * math.cos(bearing + math.pi))
-        extended_start_lon = lon1 + math.atan2(math.sin(bearing + math.pi) * math.sin(distance / R) * math.cos(lat1),
-                                            math.cos(distance / R) - math.sin(lat1) * math.sin(extended_start_lat))
-
-        # Extend the end point by `distance` meters (going forwards)
-        extended_end_lat = math.asin(math.sin(lat2) * math.cos(distance / R) +
-                                    math.cos(lat2) * math.sin(distance / R) * math.cos(bearing))
-        extended_end_lon = lon2 + math.atan2(math.sin(bearing) * math.sin(distance / R) * math.cos(lat2),
-                                            math.cos(distance / R) - math.sin(lat2) * math.sin(extended_end_lat))
-
-        # Convert extended coordinates back to degrees
-        extended_start_point = (math.degrees(extended_start_lat), math.degrees(extended_start_lon))
-        extended_end_point = (math.degrees(extended_end_lat), math.degrees(extended_end_lon))
-
-        return extended_start_point, extended_end_point
-
-
-    def haversine_distance(self, coord1, coord2):
-        """Calculate the great-circle distance between two points on the Earth's surface in meters."""
-        logger.debug(f"calculating haversine distance with the value of: {coord1, coord2}")
-        # Ensure coordinates are being parsed as floats
-        lat1, lon1 = float(coord1[0]), float(coord1[1])
-        lat2, lon2 = float(coord2[0]), float(coord2[1])
-        
-        # Earth’s radius in meters (not kilometers)
-        R = 6371000  # meters
-
-        # Convert degrees to radians
-        phi1, phi2 = math.radians(lat1), math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lon2 - lon1)
-
-        # Haversine formula
-        a = math.sin(delta_phi / 2.0) ** 2 + \
-            math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        projection = self._field_projection()
+        start, end = projection.to_local([start_point, end_point])
+        extended_start, extended_end = extend_segments(start, end, float(distance))
+        return projection.point_to_geodetic(extended_start), projection.point_to_geodetic(extended_end)
 
-        distance = R * c  # Distance in meters
-        return distance  # Return the distance in meters
 
     def draw_path_on_map(self, path_coordinates, parcel_points):
-        logger.debug(f"drawing path on the map with the value of: {path_coordinates}")
-
-        js_code = ""
-
-        # JavaScript to remove the previous path if it exists
-        if self.current_path is not None:
-            js_code += f"{self.current_path}.remove();\n"
-
-        # JavaScript to remove the previous start and end markers if they exist
-        if self.current_start_marker is not None:
-            js_code += f"{self.current_start_marker}.remove();\n"
-        if self.current_end_marker is not None:
-            js_code += f"{self.current_end_marker}.remove();\n"
-
-        # Remove previous parcel markers
-        if hasattr(self, 'parcel_marker_js_references') and self.parcel_marker_js_references:
-            for marker_ref in self.parcel_marker_js_references:
-                js_code += f"{marker_ref}.remove();\n"
-            self.parcel_marker_js_references = []
+        path_tracer.debug("drawing path on the map", path=path_coordinates, parcel_points=parcel_points)
 
         # Check if there are coordinates to work with
         if len(path_coordinates) == 0:
             logger.error("No path coordinates provided.")
             return
 
-        # JavaScript to add a marker at the start point (first coordinate) with an "S"
-        start_lat, start_lng = path_coordinates[0]
-        js_code += f"""
-        var startMarker = L.marker([{start_lat}, {start_lng}], {{
-            title: 'Start Point',
-            icon: L.divIcon({{
-                className: 'custom-start-marker',
-                html: '<div style="background-color:#FF0000; border-radius:50%; width:20px; height:20px; line-height:20px; text-align:center; color:white;">S</div>',
-                iconSize: [20, 20]
-            }})
-        }}).addTo(window.mapObject);\n"""
-
-        # JavaScript to add a marker at the end point (last coordinate) with an "F"
-        end_lat, end_lng = path_coordinates[-1]
-        js_code += f"""
-        var endMarker = L.marker([{end_lat}, {end_lng}], {{
-            title: 'End Point',
-            icon: L.divIcon({{
-                className: 'custom-end-marker',
-                html: '<div style="background-color:#0000FF; border-radius:50%; width:20px; height:20px; line-height:20px; text-align:center; color:white;">F</div>',
-                iconSize: [20, 20]
-            }})
-        }}).addTo(window.mapObject);\n"""
-
-        # JavaScript to draw the new path
-        js_code += f"""
-        var pathCoordinates = [{", ".join(f"[{coord[0]}, {coord[1]}]" for coord in path_coordinates)}];
-        var parcelPath = L.polyline(pathCoordinates, {{
-            color: '#FF0000',
-            weight: 2,
-            opacity: 1.0,
-            smoothFactor: 1
-        }}).addTo(window.mapObject);\n"""
-
-        # Add markers at the start and end of each parcel
-        for idx, parcel_point in enumerate(parcel_points):
-            start_lat, start_lng = parcel_point['start']
-            end_lat, end_lng = parcel_point['end']
-
-            # Add marker at start
-            marker_start_name = f"parcelStartMarker{idx}"
-            js_code += f"""
-            var {marker_start_name} = L.marker([{start_lat}, {start_lng}], {{
-                title: 'Parcel Start Point {idx+1}',
-                icon: L.divIcon({{
-                    className: 'custom-parcel-marker',
-                    html: '<div style="background-color:#000000; border-radius:50%; width:5px; height:5px;"></div>',
-                    iconSize: [5, 5]
-                }})
-            }}).addTo(window.mapObject);\n"""
-            self.parcel_marker_js_references.append(marker_start_name)
-
-            # Add marker at end
-            marker_end_name = f"parcelEndMarker{idx}"
-            js_code += f"""
-            var {marker_end_name} = L.marker([{end_lat}, {end_lng}], {{
-                title: 'Parcel End Point {idx+1}',
-                icon: L.divIcon({{
-                    className: 'custom-parcel-marker',
-                    html: '<div style="background-color:#000000; border-radius:50%; width:5px; height:5px;"></div>',
-                    iconSize: [5, 5]
-                }})
-            }}).addTo(window.mapObject);\n"""
-            self.parcel_marker_js_references.append(marker_end_name)
-
-        # Run the accumulated JavaScript code
-        self.map_widget.view.page().runJavaScript(js_code)
-
-        # Update the references for the current path, start marker, and end marker
-        self.current_path = 'parcelPath'
-        self.current_start_marker = 'startMarker'
-        self.current_end_marker = 'endMarker'
+        # One route layer per colour: redrawing sends only what changed, switching back to a colour
+        # that was already drawn only toggles visibility
+        overlay = self.map_widget.overlay
+        self.current_path = overlay.show_route(self.current_color, path_coordinates, parcel_points)
+        sent = overlay.flush()
+        path_tracer.debug("route overlay updated", key=self.current_path, bytes=sent)
 
 
     def update_total_length_label(self, total_distance):
         """Update the label with the total path length"""
-        logger.debug(f"updating total length with the value of: {total_distance}")
+        logger.debug("updating total length with the value of: %s", total_distance)
         if total_distance >= 1000:
             self.total_length_label.setText(f"Total Path Length: {total_distance / 1000:.2f} km")
         else:
             self.total_length_label.setText(f"Total Path Length: {total_distance:.2f} meters")
 
+    def update_flight_time_label(self, estimate):
+        """Show a FlightTimeEstimate (or nothing, before the ground speed is calculated)."""
+        if estimate is None:
+            self.flight_time_label.setText("")
+            return
+        minutes, seconds = divmod(int(round(estimate.total_s)), 60)
+        self.flight_time_label.setText(self.tr("Estimated Flight Time: {0}:{1:02d} min").format(minutes, seconds))
+
     def create_mavlink_script(self, path_coordinates):
         """
         Generate a MAVLink script from the given path coordinates.
         :param path_coordinates: A list of tuples (lat, lon) representing the path.
         """
-        logger.debug(f"creating mavlink script with the value of: {path_coordinates}")
+        mission_tracer.debug("creating mavlink script", path=path_coordinates)
         if not path_coordinates:
             self.show_warning(self.tr("Mission cannot be created"), self.tr("To generate the mission successfully save the map location and generate the path."))
             return
@@ -2405,28 +2253,8 @@ class PlannerMainWindow(QMainWindow):
             self.show_warning(self.tr("Invalid lat - lon", "Please enter a valid coordinate."))
             return
 
-        mavlink_data = ["QGC WPL 110"]
-        seq = 0
-
         channel_number, pwm_high, pwm_low = self._get_servo_settings()
 
-        def append_set_servo(servo_number, pwm):
-            nonlocal seq
-            # MAV_CMD_DO_SET_SERVO (183): param1=servo number, param2=pwm
-            # Use MAV_FRAME_MISSION (2) with zero coordinates for reliability.
-            mavlink_data.append(f"{seq}\t0\t2\t183\t{servo_number}\t{pwm}\t0\t0\t0\t0\t0\t1")
-            seq += 1
-
-        # Add home waypoint (this can be adjusted if you have a specific home location)
-        mavlink_data.append(f"{seq}\t1\t0\t16\t3\t0\t0\t0\t{home_lat}\t{home_lon}\t1.990000\t1")
-        seq += 1
-        # Add takeoff command
-        mavlink_data.append(f"{seq}\t0\t3\t22\t0\t0\t0\t0\t0\t0\t{altitude}\t1")
-        seq += 1
-        # Set the ground speed
-        mavlink_data.append(f"{seq}\t0\t3\t178\t1\t{ground_speed_m_s}\t-1\t0\t0\t0\t0\t1")
-        seq += 1
-
         # Get parcel_points for the current color
         parcel_points = self.parcel_points_by_color.get(self.current_color, [])
 
@@ -2434,59 +2262,155 @@ class PlannerMainWindow(QMainWindow):
             self.show_warning(self.tr("No Parcel Points"), self.tr("No parcel points found for the current color."))
             return
 
-        # Ensure the path coordinates match the parcel points
-        if len(path_coordinates) != 2 * len(parcel_points):
+        button_name = self.color_to_button_map.get(self.current_color, "Unknown")
+        route = self.routes_by_color.get(self.current_color)
+        if len(path_coordinates) != 2 * len(parcel_points) or route is None or route.path != path_coordinates:
             self.show_warning(self.tr("Data Mismatch"), self.tr("Path coordinates do not match parcel points."))
             return
 
-        # Iterate over parcels
-        for idx, parcel_point in enumerate(parcel_points):
-            # Indices for path_coordinates
-            i = idx * 2
-
-            # Start point with acceleration buffer
-            lat_start_buffer, lon_start_buffer = path_coordinates[i]
-            # End point with acceleration buffer
-            lat_end_buffer, lon_end_buffer = path_coordinates[i + 1]
-
-            # Actual parcel start and end points from parcel_points
-            lat_start_parcel, lon_start_parcel = parcel_point['start']
-            lat_end_parcel, lon_end_parcel = parcel_point['end']
-
-            # Waypoint to approach start point (with acceleration buffer)
-            mavlink_data.append(f"{seq}\t0\t3\t16\t3\t0\t0\t0\t{lat_start_buffer}\t{lon_start_buffer}\t{altitude}\t1")
-            seq += 1
-
-            # Waypoint at start of parcel (arrive at exact spray start)
-            mavlink_data.append(f"{seq}\t0\t3\t82\t0\t0\t0\t0\t{lat_start_parcel}\t{lon_start_parcel}\t{altitude}\t1")
-            seq += 1
-
-            # Start spraying at the start of the spray area (servo open)
-            append_set_servo(channel_number, pwm_high)
-
-            # Waypoint at end of parcel (arrive at exact spray end)
-            mavlink_data.append(f"{seq}\t0\t3\t82\t0\t0\t0\t0\t{lat_end_parcel}\t{lon_end_parcel}\t{altitude}\t1")
-            seq += 1
-
-            # Stop spraying at the end of the spray area (servo closed)
-            append_set_servo(channel_number, pwm_low)
+        # Split into sorties under the tank / flight time limits (planning.sorties); one mission file each
+        flight_model = self._flight_model()
+        projection = self._field_projection()
+        tank_l, max_flight_s = self._get_sortie_limits()
+        sorties = None
+        if tank_l or max_flight_s:
+            if flight_model is None:
+                self.show_warning(self.tr("Speed Not Calculated"), self.tr("Please calculate the velocity before generating the mission."))
+                return
+            # On the route's own local points, like the headless pipeline
+            try:
+                sorties = split_route(
+                    route, projection, flight_model, self.velocity_results["caldo_per_plot_L"], (home_lat, home_lon),
+                    altitude, tank_l=tank_l, max_flight_s=max_flight_s,
+                )
+            except ValueError as e:
+                self.show_warning(self.tr("Mission cannot be split"), str(e))
+                return
 
-            # Waypoint to move to the end point with acceleration buffer
-            mavlink_data.append(f"{seq}\t0\t3\t16\t3\t0\t0\t0\t{lat_end_buffer}\t{lon_end_buffer}\t{altitude}\t1")
-            seq += 1
+        # Merge collinear passes as selected (planning.compaction) and stream every mission to its file
+        # run by run (planning.mission)
+        reducer = MissionReducer(self._get_mission_mode())
+        if sorties is not None and len(sorties) > 1:
+            missions = [
+                (mission_file_name(name, button_name, app_state.timestamp, sortie.number, sortie.count),
+                 reducer.runs(*sortie.passes_of(path_coordinates, parcel_points)))
+                for sortie in sorties
+            ]
+        else:
+            missions = [(mission_file_name(name, button_name, app_state.timestamp), reducer.runs(path_coordinates, parcel_points))]
 
-        # Add return-to-launch command (MAV_CMD_NAV_RETURN_TO_LAUNCH)
-        mavlink_data.append(f"{seq}\t0\t3\t20\t0\t0\t0\t0\t0\t0\t0\t1")
+        # Triggered runs are refused when no single trigger duration sprays every parcel; every
+        # mission is checked before the first file is written, so no partial sortie set is left behind
+        try:
+            mission_stats = [MissionStats(runs, ground_speed_m_s) for _, runs in missions]
+        except ValueError as e:
+            self.show_warning(self.tr("Mission cannot be created"), str(e))
+            return
 
-        # Define the file path
-        button_name = self.color_to_button_map.get(self.current_color, "Unknown")
-        file_path = os.path.join(missions_dir, f"{name}_{button_name}_{app_state.timestamp}_generated_mavlink_script.waypoints")
+        messages = []
+        too_large = False
+        for (file_name, runs), stats in zip(missions, mission_stats):
+            file_path = os.path.join(missions_dir, file_name)
+            with MissionWriter(file_path, (home_lat, home_lon), altitude, ground_speed_m_s, channel_number, pwm_high, pwm_low) as writer:
+                writer.add_runs(runs)
+            too_large = too_large or stats.exceeds()
+            logger.info("Mission %s: %s", file_path, stats.summary())
+            messages.append(f"'{file_path}'\n\n{stats.summary()}.")
+
+        if len(missions) > 1:
+            message = self.tr("MAVLink scripts of {0} sorties generated:").format(len(missions)) + "\n\n"
+            message += "\n\n".join(
+                f"{text}\n{sortie.liquid_l:.1f} L, {sortie.flight_s / 60:.1f} min"
+                for text, sortie in zip(messages, sorties)
+            )
+            message += f"\n\n{sorties.summary()}."
+        else:
+            message = f"MAVLink script generated and saved at {messages[0]}"
+            if flight_model is not None:
+                estimate = flight_model.estimate_route(route, projection, (home_lat, home_lon), altitude)
+                message += f"\n{estimate.summary()}."
+        if too_large:
+            message += "\n\n" + self.tr("The mission may exceed the item limit of the autopilot.")
+        self.show_info("Mission created successfully", message)
+
+    def export_all_missions(self):
+        """
+        Plan and write the mission of every colour of the layout in one go, one .waypoints file per
+        colour (per sortie under the tank / flight time limits) under missions_dir, with a progress
+        dialog. Colours without sprayer parameters are skipped and listed afterwards.
+        """
+        mission_tracer.debug("exporting all missions")
+        channel_number, pwm_high, pwm_low = self._get_servo_settings()
+        tank_l, max_flight_s = self._get_sortie_limits()
+        try:
+            planner = MissionPlanner.from_state(
+                self.collect_app_state(), servo_channel=channel_number, pwm_high=pwm_high, pwm_low=pwm_low,
+                mission_mode=self._get_mission_mode(), route_mode=self._get_route_mode(),
+                objective=self.objective_combo.currentData() or OBJECTIVE_TIME, flight_limits=self._get_flight_limits(),
+                tank_l=tank_l, max_flight_s=max_flight_s,
+                compare=self._get_route_mode() == ROUTE_SWEEP and self.compare_routes_checkbox.isChecked(),
+            )
+            colors = planner.colors()
+        except (PlanningError, ValueError) as e:
+            self.show_warning(self.tr("Missions cannot be created"), str(e))
+            return
 
-        # Save to file
-        with open(file_path, "w") as file:
-            file.write("\n".join(mavlink_data))
+        if not colors:
+            self.show_warning(self.tr("No Parcel Points"), self.tr("No colored parcels found in the layout."))
+            return
 
-        self.show_info("Mission created successfully", f"MAVLink script generated and saved at '{file_path}'")
+        # One timestamp per export, so the files of one export belong together
+        timestamp = time.strftime('%Y-%m-%d_%H-%M-%S')
+        dialog = QProgressDialog(self.tr("Exporting missions..."), self.tr("Cancel"), 0, len(colors), self)
+        dialog.setWindowTitle(self.tr("Export All Missions"))
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(0)
+
+        def progress(done, total, color):
+            dialog.setValue(done)
+            if color is not None:
+                dialog.setLabelText(self.tr("Planning {0} ({1}/{2})...").format(self.hex_to_color_name(color), done + 1, total))
+            QApplication.processEvents()
+            return not dialog.wasCanceled()
+
+        failed = []
+        results = planner.write_missions(
+            missions_dir,
+            on_error=lambda color, e: failed.append(f"{self.hex_to_color_name(color)}: {e}"),
+            progress=progress,
+            file_name=lambda plan, sortie=None: mission_file_name(
+                plan.name, plan.button_name, timestamp, *((sortie.number, sortie.count) if sortie else ())
+            ),
+        )
+        dialog.close()
+
+        written = [result for result in results if "file" in result]
+        files = sum(len(result["files"]) for result in written)
+        message = self.tr("{0} mission(s) saved in '{1}'.").format(files, missions_dir)
+        triggered = [result for result in written if result.get("trigger_duration_s")]
+        if triggered:
+            message += "\n" + self.tr("Set {0} for the distance trigger: {1}.").format(
+                TRIGGER_DURATION_PARAM,
+                ", ".join(f"{result['name']} {result['trigger_duration_s']:.2f} s" for result in triggered),
+            )
+        split = [result for result in written if "sorties" in result]
+        if split:
+            message += "\n" + self.tr("Split into sorties: {0}.").format(
+                ", ".join(f"{result['name']} ({len(result['sorties'])})" for result in split)
+            )
+        if written:
+            message += "\n" + self.tr("{0} mission items, estimated upload {1:.0f} s.").format(
+                sum(result["items"] for result in written), sum(result["upload_s"] for result in written)
+            )
+            message += "\n" + self.tr("Estimated flight time: {0:.1f} min in total.").format(
+                sum(result["flight_time_s"] for result in written) / 60
+            )
+        if failed:
+            message += "\n\n" + self.tr("Skipped:") + "\n" + "\n".join(failed)
+        if dialog.wasCanceled():
+            message += "\n\n" + self.tr("Export was cancelled.")
+        logger.info("Exported %d mission(s), %d skipped", len(written), len(failed))
+        self.show_info(self.tr("Missions exported"), message)
 
     def remove_acceleration_buffer(self, start_point, end_point, distance=2):
         """
@@ -2496,29 +2420,12 @@ class PlannerMainWindow(QMainWindow):
         :param distance: The buffer distance in meters.
         :return: The new point without the buffer.
         """
-        logger.debug(f"Removing acceleration buffer with the value of: {start_point, end_point, distance}")
-        # Convert lat/lon to radians
-        lat1, lon1 = math.radians(start_point[0]), math.radians(start_point[1])
-        lat2, lon2 = math.radians(end_point[0]), math.radians(end_point[1])
-
-        # Calculate the bearing from start_point to end_point
-        bearing = math.atan2(math.sin(lon2 - lon1) * math.cos(lat2),
-                            math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(lon2 - lon1))
-
-        # Earth's radius in meters
-        R = 6371000
-
-        # Move 'distance' meters from start_point towards end_point along the bearing
+        # Move 'distance' meters from start_point towards end_point
         # This effectively removes the acceleration buffer
-        new_lat = math.asin(math.sin(lat1) * math.cos(distance / R) +
-                            math.cos(lat1) * math.sin(distance / R) * math.sin(bearing))
-        new_lon = lon1 + math.atan2(math.sin(bearing) * math.sin(distance / R) * math.cos(lat1),
-                                    math.cos(distance / R) - math.sin(lat1) * math.sin(new_lat))
-
-        # Convert back to degrees
-        new_start_point = (math.degrees(new_lat), math.degrees(new_lon))
-
-        return new_start_point
+        projection = self._field_projection()
+        start, end = projection.to_local([start_point, end_point])
+        new_start = start + unit_vector(end - start) * float(distance)
+        return projection.point_to_geodetic(new_start)
     
     def confirm_quit(self):
         """Show a confirmation dialog before quitting."""
@@ -0,0 +1,61 @@
+"""
+GUI-free planning core: layout, colour map and sprayer parameters in; passes, route and
+mission out. Used by the planner window and by the headless tools (batch_missions.py).
+
+Nothing here imports Qt. The numpy-backed modules (layout, passes, route, sweep, kinematics,
+sorties, pipeline) are loaded on first use, so `import planning` stays cheap.
+"""
+import importlib
+
+from planning.common import BUTTON_COLORS, COLOR_NAMES, parse_float, normalize_color, color_name, button_number
+from planning.velocity import SprayerParams, calculate_velocity
+from planning.mission import mission_lines, mission_items, mission_file_name, write_mission, MissionWriter
+from planning.compaction import MISSION_MODES, MissionReducer, MissionStats, SprayRun
+from planning.report import report_lines
+
+# Attribute -> submodule, imported lazily (PEP 562)
+_LAZY = {
+    "FieldLayout": "planning.layout",
+    "color_codes_list": "planning.layout",
+    "area_corners_from_location": "planning.layout",
+    "fitted_parcel_size": "planning.layout",
+    "generate_passes": "planning.passes",
+    "passes_per_parcel": "planning.passes",
+    "parcels_of_color": "planning.passes",
+    "parcels_by_color": "planning.passes",
+    "parcel_ids_by_color": "planning.passes",
+    "pass_grid_indices": "planning.passes",
+    "Route": "planning.route",
+    "plan_route": "planning.route",
+    "plan_sweep": "planning.sweep",
+    "compare_routes": "planning.sweep",
+    "plan_routes": "planning.sweep",
+    "ROUTE_MODES": "planning.sweep",
+    "FlightLimits": "planning.kinematics",
+    "FlightTimeModel": "planning.kinematics",
+    "FlightTimeEstimate": "planning.kinematics",
+    "Sortie": "planning.sorties",
+    "SortiePlan": "planning.sorties",
+    "split_route": "planning.sorties",
+    "MissionPlanner": "planning.pipeline",
+    "ColorPlan": "planning.pipeline",
+    "PlanningError": "planning.pipeline",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'planning' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+__all__ = [
+    "BUTTON_COLORS", "COLOR_NAMES", "parse_float", "normalize_color", "color_name", "button_number",
+    "SprayerParams", "calculate_velocity",
+    "mission_lines", "mission_items", "mission_file_name", "write_mission", "MissionWriter",
+    "MISSION_MODES", "MissionReducer", "MissionStats", "SprayRun",
+    "report_lines",
+] + list(_LAZY)
@@ -0,0 +1,43 @@
+# Shared constants and input parsing of the planning core (no numpy, no Qt)
+
+# Colour buttons of the grid editor, in button-number order (button 1 = red, ...)
+BUTTON_COLORS = [
+    "#ff0000", "#0000ff", "#ffff00", "#00ffff", "#ff00ff",
+    "#808080", "#8b0000", "#006400", "#00008b", "#b8860b",
+]
+
+COLOR_NAMES = {
+    "#ff0000": "Red",
+    "#0000ff": "Blue",
+    "#ffff00": "Yellow",
+    "#00ffff": "Cyan",
+    "#ff00ff": "Magenta",
+    "#808080": "Gray",
+    "#8b0000": "Dark red",
+    "#006400": "Dark green",
+    "#00008b": "Dark blue",
+    "#b8860b": "Dark yellow",
+    "#ffffff": "White",
+}
+
+
+def parse_float(value):
+    """Accept both comma and dot as decimal separators."""
+    return float(str(value).strip().replace(",", "."))
+
+
+def normalize_color(color):
+    """'#FF0000' / 'ff0000' -> '#ff0000'."""
+    color = str(color).lower()
+    return color if color.startswith("#") else "#" + color
+
+
+def color_name(hex_code):
+    """Human readable name of a button colour ("White" when unknown)."""
+    return COLOR_NAMES.get(normalize_color(hex_code), "White")
+
+
+def button_number(color):
+    """Button number (1-based) of a colour, or None if it is not a button colour."""
+    color = normalize_color(color)
+    return BUTTON_COLORS.index(color) + 1 if color in BUTTON_COLORS else None
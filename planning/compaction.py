@@ -0,0 +1,286 @@
+import math
+
+# Mission post-processing: the same flight in fewer mission items (no numpy, no Qt)
+#
+# A plain mission spends six items on every pass (buffered start, spray start, servo on, spray end,
+# servo off, buffered end). Passes flown one after the other on the same straight line, typically
+# adjacent parcels of one column, are merged into one run: the drone keeps going instead of
+# braking into the buffer of one parcel and accelerating out of the buffer of the next, and the
+# two buffer waypoints of every joint disappear. Segments that touch (no gap between the parcels)
+# are sprayed as one. Evenly spaced segments of a run can be sprayed by distance triggering: the
+# sprayer is wired as the camera trigger and MAV_CMD_DO_SET_CAM_TRIGG_DIST fires it once per
+# parcel, so a run of any length costs six items.
+#
+# A trigger is a pulse, not a switch: the sprayer stays open for the autopilot's trigger duration
+# (ArduPilot CAM1_DURATION), one value for the whole mission. It has to equal the time to fly one
+# segment (segment length / ground speed), so triggered missions are refused when that time
+# differs between runs or exceeds what the parameter can hold (trigger_duration); the required
+# value is written into every trigger item (param2, ms) and reported by MissionStats.
+
+# Mission modes
+MODE_PASSES = "passes"  # one run per pass, exactly the original mission
+MODE_MERGED = "merged"  # collinear passes merged, spraying switched by servo commands
+MODE_TRIGGERED = "triggered"  # merged, evenly spaced runs sprayed by distance trigger
+MISSION_MODES = (MODE_PASSES, MODE_MERGED, MODE_TRIGGERED)
+
+# MAV_CMD_DO_SET_CAM_TRIGG_DIST: param1=distance (m, 0 stops), param2=shutter, param3=trigger once now
+MAV_CMD_DO_SET_CAM_TRIGG_DIST = 206
+
+# Merging tolerances: heading difference of two passes, sideways offset of the next pass from the
+# line of the previous one, and the spacing / length differences allowed for distance triggering
+DEFAULT_ANGLE_TOLERANCE_DEG = 1.0
+DEFAULT_OFFSET_TOLERANCE_M = 0.25
+DEFAULT_SPACING_TOLERANCE_M = 0.05
+# Autopilot parameter holding the trigger pulse length, and its range (ArduPilot: 0 - 5 s)
+TRIGGER_DURATION_PARAM = "CAM1_DURATION"
+MAX_TRIGGER_DURATION_S = 5.0
+# Segments closer than this are sprayed as one
+TOUCHING_GAP_M = 0.01
+
+# Items around the passes: home, takeoff, speed and return-to-launch
+FIXED_ITEMS = 4
+ITEMS_PER_PASS = 6
+
+# Upload estimate for the MAVLink 2 mission protocol over a serial telemetry radio: every item is
+# requested by the autopilot (MISSION_REQUEST_INT) and sent by the ground station (MISSION_ITEM_INT)
+MISSION_ITEM_INT_BYTES = 37 + 12  # payload + MAVLink 2 framing
+MISSION_REQUEST_INT_BYTES = 5 + 12
+BITS_PER_BYTE = 10  # 8N1 serial
+DEFAULT_LINK_BAUD = 57600
+DEFAULT_ROUND_TRIP_S = 0.05  # request/item turnaround of the radio link
+# Mission storage of boards that keep missions in on-board FRAM (larger on SD-backed boards)
+DEFAULT_ITEM_LIMIT = 724
+
+METERS_PER_DEGREE = 111320.0
+
+
+class SprayRun:
+    """
+    One straight flight line of a mission: `buffered_start`, the spray `segments` [(start, end)]
+    in flight order and `buffered_end`, all (lat, lon). With `trigger_distance` the segments
+    (each `segment_length` meters long) are sprayed by distance triggering instead of servo
+    commands.
+    """
+
+    def __init__(self, buffered_start, segments, buffered_end, trigger_distance=None, segment_length=None):
+        self.buffered_start = buffered_start
+        self.segments = segments
+        self.buffered_end = buffered_end
+        self.trigger_distance = trigger_distance
+        self.segment_length = segment_length
+        self.passes = len(segments)
+
+    def trigger_duration_s(self, ground_speed_m_s):
+        """Seconds the sprayer has to stay open per trigger (one segment at the ground speed), None without trigger."""
+        if not self.trigger_distance:
+            return None
+        return self.segment_length / ground_speed_m_s
+
+    @property
+    def item_count(self):
+        if self.trigger_distance:
+            return 6
+        # Two buffer waypoints plus spray start, servo on, spray end and servo off per segment
+        return 2 + 4 * len(self.segments)
+
+
+class _LocalFrame:
+    """Equirectangular meters around one point; plenty for tolerance checks over a field."""
+
+    def __init__(self, origin):
+        self.lat0, self.lon0 = origin
+        self.scale_x = METERS_PER_DEGREE * math.cos(math.radians(self.lat0))
+
+    def xy(self, point):
+        return ((point[1] - self.lon0) * self.scale_x, (point[0] - self.lat0) * METERS_PER_DEGREE)
+
+
+def _sub(a, b):
+    return (a[0] - b[0], a[1] - b[1])
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1]
+
+
+def _cross(a, b):
+    return a[0] * b[1] - a[1] * b[0]
+
+
+def _unit(vector):
+    length = math.hypot(*vector)
+    if length == 0:
+        return None
+    return (vector[0] / length, vector[1] / length)
+
+
+def route_passes(path, parcel_points):
+    """(buffered_start, spray_start, spray_end, buffered_end) of every pass of a route."""
+    if len(path) != 2 * len(parcel_points):
+        raise ValueError("Path coordinates do not match parcel points.")
+    return [
+        (path[2 * idx], parcel_point['start'], parcel_point['end'], path[2 * idx + 1])
+        for idx, parcel_point in enumerate(parcel_points)
+    ]
+
+
+class MissionReducer:
+    """
+    Turns the passes of a route into SprayRuns for MissionWriter.add_runs, according to `mode`
+    (one of MISSION_MODES). MODE_PASSES keeps one run per pass, i.e. the unreduced mission.
+
+    Two consecutive passes are merged when they point the same way (within `angle_tolerance_deg`),
+    the second starts on the line of the first (within `offset_tolerance_m`) and ahead of its spray
+    end, so the drone never turns or backs up between them.
+    """
+
+    def __init__(self, mode=MODE_MERGED, angle_tolerance_deg=DEFAULT_ANGLE_TOLERANCE_DEG,
+                 offset_tolerance_m=DEFAULT_OFFSET_TOLERANCE_M, spacing_tolerance_m=DEFAULT_SPACING_TOLERANCE_M):
+        if mode not in MISSION_MODES:
+            raise ValueError(f"Unknown mission mode: {mode}")
+        self.mode = mode
+        self.cos_tolerance = math.cos(math.radians(angle_tolerance_deg))
+        self.offset_tolerance_m = offset_tolerance_m
+        self.spacing_tolerance_m = spacing_tolerance_m
+
+    def runs(self, path, parcel_points):
+        passes = route_passes(path, parcel_points)
+        if self.mode == MODE_PASSES or not passes:
+            return [SprayRun(start, [(spray_start, spray_end)], end) for start, spray_start, spray_end, end in passes]
+
+        frame = _LocalFrame(passes[0][1])
+        runs = []
+        run = None
+        direction = None
+        line_origin = None
+        last_end = None
+        for buffered_start, spray_start, spray_end, buffered_end in passes:
+            start_xy = frame.xy(spray_start)
+            end_xy = frame.xy(spray_end)
+            pass_direction = _unit(_sub(end_xy, start_xy))
+
+            if run is not None and self._continues(direction, line_origin, last_end, start_xy, pass_direction):
+                previous_start, previous_end = run.segments[-1]
+                if math.hypot(*_sub(start_xy, last_end)) < TOUCHING_GAP_M:
+                    # No gap between the parcels: keep spraying
+                    run.segments[-1] = (previous_start, spray_end)
+                else:
+                    run.segments.append((spray_start, spray_end))
+                run.passes += 1
+                run.buffered_end = buffered_end
+            else:
+                run = SprayRun(buffered_start, [(spray_start, spray_end)], buffered_end)
+                runs.append(run)
+                direction = pass_direction
+                line_origin = start_xy
+            last_end = end_xy
+
+        if self.mode == MODE_TRIGGERED:
+            for run in runs:
+                run.trigger_distance, run.segment_length = self._trigger_spacing(run, frame)
+        return runs
+
+    def _continues(self, direction, line_origin, last_end, start_xy, pass_direction):
+        if direction is None or pass_direction is None:
+            return False
+        if _dot(direction, pass_direction) < self.cos_tolerance:
+            return False
+        if abs(_cross(direction, _sub(start_xy, line_origin))) > self.offset_tolerance_m:
+            return False
+        # Ahead of the previous spray end (or touching it), never overlapping it
+        return _dot(direction, _sub(start_xy, last_end)) > -TOUCHING_GAP_M
+
+    def _trigger_spacing(self, run, frame):
+        """
+        (start-to-start spacing, segment length) of a run whose segments are evenly spaced and
+        equally long, else (None, None).
+        """
+        if len(run.segments) < 2:
+            return None, None
+        starts = [frame.xy(start) for start, _ in run.segments]
+        lengths = [math.hypot(*_sub(frame.xy(end), frame.xy(start))) for start, end in run.segments]
+        spacings = [math.hypot(*_sub(b, a)) for a, b in zip(starts, starts[1:])]
+        if max(spacings) - min(spacings) > self.spacing_tolerance_m:
+            return None, None
+        if max(lengths) - min(lengths) > self.spacing_tolerance_m:
+            return None, None
+        return round(sum(spacings) / len(spacings), 3), sum(lengths) / len(lengths)
+
+
+def trigger_duration(runs, ground_speed_m_s, tolerance_m=DEFAULT_SPACING_TOLERANCE_M):
+    """
+    The one trigger pulse length (s) that sprays every triggered segment of a mission completely,
+    None when no run is triggered.
+
+    Raises ValueError when the segments need different pulse lengths (more than `tolerance_m` of
+    flight apart), since the autopilot has a single trigger duration, or when the pulse exceeds
+    MAX_TRIGGER_DURATION_S.
+    """
+    durations = [run.trigger_duration_s(ground_speed_m_s) for run in runs if run.trigger_distance]
+    if not durations:
+        return None
+    if max(durations) - min(durations) > tolerance_m / ground_speed_m_s:
+        raise ValueError(
+            f"Triggered spraying needs sprayer pulses of {min(durations):.2f} s to {max(durations):.2f} s in one "
+            f"mission, but {TRIGGER_DURATION_PARAM} holds a single value; use the merged mode."
+        )
+    duration = sum(durations) / len(durations)
+    if duration > MAX_TRIGGER_DURATION_S:
+        raise ValueError(
+            f"Triggered spraying needs the sprayer open {duration:.2f} s per parcel, more than "
+            f"{TRIGGER_DURATION_PARAM} allows ({MAX_TRIGGER_DURATION_S:g} s); use the merged mode."
+        )
+    return duration
+
+
+def mission_item_count(runs):
+    """Items of a mission made of `runs` (the QGC header line is not an item)."""
+    return FIXED_ITEMS + sum(run.item_count for run in runs)
+
+
+def estimate_upload_s(items, link_baud=DEFAULT_LINK_BAUD, round_trip_s=DEFAULT_ROUND_TRIP_S):
+    """Seconds to upload `items` mission items one request/response at a time."""
+    seconds_per_item = (MISSION_ITEM_INT_BYTES + MISSION_REQUEST_INT_BYTES) * BITS_PER_BYTE / link_baud + round_trip_s
+    # Plus MISSION_COUNT / MISSION_ACK
+    return (items + 1) * seconds_per_item
+
+
+class MissionStats:
+    """
+    Size of a reduced mission compared with the one-run-per-pass mission, its upload time and, for
+    triggered runs, the trigger duration to set on the autopilot (needs `ground_speed_m_s`; raises
+    ValueError like trigger_duration).
+    """
+
+    def __init__(self, runs, ground_speed_m_s=None, link_baud=DEFAULT_LINK_BAUD, round_trip_s=DEFAULT_ROUND_TRIP_S):
+        self.passes = sum(run.passes for run in runs)
+        self.runs = len(runs)
+        self.triggered_runs = sum(1 for run in runs if run.trigger_distance)
+        self.trigger_duration_s = trigger_duration(runs, ground_speed_m_s) if ground_speed_m_s else None
+        self.items = mission_item_count(runs)
+        self.original_items = FIXED_ITEMS + ITEMS_PER_PASS * self.passes
+        self.upload_s = estimate_upload_s(self.items, link_baud, round_trip_s)
+        self.original_upload_s = estimate_upload_s(self.original_items, link_baud, round_trip_s)
+
+    def exceeds(self, limit=DEFAULT_ITEM_LIMIT):
+        return self.items > limit
+
+    def summary(self):
+        text = (f"{self.items} mission items ({self.original_items} without merging), "
+                f"{self.passes} passes in {self.runs} runs, estimated upload {self.upload_s:.0f} s")
+        if self.triggered_runs:
+            text += f", {self.triggered_runs} runs sprayed by distance trigger"
+            if self.trigger_duration_s is not None:
+                text += f" (set {TRIGGER_DURATION_PARAM} to {self.trigger_duration_s:.2f} s)"
+        return text
+
+    def to_dict(self):
+        return {
+            "items": self.items,
+            "original_items": self.original_items,
+            "runs": self.runs,
+            "triggered_runs": self.triggered_runs,
+            "trigger_duration_s": self.trigger_duration_s,
+            "upload_s": self.upload_s,
+            "original_upload_s": self.original_upload_s,
+        }
@@ -0,0 +1,215 @@
+import math
+
+import numpy as np
+from projection import planar_distance
+
+# Flight-time model of a spray mission (multicopter flying waypoint to waypoint)
+#
+# Every pass is flown from rest to rest: the drone accelerates over the acceleration buffer,
+# sprays at the ground speed and brakes over the buffer at the far end. The acceleration is the
+# one that reaches the ground speed within the buffer (a = v^2 / 2b). Between passes it turns to
+# face the next waypoint (yaw at the turn rate), flies the connecting leg with the same trapezoidal
+# speed profile and turns into the next pass. Takeoff and landing are flown at the climb and
+# descent limits, the legs from and back to home at the ground speed (the mission commands no
+# other speed).
+
+# Limits (ArduPilot copter defaults: WPNAV_SPEED_UP 2.5 m/s, WPNAV_SPEED_DN 1.5 m/s)
+DEFAULT_TURN_RATE_DEG_S = 60.0
+DEFAULT_CLIMB_RATE_M_S = 2.5
+DEFAULT_DESCENT_RATE_M_S = 1.5
+
+# Route objectives of the planners
+OBJECTIVE_TIME = "time"  # estimated flight time (FlightTimeModel)
+OBJECTIVE_DISTANCE = "distance"  # path length
+OBJECTIVES = (OBJECTIVE_TIME, OBJECTIVE_DISTANCE)
+
+# Legs shorter than this are flown without turning fully to face them (the autopilot holds its yaw)
+YAW_HOLD_DISTANCE_M = 2.0
+
+
+def travel_time(distance, speed, acceleration):
+    """
+    Seconds to fly `distance` meters from rest to rest at up to `speed`, accelerating and braking
+    at `acceleration` (inf for instant speed changes). Works on arrays.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    if not math.isfinite(acceleration):
+        return distance / speed
+    # Short legs never reach the cruise speed (triangular profile)
+    ramp_distance = speed * speed / acceleration
+    return np.where(
+        distance >= ramp_distance,
+        distance / speed + speed / acceleration,
+        2.0 * np.sqrt(distance / acceleration),
+    )
+
+
+def heading_change(from_headings, to_headings):
+    """Angle in radians between unit vectors (row-wise for arrays)."""
+    cosine = np.sum(np.asarray(from_headings) * np.asarray(to_headings), axis=-1)
+    return np.arccos(np.clip(cosine, -1.0, 1.0))
+
+
+def unit_rows(vectors):
+    """Unit vectors of the rows of `vectors` (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    lengths = np.hypot(vectors[..., 0], vectors[..., 1])[..., np.newaxis]
+    return vectors / np.where(lengths > 0, lengths, 1.0)
+
+
+class FlightLimits:
+    """Vehicle limits of the flight-time model; `average_power_w` (optional) turns time into energy."""
+
+    def __init__(self, turn_rate_deg_s=DEFAULT_TURN_RATE_DEG_S, climb_rate_m_s=DEFAULT_CLIMB_RATE_M_S,
+                 descent_rate_m_s=DEFAULT_DESCENT_RATE_M_S, average_power_w=None):
+        if turn_rate_deg_s <= 0 or climb_rate_m_s <= 0 or descent_rate_m_s <= 0:
+            raise ValueError("Turn rate, climb rate and descent rate must be positive.")
+        self.turn_rate_deg_s = float(turn_rate_deg_s)
+        self.climb_rate_m_s = float(climb_rate_m_s)
+        self.descent_rate_m_s = float(descent_rate_m_s)
+        self.average_power_w = float(average_power_w) if average_power_w else None
+
+
+class FlightTimeEstimate:
+    """
+    Flight time of one mission, in seconds: `pass_times` (each pass with its buffers) and
+    `transition_times` (pass i to pass i + 1) in flight order, plus takeoff climb, the legs from
+    and back to home, and the descent.
+    """
+
+    def __init__(self, pass_times, transition_times, climb_s=0.0, ferry_s=0.0, descent_s=0.0, average_power_w=None):
+        self.pass_times = pass_times
+        self.transition_times = transition_times
+        self.climb_s = climb_s
+        self.ferry_s = ferry_s
+        self.descent_s = descent_s
+        self.average_power_w = average_power_w
+
+    @property
+    def passes_s(self):
+        return float(np.sum(self.pass_times))
+
+    @property
+    def transitions_s(self):
+        return float(np.sum(self.transition_times))
+
+    @property
+    def total_s(self):
+        return self.climb_s + self.ferry_s + self.passes_s + self.transitions_s + self.descent_s
+
+    @property
+    def energy_wh(self):
+        """Battery energy at the average power, or None when no power is configured."""
+        if self.average_power_w is None:
+            return None
+        return self.total_s * self.average_power_w / 3600.0
+
+    def summary(self):
+        minutes, seconds = divmod(int(round(self.total_s)), 60)
+        text = f"Estimated flight time {minutes}:{seconds:02d} min"
+        if self.energy_wh is not None:
+            text += f" ({self.energy_wh:.0f} Wh)"
+        return text
+
+    def to_dict(self):
+        return {
+            "total_s": self.total_s,
+            "passes_s": self.passes_s,
+            "transitions_s": self.transitions_s,
+            "climb_s": self.climb_s,
+            "ferry_s": self.ferry_s,
+            "descent_s": self.descent_s,
+            "energy_wh": self.energy_wh,
+        }
+
+
+class FlightTimeModel:
+    """
+    Turn-aware flight-time model for a ground speed (calculate_velocity) and acceleration buffer.
+
+    transition_time() is the route cost ScanPathOptimizer minimizes with a `cost_model`; it is
+    symmetric (flying a connection backwards takes as long), which the 2-opt reversals rely on.
+    """
+
+    def __init__(self, ground_speed_m_s, acc_buffer, limits=None):
+        if not ground_speed_m_s or ground_speed_m_s <= 0:
+            raise ValueError("The ground speed must be positive.")
+        self.limits = limits or FlightLimits()
+        self.speed = float(ground_speed_m_s)
+        self.acc_buffer = float(acc_buffer or 0.0)
+        # Reach the ground speed within the buffer; without a buffer speed changes are instant
+        self.acceleration = self.speed ** 2 / (2.0 * self.acc_buffer) if self.acc_buffer > 0 else math.inf
+        self.turn_rate = math.radians(self.limits.turn_rate_deg_s)
+
+    def pass_time(self, buffered_length):
+        """Seconds for passes of the given buffered lengths (buffer, spray at speed, buffer)."""
+        return travel_time(buffered_length, self.speed, self.acceleration)
+
+    def transition_time(self, exit_points, exit_headings, entry_points, entry_headings):
+        """
+        Seconds from the buffered end of a pass (flown along `exit_headings`) to the buffered
+        start of the next (flown along `entry_headings`); arrays broadcast row-wise.
+        """
+        leg = np.asarray(entry_points) - np.asarray(exit_points)
+        distance = np.hypot(leg[..., 0], leg[..., 1])
+        leg_heading = unit_rows(leg)
+        # Turn to face the leg and into the next pass; short legs blend linearly into turning
+        # straight into the pass, so the cost does not jump at the yaw-hold distance
+        facing = heading_change(exit_headings, leg_heading) + heading_change(leg_heading, entry_headings)
+        direct = heading_change(exit_headings, entry_headings)
+        weight = np.clip(distance / YAW_HOLD_DISTANCE_M, 0.0, 1.0)
+        turned = direct + weight * (facing - direct)
+        return travel_time(distance, self.speed, self.acceleration) + turned / self.turn_rate
+
+    def outbound_time(self, home_xy, starts, headings):
+        """Seconds from home (after takeoff) to the buffered starts, turning into the passes (arrays work)."""
+        leg = np.asarray(starts, dtype=np.float64) - np.asarray(home_xy, dtype=np.float64)
+        distance = np.hypot(leg[..., 0], leg[..., 1])
+        return travel_time(distance, self.speed, self.acceleration) + heading_change(unit_rows(leg), headings) / self.turn_rate
+
+    def inbound_time(self, ends, headings, home_xy):
+        """Seconds from the buffered ends back to home (before landing), turning towards it (arrays work)."""
+        leg = np.asarray(home_xy, dtype=np.float64) - np.asarray(ends, dtype=np.float64)
+        distance = np.hypot(leg[..., 0], leg[..., 1])
+        return travel_time(distance, self.speed, self.acceleration) + heading_change(headings, unit_rows(leg)) / self.turn_rate
+
+    def takeoff_and_landing_time(self, altitude):
+        if not altitude:
+            return 0.0, 0.0
+        return float(altitude) / self.limits.climb_rate_m_s, float(altitude) / self.limits.descent_rate_m_s
+
+    def estimate(self, path_xy, home_xy=None, altitude=None):
+        """
+        FlightTimeEstimate of a route given as local buffered start / end points (alternating, as
+        Route.path). With `home_xy` the legs from and back to home are included, with `altitude`
+        the takeoff climb and landing descent.
+        """
+        path_xy = np.asarray(path_xy, dtype=np.float64).reshape(-1, 2)
+        starts, ends = path_xy[0::2], path_xy[1::2]
+        if len(starts) == 0:
+            return FlightTimeEstimate(np.empty(0), np.empty(0), average_power_w=self.limits.average_power_w)
+
+        headings = unit_rows(ends - starts)
+        pass_times = self.pass_time(planar_distance(starts, ends))
+        transition_times = self.transition_time(ends[:-1], headings[:-1], starts[1:], headings[1:])
+
+        ferry_s = 0.0
+        if home_xy is not None:
+            ferry_s = float(self.outbound_time(home_xy, starts[0], headings[0])
+                            + self.inbound_time(ends[-1], headings[-1], home_xy))
+
+        climb_s, descent_s = self.takeoff_and_landing_time(altitude)
+        return FlightTimeEstimate(
+            pass_times, transition_times, climb_s, ferry_s, descent_s, self.limits.average_power_w
+        )
+
+    def estimate_route(self, route, projection, home=None, altitude=None):
+        """
+        FlightTimeEstimate of a Route with an optional (lat, lon) home. Uses the route's local
+        path when it has one (the points the planner optimized), otherwise projects its path.
+        """
+        if not route.path:
+            return self.estimate(np.empty((0, 2)), altitude=altitude)
+        path_xy = route.path_xy if route.path_xy is not None else projection.to_local(route.path)
+        home_xy = projection.point_to_local(home) if home is not None else None
+        return self.estimate(path_xy, home_xy, altitude)
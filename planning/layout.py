@@ -0,0 +1,124 @@
+from parcel_gen import ParcelGenerator
+from projection import LocalProjection, planar_distance
+from planning.common import parse_float
+
+
+def color_codes_list(colored_parcels, total_parcels=None):
+    """
+    Build a stable, row-major list of parcel colors where index == parcel_id.
+
+    Accepts either:
+      - `{parcel_id: "#rrggbb"}`
+      - `{parcel_id: ("#rrggbb", x, y)}` (or JSON list variant)
+    """
+    if not colored_parcels:
+        return []
+
+    by_id = {}
+    for parcel_id, value in colored_parcels.items():
+        try:
+            parcel_index = int(parcel_id)
+        except (TypeError, ValueError):
+            continue
+
+        if isinstance(value, (list, tuple)) and value:
+            color = value[0]
+        else:
+            color = value
+
+        by_id[parcel_index] = color
+
+    if total_parcels is None:
+        total_parcels = (max(by_id.keys()) + 1) if by_id else 0
+
+    return [by_id.get(i, "white") for i in range(total_parcels)]
+
+
+def area_corners_from_location(location):
+    """
+    Planner `location` [A (top-left), B (top-right), C (bottom-left), D (bottom-right)] as
+    ParcelGenerator corners [top-left, top-right, bottom-right, bottom-left] of floats.
+    """
+    top_left, top_right, bottom_left, bottom_right = [
+        [parse_float(lat), parse_float(lon)] for lat, lon in location
+    ]
+    return [top_left, top_right, bottom_right, bottom_left]
+
+
+def fitted_parcel_size(projection, area_corners, count_x, count_y):
+    """(exact_width, exact_height, total_width, total_height) when the grid is fitted to the area."""
+    top_left, top_right, bottom_right, bottom_left = projection.to_local(area_corners)
+    total_width = float(planar_distance(top_left, top_right))
+    total_height = float(planar_distance(top_left, bottom_left))
+    return total_width / count_x, total_height / count_y, total_width, total_height
+
+
+class FieldLayout:
+    """
+    Parcel grid of a field as plain data: corners, counts, sizes and the parcel colour map.
+
+    `parcels()` gives the same list of {'coordinates', 'color'} dicts the planner window draws.
+    With `fit`, the parcel size is derived from the field like PlannerMainWindow.save() does.
+    """
+
+    def __init__(self, area_corners, count_x, count_y, width, height, gap_x, gap_y,
+                 fit=False, fit_gap=False, colored_parcels=None):
+        self.area_corners = [[float(lat), float(lon)] for lat, lon in area_corners]
+        self.count_x = int(count_x)
+        self.count_y = int(count_y)
+        self.width = float(width)
+        self.height = float(height)
+        self.gap_x = float(gap_x)
+        self.gap_y = float(gap_y)
+        self.fit = bool(fit)
+        self.fit_gap = bool(fit_gap)
+        self.colored_parcels = colored_parcels or {}
+        self.projection = LocalProjection.from_corners(self.area_corners)
+
+        if self.fit:
+            exact_width, exact_height, _, _ = fitted_parcel_size(
+                self.projection, self.area_corners, self.count_x, self.count_y
+            )
+            self.width = round(exact_width)
+            self.height = round(exact_height)
+
+    @classmethod
+    def from_state(cls, state):
+        """Layout of a planner state dictionary (as written by save_file)."""
+        return cls(
+            area_corners_from_location(state['location']),
+            state['count_x'],
+            state['count_y'],
+            state['width'],
+            state['height'],
+            state['gap_x'],
+            state['gap_y'],
+            fit=state.get('fit', False),
+            fit_gap=state.get('fit_gap', False),
+            colored_parcels=state.get('colored_parcels'),
+        )
+
+    @property
+    def home(self):
+        """Top-left corner (A), used as the mission home."""
+        return tuple(self.area_corners[0])
+
+    def color_codes(self):
+        return color_codes_list(self.colored_parcels, self.count_x * self.count_y)
+
+    def generator(self):
+        return ParcelGenerator(
+            self.area_corners,
+            self.width,
+            self.height,
+            self.gap_x,
+            self.gap_y,
+            self.count_x,
+            self.count_y,
+            is_fit=self.fit,
+            preserve_parcel_size=self.fit_gap,
+            colors=self.color_codes(),
+        )
+
+    def parcels(self):
+        return self.generator().generate_parcel_coordinates()
@@ -0,0 +1,236 @@
+import os
+
+from planning.compaction import trigger_duration
+
+# QGC WPL 110 mission serialization (no numpy, no Qt)
+
+# Servo defaults used by the planner window when the advanced settings are untouched
+DEFAULT_SERVO_CHANNEL = 14
+DEFAULT_PWM_HIGH = 2000
+DEFAULT_PWM_LOW = 1000
+
+
+def mission_file_name(color_name, button_name, timestamp, sortie=None, sorties=None):
+    """File name of a colour's mission; `sortie` of `sorties` numbers the missions of a split route."""
+    if sortie is not None:
+        return f"{color_name}_{button_name}_{timestamp}_sortie{sortie}of{sorties}_generated_mavlink_script.waypoints"
+    return f"{color_name}_{button_name}_{timestamp}_generated_mavlink_script.waypoints"
+
+
+# Write buffer of streamed missions (lines are small; flush in large blocks)
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class MissionFormatter:
+    """
+    Numbered QGC WPL 110 lines of one mission, produced piece by piece.
+
+    start() gives the home / takeoff / speed items, pass_lines() the six items of one spray pass,
+    run_lines() the items of a merged run (planning.compaction) and finish() the return-to-launch;
+    sequence numbers run on across the calls. Triggered runs need the ground speed of start() and
+    must all need the same trigger duration (planning.compaction.trigger_duration), else
+    run_lines() raises ValueError.
+    """
+
+    def __init__(self, altitude, servo_channel=DEFAULT_SERVO_CHANNEL, pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW):
+        self.altitude = altitude
+        self.servo_channel = servo_channel
+        self.pwm_high = pwm_high
+        self.pwm_low = pwm_low
+        self.seq = 0
+        self.ground_speed_m_s = None
+        self._first_triggered_run = None
+
+    def _item(self, text):
+        line = f"{self.seq}\t{text}"
+        self.seq += 1
+        return line
+
+    def set_servo(self, pwm):
+        # MAV_CMD_DO_SET_SERVO (183): param1=servo number, param2=pwm
+        # Use MAV_FRAME_MISSION (2) with zero coordinates for reliability.
+        return self._item(f"0\t2\t183\t{self.servo_channel}\t{pwm}\t0\t0\t0\t0\t0\t1")
+
+    def set_trigger_distance(self, distance, trigger_now=0, duration_ms=0):
+        # MAV_CMD_DO_SET_CAM_TRIGG_DIST (206): param1=distance (0 stops), param2=shutter integration
+        # time in ms (the required sprayer pulse), param3=trigger once immediately
+        return self._item(f"0\t2\t206\t{distance}\t{duration_ms}\t{trigger_now}\t0\t0\t0\t0\t1")
+
+    def _trigger_duration_ms(self, run):
+        # Every triggered run must need the pulse of the first one (one autopilot trigger duration)
+        if not self.ground_speed_m_s:
+            raise ValueError("Triggered runs need the ground speed (start() first).")
+        self._first_triggered_run = self._first_triggered_run or run
+        return int(round(trigger_duration([self._first_triggered_run, run], self.ground_speed_m_s) * 1000))
+
+    def start(self, home, ground_speed_m_s):
+        self.ground_speed_m_s = ground_speed_m_s
+        home_lat, home_lon = home
+        return [
+            # Add home waypoint
+            self._item(f"1\t0\t16\t3\t0\t0\t0\t{home_lat}\t{home_lon}\t1.990000\t1"),
+            # Add takeoff command
+            self._item(f"0\t3\t22\t0\t0\t0\t0\t0\t0\t{self.altitude}\t1"),
+            # Set the ground speed
+            self._item(f"0\t3\t178\t1\t{ground_speed_m_s}\t-1\t0\t0\t0\t0\t1"),
+        ]
+
+    def pass_lines(self, buffered_start, spray_start, spray_end, buffered_end):
+        altitude = self.altitude
+        return [
+            # Waypoint to approach start point (with acceleration buffer)
+            self._item(f"0\t3\t16\t3\t0\t0\t0\t{buffered_start[0]}\t{buffered_start[1]}\t{altitude}\t1"),
+            # Waypoint at start of parcel (arrive at exact spray start)
+            self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_start[0]}\t{spray_start[1]}\t{altitude}\t1"),
+            # Start spraying at the start of the spray area (servo open)
+            self.set_servo(self.pwm_high),
+            # Waypoint at end of parcel (arrive at exact spray end)
+            self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_end[0]}\t{spray_end[1]}\t{altitude}\t1"),
+            # Stop spraying at the end of the spray area (servo closed)
+            self.set_servo(self.pwm_low),
+            # Waypoint to move to the end point with acceleration buffer
+            self._item(f"0\t3\t16\t3\t0\t0\t0\t{buffered_end[0]}\t{buffered_end[1]}\t{altitude}\t1"),
+        ]
+
+    def run_lines(self, run):
+        """Items of a SprayRun; a single-pass run without trigger gives exactly pass_lines()."""
+        altitude = self.altitude
+        lines = [self._item(f"0\t3\t16\t3\t0\t0\t0\t{run.buffered_start[0]}\t{run.buffered_start[1]}\t{altitude}\t1")]
+        if run.trigger_distance:
+            duration_ms = self._trigger_duration_ms(run)
+            spray_start = run.segments[0][0]
+            spray_end = run.segments[-1][1]
+            lines += [
+                self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_start[0]}\t{spray_start[1]}\t{altitude}\t1"),
+                # Fire the sprayer now and then every trigger distance (once per parcel), each
+                # pulse as long as one parcel takes to fly
+                self.set_trigger_distance(run.trigger_distance, trigger_now=1, duration_ms=duration_ms),
+                self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_end[0]}\t{spray_end[1]}\t{altitude}\t1"),
+                self.set_trigger_distance(0),
+            ]
+        else:
+            for spray_start, spray_end in run.segments:
+                lines += [
+                    self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_start[0]}\t{spray_start[1]}\t{altitude}\t1"),
+                    self.set_servo(self.pwm_high),
+                    self._item(f"0\t3\t82\t0\t0\t0\t0\t{spray_end[0]}\t{spray_end[1]}\t{altitude}\t1"),
+                    self.set_servo(self.pwm_low),
+                ]
+        lines.append(self._item(f"0\t3\t16\t3\t0\t0\t0\t{run.buffered_end[0]}\t{run.buffered_end[1]}\t{altitude}\t1"))
+        return lines
+
+    def finish(self):
+        # Add return-to-launch command (MAV_CMD_NAV_RETURN_TO_LAUNCH)
+        return [self._item("0\t3\t20\t0\t0\t0\t0\t0\t0\t0\t1")]
+
+
+def mission_items(home, altitude, ground_speed_m_s, path, parcel_points,
+                  servo_channel=DEFAULT_SERVO_CHANNEL, pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW):
+    """
+    Lines of a QGC WPL 110 mission for one colour, generated lazily (header line first).
+
+    :param home: (lat, lon) of the home waypoint
+    :param path: buffered start / buffered end of every pass, alternating
+    :param parcel_points: [{'start': (lat, lon), 'end': (lat, lon)}] spray start/end of every pass
+    """
+    formatter = MissionFormatter(altitude, servo_channel, pwm_high, pwm_low)
+    yield "QGC WPL 110"
+    yield from formatter.start(home, ground_speed_m_s)
+    for idx, parcel_point in enumerate(parcel_points):
+        # Start and end point with acceleration buffer, actual spray start and end points
+        yield from formatter.pass_lines(path[2 * idx], parcel_point['start'], parcel_point['end'], path[2 * idx + 1])
+    yield from formatter.finish()
+
+
+def mission_lines(home, altitude, ground_speed_m_s, path, parcel_points,
+                  servo_channel=DEFAULT_SERVO_CHANNEL, pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW):
+    """All lines of a mission (see mission_items) as a list."""
+    # Ensure the path coordinates match the parcel points
+    if len(path) != 2 * len(parcel_points):
+        raise ValueError("Path coordinates do not match parcel points.")
+    return list(mission_items(home, altitude, ground_speed_m_s, path, parcel_points, servo_channel, pwm_high, pwm_low))
+
+
+def write_mission(file_path, lines):
+    """Write mission lines (any iterable, consumed lazily) to `file_path`."""
+    with open(file_path, "w", buffering=DEFAULT_BUFFER_SIZE) as file:
+        for index, line in enumerate(lines):
+            if index:
+                file.write("\n")
+            file.write(line)
+    return file_path
+
+
+class MissionWriter:
+    """
+    Streams one mission to a file: items are written to a buffered file as passes are added,
+    so no list of lines is ever built.
+
+        with MissionWriter(path, home, altitude, speed) as writer:
+            for pass_points in passes:
+                writer.add_pass(*pass_points)
+
+    The return-to-launch item is written on a clean exit; if the block raises, the partial file
+    is removed.
+    """
+
+    def __init__(self, file_path, home, altitude, ground_speed_m_s, servo_channel=DEFAULT_SERVO_CHANNEL,
+                 pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.file_path = file_path
+        self.passes = 0
+        self._formatter = MissionFormatter(altitude, servo_channel, pwm_high, pwm_low)
+        self._file = open(file_path, "w", buffering=buffer_size)
+        self._file.write("QGC WPL 110")
+        self._write(self._formatter.start(home, ground_speed_m_s))
+
+    def _write(self, lines):
+        for line in lines:
+            self._file.write("\n")
+            self._file.write(line)
+
+    @property
+    def items(self):
+        """Mission items written so far (the header line is not an item)."""
+        return self._formatter.seq
+
+    def add_pass(self, buffered_start, spray_start, spray_end, buffered_end):
+        self._write(self._formatter.pass_lines(buffered_start, spray_start, spray_end, buffered_end))
+        self.passes += 1
+
+    def add_route(self, path, parcel_points):
+        """All passes of a route (path alternates buffered start / buffered end)."""
+        if len(path) != 2 * len(parcel_points):
+            raise ValueError("Path coordinates do not match parcel points.")
+        for idx, parcel_point in enumerate(parcel_points):
+            self.add_pass(path[2 * idx], parcel_point['start'], parcel_point['end'], path[2 * idx + 1])
+
+    def add_run(self, run):
+        """One SprayRun of planning.compaction (a merged straight line of passes)."""
+        self._write(self._formatter.run_lines(run))
+        self.passes += run.passes
+
+    def add_runs(self, runs):
+        for run in runs:
+            self.add_run(run)
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._write(self._formatter.finish())
+            self._file.close()
+        return self.file_path
+
+    def discard(self):
+        """Close and delete an unfinished mission."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -0,0 +1,70 @@
+import numpy as np
+from planning.common import normalize_color
+
+
+def passes_per_parcel(width, spraying_width):
+    """Number of spray passes across one parcel. Raises ValueError unless the width divides evenly."""
+    if spraying_width <= 0:
+        raise ValueError("The spraying width must be positive.")
+    # Float-safe check that the parcel width is a whole number of spraying widths
+    ratio = width / spraying_width
+    nearest = round(ratio)
+    if nearest <= 0 or abs(ratio - nearest) > 1e-6:
+        raise ValueError("The parcel height cannot be evenly divided by the spraying width.")
+    return max(1, int(nearest))
+
+
+def parcels_of_color(parcel_coordinates, color):
+    color = normalize_color(color)
+    return [parcel for parcel in parcel_coordinates if normalize_color(parcel['color']) == color]
+
+
+def parcels_by_color(parcel_coordinates):
+    """Normalized colour -> its parcels (in layout order), in a single pass over the layout."""
+    groups = {}
+    for parcel in parcel_coordinates:
+        groups.setdefault(normalize_color(parcel['color']), []).append(parcel)
+    return groups
+
+
+def parcel_ids_by_color(parcel_coordinates):
+    """Normalized colour -> row-major ids (layout indices) of its parcels, like parcels_by_color."""
+    groups = {}
+    for parcel_id, parcel in enumerate(parcel_coordinates):
+        groups.setdefault(normalize_color(parcel['color']), []).append(parcel_id)
+    return groups
+
+
+def pass_grid_indices(parcel_ids, count_x, num_passes):
+    """
+    (columns, rows, strips) of every pass of the parcels `parcel_ids`, in generate_passes order.
+
+    Parcel ids are row-major (ParcelGenerator), so a parcel sits in row id // count_x and column
+    id % count_x. Pass i of a parcel is its strip i, numbered left to right.
+    """
+    rows, columns = np.divmod(np.asarray(parcel_ids, dtype=np.int64), int(count_x))
+    strips = np.tile(np.arange(num_passes, dtype=np.int64), len(rows))
+    return np.repeat(columns, num_passes), np.repeat(rows, num_passes), strips
+
+
+def generate_passes(parcels, projection, width, spraying_width):
+    """
+    Top and bottom centre of every spray pass of `parcels`, in the local plane of `projection`.
+
+    Pass i of a parcel runs from the top edge to the bottom edge at (i + 0.5) spraying widths from
+    its left edge. All passes are computed at once; returns two (N * passes, 2) arrays in parcel order.
+    """
+    num_passes = passes_per_parcel(width, spraying_width)
+    if not parcels:
+        empty = np.empty((0, 2), dtype=np.float64)
+        return empty, empty.copy()
+
+    corners = projection.to_local([
+        [(float(corner['lat']), float(corner['lng'])) for corner in parcel['coordinates'][:4]]
+        for parcel in parcels
+    ])
+    factors = ((np.arange(num_passes) + 0.5) * spraying_width / width)[np.newaxis, :, np.newaxis]
+    top_left, top_right, bottom_right, bottom_left = (corners[:, k, np.newaxis, :] for k in range(4))
+    tops = top_left + factors * (top_right - top_left)
+    bottoms = bottom_left + factors * (bottom_right - bottom_left)
+    return tops.reshape(-1, 2), bottoms.reshape(-1, 2)
@@ -0,0 +1,367 @@
+import os
+
+from planning.common import BUTTON_COLORS, color_name, normalize_color, parse_float
+from planning.compaction import MODE_PASSES, MODE_TRIGGERED, MissionReducer, MissionStats
+from planning.kinematics import OBJECTIVE_TIME, OBJECTIVES, FlightLimits, FlightTimeModel
+from planning.layout import FieldLayout
+from planning.mission import DEFAULT_SERVO_CHANNEL, DEFAULT_PWM_HIGH, DEFAULT_PWM_LOW, MissionFormatter, MissionWriter
+from planning.passes import generate_passes, parcels_by_color, parcel_ids_by_color, pass_grid_indices, passes_per_parcel
+from planning.route import plan_route
+from planning.sorties import split_route
+from planning.sweep import ROUTE_GREEDY, ROUTE_MODES, ROUTE_SWEEP, compare_routes, plan_routes, plan_sweep, preferred_route
+from planning.velocity import SprayerParams, calculate_velocity
+
+
+class PlanningError(Exception):
+    """A colour of a planner state cannot be turned into a mission."""
+
+
+class ColorPlan:
+    """
+    Everything planned for one colour: passes, route, ground speed, estimated flight time
+    (planning.kinematics.FlightTimeEstimate), the sorties under the tank / flight time limits
+    (planning.sorties.SortiePlan, None without limits), the greedy against grid-sweep comparison
+    (planning.sweep.plan_routes, None unless compared) and how to write its missions.
+    """
+
+    def __init__(self, color, button_name, route, velocity_results, params, home, mission_options, reducer=None,
+                 flight_time=None, sorties=None, route_comparison=None):
+        self.color = color
+        self.name = color_name(color)
+        self.button_name = button_name
+        self.route = route
+        self.velocity_results = velocity_results
+        self.params = params
+        self.home = home
+        self.mission_options = mission_options  # servo_channel, pwm_high, pwm_low
+        self.reducer = reducer or MissionReducer(MODE_PASSES)
+        self.flight_time = flight_time
+        self.sorties = sorties
+        self.route_comparison = route_comparison
+        self._runs = None
+
+    @property
+    def ground_speed_m_s(self):
+        return self.velocity_results["ground_speed_m_s"]
+
+    @property
+    def runs(self):
+        """The route's passes as mission runs (merged according to the reducer's mode)."""
+        if self._runs is None:
+            self._runs = self.reducer.runs(self.route.path, self.route.parcel_points)
+        return self._runs
+
+    @property
+    def mission_stats(self):
+        return MissionStats(self.runs, self.ground_speed_m_s)
+
+    @property
+    def lines(self):
+        """Mission lines as a list (write_mission streams them instead)."""
+        formatter = MissionFormatter(self.params.altitude, **self.mission_options)
+        lines = ["QGC WPL 110"]
+        lines += formatter.start(self.home, self.ground_speed_m_s)
+        for run in self.runs:
+            lines += formatter.run_lines(run)
+        lines += formatter.finish()
+        return lines
+
+    @property
+    def is_split(self):
+        return self.sorties is not None and len(self.sorties) > 1
+
+    def sortie_runs(self, sortie):
+        """Mission runs of one sortie (runs never span two sorties)."""
+        return self.reducer.runs(*sortie.passes_of(self.route.path, self.route.parcel_points))
+
+    def write_mission(self, file_path, runs=None):
+        """Stream the mission (or the given `runs`) to `file_path` run by run."""
+        with MissionWriter(file_path, self.home, self.params.altitude, self.ground_speed_m_s, **self.mission_options) as writer:
+            writer.add_runs(self.runs if runs is None else runs)
+        return file_path
+
+    def write_sortie_missions(self, file_path_of):
+        """
+        Write one mission per sortie to `file_path_of(sortie)`; returns (sortie, file_path, MissionStats)
+        per sortie.
+        """
+        # Every sortie is checked (MissionStats raises ValueError) before the first file is written
+        missions = []
+        for sortie in self.sorties:
+            runs = self.sortie_runs(sortie)
+            missions.append((sortie, runs, MissionStats(runs, self.ground_speed_m_s)))
+        return [(sortie, self.write_mission(file_path_of(sortie), runs), stats) for sortie, runs, stats in missions]
+
+
+class MissionPlanner:
+    """
+    Planner state (layout, colour map, sprayer parameters) -> passes, route and mission per colour.
+
+    This is the pipeline behind the planner window's Save / Generate Path / Calculate Velocity /
+    Save Mission buttons, on plain data.
+    """
+
+    def __init__(self, layout, spraying_width, acc_buffer, button_names=None, button_params=None,
+                 servo_channel=DEFAULT_SERVO_CHANNEL, pwm_high=DEFAULT_PWM_HIGH, pwm_low=DEFAULT_PWM_LOW,
+                 distance_service=None, mission_mode=MODE_PASSES, route_mode=ROUTE_GREEDY,
+                 objective=OBJECTIVE_TIME, flight_limits=None, tank_l=None, max_flight_s=None, compare=False):
+        if route_mode not in ROUTE_MODES:
+            raise ValueError(f"Unknown route mode: {route_mode}")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown route objective: {objective}")
+        self.layout = layout
+        self.spraying_width = float(spraying_width)
+        self.acc_buffer = float(acc_buffer)
+        self.button_names = {str(key): value for key, value in (button_names or {}).items()}
+        self.button_params = {str(key): value for key, value in (button_params or {}).items()}
+        self.servo_channel = int(servo_channel)
+        self.pwm_high = int(pwm_high)
+        self.pwm_low = int(pwm_low)
+        self.distance_service = distance_service
+        self.reducer = MissionReducer(mission_mode)
+        self.route_mode = route_mode
+        self.objective = objective
+        self.flight_limits = flight_limits or FlightLimits()
+        # Sortie limits (planning.sorties); None for no limit
+        self.tank_l = float(tank_l) if tank_l else None
+        self.max_flight_s = float(max_flight_s) if max_flight_s else None
+        # Plan both routes of every colour and compare them; the sweep is kept only when it is no worse
+        self.compare = bool(compare)
+        self._parcels = None
+        self._parcels_by_color = None
+        self._parcel_ids_by_color = None
+
+    @classmethod
+    def from_state(cls, state, **options):
+        """Planner for a state dictionary as written by PlannerMainWindow.save_file."""
+        try:
+            return cls(
+                FieldLayout.from_state(state),
+                parse_float(state['spraying_width']),
+                float(state.get('acc_buffer', 2.0)),
+                button_names=state.get('button_names'),
+                button_params=state.get('params'),
+                **options,
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise PlanningError(f"Invalid planner state: {e}")
+
+    @property
+    def parcels(self):
+        if self._parcels is None:
+            self._parcels = self.layout.parcels()
+        return self._parcels
+
+    @property
+    def parcels_by_color(self):
+        # Grouped once, in a single pass over the layout, for all colours
+        if self._parcels_by_color is None:
+            self._parcels_by_color = parcels_by_color(self.parcels)
+        return self._parcels_by_color
+
+    @property
+    def parcel_ids_by_color(self):
+        if self._parcel_ids_by_color is None:
+            self._parcel_ids_by_color = parcel_ids_by_color(self.parcels)
+        return self._parcel_ids_by_color
+
+    def colors(self):
+        """Button colours that have parcels assigned, in button order."""
+        used = self.parcels_by_color
+        return [color for color in BUTTON_COLORS if color in used]
+
+    def button_name(self, color):
+        return self.button_names.get(str(BUTTON_COLORS.index(color) + 1), "Unknown")
+
+    def sprayer_params(self, color):
+        params = self.button_params.get(str(BUTTON_COLORS.index(color) + 1))
+        if not params:
+            raise PlanningError(f"No sprayer parameters for {color_name(color)}")
+        try:
+            return SprayerParams.from_dict(params)
+        except (KeyError, ValueError) as e:
+            raise PlanningError(f"Invalid sprayer parameters for {color_name(color)}: {e}")
+
+    def flight_model(self, ground_speed_m_s):
+        return FlightTimeModel(ground_speed_m_s, self.acc_buffer, self.flight_limits)
+
+    def plan_color(self, color):
+        """Route, ground speed, flight time and sorties of one colour; None if it has no parcels."""
+        color = normalize_color(color)
+        selected = self.parcels_by_color.get(color)
+        if not selected:
+            return None
+
+        params = self.sprayer_params(color)
+        if params.altitude <= 0:
+            raise PlanningError("The altitude must be positive.")
+        layout = self.layout
+        try:
+            tops, bottoms = generate_passes(selected, layout.projection, layout.width, self.spraying_width)
+            velocity_results = calculate_velocity(
+                layout.width, layout.height, len(selected), self.spraying_width,
+                params.application_dose, params.nozzle_rate, params.nozzle_number,
+            )
+            flight_model = self.flight_model(velocity_results["ground_speed_m_s"])
+        except ValueError as e:
+            raise PlanningError(str(e))
+
+        # Routes are chosen by flight time (or by length with the distance objective)
+        cost_model = flight_model if self.objective == OBJECTIVE_TIME else None
+        comparison = None
+        if self.compare:
+            columns, rows, strips = self.pass_grid_indices(color)
+            greedy, sweep, comparison = plan_routes(
+                tops, bottoms, columns, rows, strips, layout.projection, self.acc_buffer,
+                distance_service=self.distance_service, cost_model=cost_model, home=layout.home,
+            )
+            if self.route_mode == ROUTE_SWEEP:
+                route = preferred_route(greedy, sweep, comparison)
+            else:
+                route = greedy
+                comparison["route"] = ROUTE_GREEDY
+        elif self.route_mode == ROUTE_SWEEP:
+            columns, rows, strips = self.pass_grid_indices(color)
+            route = plan_sweep(
+                tops, bottoms, columns, rows, strips, layout.projection, self.acc_buffer, cost_model=cost_model,
+            )
+        else:
+            route = plan_route(
+                tops, bottoms, layout.projection, self.acc_buffer, distance_service=self.distance_service,
+                cost_model=cost_model, home=layout.home,
+            )
+        flight_time = flight_model.estimate_route(route, layout.projection, layout.home, params.altitude)
+
+        sorties = None
+        if self.tank_l or self.max_flight_s:
+            try:
+                sorties = split_route(
+                    route, layout.projection, flight_model, velocity_results["caldo_per_plot_L"], layout.home,
+                    params.altitude, tank_l=self.tank_l, max_flight_s=self.max_flight_s,
+                )
+            except ValueError as e:
+                raise PlanningError(f"{color_name(color)}: {e}")
+
+        mission_options = {"servo_channel": self.servo_channel, "pwm_high": self.pwm_high, "pwm_low": self.pwm_low}
+        plan = ColorPlan(
+            color, self.button_name(color), route, velocity_results, params, layout.home, mission_options, self.reducer,
+            flight_time, sorties, comparison,
+        )
+        if self.reducer.mode == MODE_TRIGGERED:
+            # Refused when no single trigger duration sprays every parcel (planning.compaction.trigger_duration)
+            try:
+                plan.mission_stats
+            except ValueError as e:
+                raise PlanningError(f"{color_name(color)}: {e}")
+        return plan
+
+    def pass_grid_indices(self, color):
+        """(columns, rows, strips) of the passes of `color`, in generate_passes order."""
+        num_passes = passes_per_parcel(self.layout.width, self.spraying_width)
+        return pass_grid_indices(self.parcel_ids_by_color[color], self.layout.count_x, num_passes)
+
+    def compare_routes(self, color):
+        """Greedy against grid-sweep route of one colour (see planning.sweep.compare_routes); None without parcels."""
+        color = normalize_color(color)
+        selected = self.parcels_by_color.get(color)
+        if not selected:
+            return None
+        layout = self.layout
+        try:
+            tops, bottoms = generate_passes(selected, layout.projection, layout.width, self.spraying_width)
+        except ValueError as e:
+            raise PlanningError(str(e))
+        columns, rows, strips = self.pass_grid_indices(color)
+        cost_model = None
+        if self.objective == OBJECTIVE_TIME:
+            try:
+                params = self.sprayer_params(color)
+                velocity_results = calculate_velocity(
+                    layout.width, layout.height, len(selected), self.spraying_width,
+                    params.application_dose, params.nozzle_rate, params.nozzle_number,
+                )
+                cost_model = self.flight_model(velocity_results["ground_speed_m_s"])
+            except (PlanningError, ValueError):
+                cost_model = None  # no usable sprayer parameters: compare by length only
+        return compare_routes(
+            tops, bottoms, columns, rows, strips, layout.projection, self.acc_buffer,
+            distance_service=self.distance_service,
+            cost_model=cost_model,
+        )
+
+    def write_missions(self, output_dir, prefix=None, on_error=None, progress=None, file_name=None):
+        """
+        Write one .waypoints file per colour (per sortie when the route is split under the tank /
+        flight time limits) into `output_dir` and return a summary per colour.
+
+        Missions are streamed to disk pass by pass. Colours that cannot be planned are reported
+        (and passed to `on_error(color, error)`). `progress(done, total, color)` is called before
+        each colour and once at the end; returning False from it stops the export.
+        `file_name(plan, sortie=None)` overrides the default
+        "<prefix>_<colour>_<liquid>[_sortie<n>of<count>]_generated_mavlink_script.waypoints".
+        """
+        results = []
+        colors = self.colors()
+        for index, color in enumerate(colors):
+            if progress is not None and progress(index, len(colors), color) is False:
+                break
+            try:
+                plan = self.plan_color(color)
+            except PlanningError as e:
+                if on_error is not None:
+                    on_error(color, e)
+                results.append({"color": color, "name": color_name(color), "error": str(e)})
+                continue
+            if plan is None:
+                continue
+
+            def file_path_of(sortie=None):
+                if file_name is not None:
+                    name = file_name(plan, sortie) if sortie is not None else file_name(plan)
+                elif sortie is not None:
+                    name = (f"{prefix}_{plan.name}_{plan.button_name}_sortie{sortie.number}of{sortie.count}"
+                            f"_generated_mavlink_script.waypoints")
+                else:
+                    name = f"{prefix}_{plan.name}_{plan.button_name}_generated_mavlink_script.waypoints"
+                return os.path.join(output_dir, name)
+
+            result = {
+                "color": color,
+                "name": plan.name,
+                "passes": len(plan.route),
+                "path_length_m": plan.route.length_m,
+                "ground_speed_m_s": plan.ground_speed_m_s,
+                # Autopilot trigger duration of triggered missions (planning.compaction.trigger_duration)
+                "trigger_duration_s": plan.mission_stats.trigger_duration_s,
+            }
+            if plan.route_comparison is not None:
+                result["route_comparison"] = plan.route_comparison
+            if plan.is_split:
+                written = plan.write_sortie_missions(file_path_of)
+                flight_s = plan.sorties.flight_s
+                result.update({
+                    "items": sum(stats.items for _, _, stats in written),
+                    "upload_s": sum(stats.upload_s for _, _, stats in written),
+                    "flight_time_s": flight_s,
+                    "energy_wh": plan.flight_time.energy_wh * flight_s / plan.flight_time.total_s
+                    if plan.flight_time.energy_wh is not None and plan.flight_time.total_s else None,
+                    "sorties": [
+                        dict(sortie.to_dict(), file=file_path, items=stats.items) for sortie, file_path, stats in written
+                    ],
+                    "files": [file_path for _, file_path, _ in written],
+                })
+            else:
+                stats = plan.mission_stats
+                result.update({
+                    "items": stats.items,
+                    "upload_s": stats.upload_s,
+                    "flight_time_s": plan.flight_time.total_s,
+                    "energy_wh": plan.flight_time.energy_wh,
+                    "files": [plan.write_mission(file_path_of())],
+                })
+            result["file"] = result["files"][0]
+            results.append(result)
+        else:
+            if progress is not None:
+                progress(len(colors), len(colors), None)
+        return results
@@ -0,0 +1,89 @@
+import time
+
+from planning.common import button_number, color_name
+
+
+def report_lines(info, parcel_coordinates, paths_by_color, color_to_button, button_params, path_length,
+                 speed_text="", update_time=None):
+    """
+    Lines of the parcel layout report.
+
+    :param info: dict with button_names, width, height, gap_x, gap_y, count_x, count_y,
+                 spraying_width, corners ({"A": (lat, lon), ...}), fit and fit_gap
+    :param color_to_button: colour hex -> button (liquid) name
+    :param button_params: button number -> sprayer parameters (int or str keys)
+    :param path_length: callable returning the length of a path in meters
+    """
+    if update_time is None:
+        update_time = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    report_lines = []
+    report_lines.append("Parcel Layout Report\n")
+    report_lines.append(f"\nUpdated on {update_time}\n")
+    report_lines.append("="*50 + "\n")
+
+    # Add general information
+    report_lines.append("General Layout Information:\n")
+    report_lines.append(f"Liquid Names: {info['button_names']}\n")
+    report_lines.append(f"Parcel Width: {info['width']:.2f} meters\n")
+    report_lines.append(f"Parcel Height: {info['height']:.2f} meters\n")
+    report_lines.append(f"Gap X: {info['gap_x']:.2f} meters\n")
+    report_lines.append(f"Gap Y: {info['gap_y']:.2f} meters\n")
+    report_lines.append(f"Count X: {info['count_x']}\n")
+    report_lines.append(f"Count Y: {info['count_y']}\n")
+
+    # Add spray width and corner coordinates
+    report_lines.append(f"Spraying Width: {info['spraying_width']}\n")
+    for name in ("A", "B", "C", "D"):
+        lat, lon = info['corners'][name]
+        report_lines.append(f"{name} Coordinates: ({round(float(lat), 7)}, {round(float(lon), 7)})\n")
+    report_lines.append(f"Fit area: {info['fit']}\n")
+    report_lines.append(f"Parcel size preserved: {info['fit_gap']}\n")
+    report_lines.append("\n")
+
+    # Add parcel structure and colors
+    report_lines.append("Parcel Structure and Colors:\n")
+    for i, parcel_info in enumerate(parcel_coordinates):
+        coordinates = parcel_info['coordinates']
+        color = parcel_info['color']
+        report_lines.append(f"Parcel {i+1}:\n")
+        report_lines.append(f"  Color: {color_name(color)}\n")
+        report_lines.append(f"  Liquid Name: {color_to_button.get(color, 'Unknown')}\n")
+        report_lines.append("  Coordinates:\n")
+        for coord in coordinates:
+            report_lines.append(f"    - Lat: {round(float(coord['lat']), 7)}, Lon: {round(float(coord['lng']), 7)}\n")
+        report_lines.append("\n")
+
+    report_lines.append("Generated Paths by Color:\n")
+    if paths_by_color:
+        for color, paths in paths_by_color.items():
+            report_lines.append(f"  Color: {color_name(color)}\n")
+            report_lines.append(f"  Liquid Name: {color_to_button.get(color, 'Unkown')}\n")
+
+            # Append parameters for the button of this color, if any
+            number = button_number(color)
+            params = None
+            if number is not None:
+                params = button_params.get(number) or button_params.get(str(number))
+            if params:
+                report_lines.append(f"  Parameters:\n")
+                report_lines.append(f"    Application Dose: {params.get('application_dose', 'N/A')}\n")
+                report_lines.append(f"    Nozzle Rate: {params.get('nozzle_rate', 'N/A')}\n")
+                report_lines.append(f"    Nozzle Number: {params.get('nozzle_number', 'N/A')}\n")
+                report_lines.append(f"    Altitude: {params.get('altitude', 'N/A')}\n")
+                report_lines.append(f"    {speed_text}\n")
+            else:
+                report_lines.append(f"  Parameters: Not available\n")
+
+            report_lines.append(f"  Path Length: {path_length(paths):.2f} meters\n")
+            report_lines.append(f"  Path Coordinates:\n")
+            for i in range(0, len(paths), 2):
+                report_lines.append(f"    Segment {i // 2 + 1}:\n")
+                report_lines.append(f"      Start: Lat: {round(float(paths[i][0]), 7)}, Lon: {round(float(paths[i][1]), 7)}\n")
+                report_lines.append(f"      End: Lat: {round(float(paths[i+1][0]), 7)}, Lon: {round(float(paths[i+1][1]), 7)}\n")
+            report_lines.append("\n")
+    else:
+        report_lines.append("  No paths generated yet.\n")
+
+    report_lines.append("="*50 + "\n")
+    return report_lines
@@ -0,0 +1,81 @@
+import numpy as np
+from distance_matrix import EndpointDistanceMatrix, MAX_MATRIX_ENDPOINTS
+from path_optimizer import ScanPathOptimizer, DEFAULT_TIME_BUDGET_S
+from projection import planar_distance, extend_segments
+
+
+class Route:
+    """
+    Scanning route of one colour.
+
+    `path` holds the buffered start and buffered end of every pass (lat, lon), alternating;
+    `parcel_points` the spray start/end of every pass in flight order. `path_xy` (optional) is
+    the path in the local plane of the planner, as an (n, 2) array.
+    """
+
+    def __init__(self, path, parcel_points, length_m, order, flips, path_xy=None):
+        self.path = path
+        self.path_xy = path_xy
+        self.parcel_points = parcel_points
+        self.length_m = length_m
+        self.order = order
+        self.flips = flips
+
+    def __len__(self):
+        return len(self.parcel_points)
+
+
+def plan_route(tops, bottoms, projection, acc_buffer, distance_service=None, time_budget_s=DEFAULT_TIME_BUDGET_S,
+               cost_model=None, home=None):
+    """
+    Optimized visiting order of the passes given by their local top/bottom centres.
+
+    Every pass is flown completely top-to-bottom or bottom-to-top with an acceleration buffer of
+    `acc_buffer` meters on both ends. `distance_service` (a DistanceMatrixService) lets callers
+    reuse endpoint matrices between runs on the same layout. With a `cost_model`
+    (planning.kinematics.FlightTimeModel) the order is optimized for flight time, not length,
+    including the legs from and back to a (lat, lon) `home` when given.
+    """
+    tops = np.asarray(tops, dtype=np.float64).reshape(-1, 2)
+    bottoms = np.asarray(bottoms, dtype=np.float64).reshape(-1, 2)
+    if len(tops) == 0:
+        return Route([], [], 0.0, [], [])
+
+    # Buffered endpoints do not depend on the flight direction, so compute them once for all passes
+    acc_buffer = float(acc_buffer)
+    buffered_tops, buffered_bottoms = extend_segments(tops, bottoms, acc_buffer)
+
+    # Large pass sets are optimized without a full matrix (distances are computed on demand)
+    if distance_service is not None:
+        distance_matrix = distance_service.endpoint_matrix(buffered_tops, buffered_bottoms, planar=True)
+    elif 2 * len(tops) <= MAX_MATRIX_ENDPOINTS:
+        distance_matrix = EndpointDistanceMatrix(buffered_tops, buffered_bottoms, planar=True)
+    else:
+        distance_matrix = None
+    optimizer = ScanPathOptimizer(
+        tops, bottoms, buffer_m=acc_buffer, time_budget_s=time_budget_s, distance_matrix=distance_matrix,
+        cost_model=cost_model, home_xy=projection.point_to_local(home) if home is not None else None,
+    )
+    order, flips = optimizer.solve()
+    return route_from_order(tops, bottoms, buffered_tops, buffered_bottoms, order, flips, projection)
+
+
+def route_from_order(tops, bottoms, buffered_tops, buffered_bottoms, order, flips, projection):
+    """Route flying the passes in `order`, bottom-to-top where `flips` is set (local inputs)."""
+    # Orient every pass in flight order
+    order_index = np.asarray(order, dtype=np.intp)
+    flipped = np.asarray(flips, dtype=bool)[:, np.newaxis]
+    starts = np.where(flipped, bottoms[order_index], tops[order_index])
+    ends = np.where(flipped, tops[order_index], bottoms[order_index])
+
+    path_xy = np.empty((2 * len(order_index), 2), dtype=np.float64)
+    path_xy[0::2] = np.where(flipped, buffered_bottoms[order_index], buffered_tops[order_index])
+    path_xy[1::2] = np.where(flipped, buffered_tops[order_index], buffered_bottoms[order_index])
+    length_m = float(np.sum(planar_distance(path_xy[:-1], path_xy[1:]))) if len(path_xy) > 1 else 0.0
+
+    # Back to (lat, lon) only for the exported path
+    path = [tuple(point) for point in projection.to_geodetic(path_xy).tolist()]
+    starts = projection.to_geodetic(starts).tolist()
+    ends = projection.to_geodetic(ends).tolist()
+    parcel_points = [{'start': tuple(start), 'end': tuple(end)} for start, end in zip(starts, ends)]
+    return Route(path, parcel_points, length_m, [int(k) for k in order], [bool(f) for f in flips], path_xy)
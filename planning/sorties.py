@@ -0,0 +1,178 @@
+import numpy as np
+from projection import planar_distance
+from planning.kinematics import unit_rows
+
+# Mission segmentation: one colour's route flown in several sorties
+#
+# A large colour group needs more liquid than the tank holds or more flight time than a battery
+# lasts. The route is cut into sorties that keep its pass order: every sortie takes off at home,
+# flies to the first of its passes, sprays them in route order and returns home to land (and
+# refill / swap the battery). Every cut replaces one transition between passes by a flight back
+# home and out again, plus a landing and a takeoff, so where the route is cut matters: cutting
+# where the route passes close to home costs little, cutting at the far end of the field costs two
+# long legs. The cuts are chosen by dynamic programming over the cut positions to minimise the
+# total flight time, i.e. the dead-heading to and from home, under both limits.
+
+# Liquid / time slack of the limit checks (floating point sums of equal passes)
+LIMIT_TOLERANCE = 1e-9
+
+
+class Sortie:
+    """
+    Passes `start` to `end` (exclusive, route order) of a route flown as sortie `number` of
+    `count`, with the liquid it sprays, its flight time and the part of it spent flying from and
+    back to home (`ferry_s`).
+    """
+
+    def __init__(self, number, count, start, end, liquid_l, flight_s, ferry_s):
+        self.number = number
+        self.count = count
+        self.start = start
+        self.end = end
+        self.liquid_l = liquid_l
+        self.flight_s = flight_s
+        self.ferry_s = ferry_s
+
+    @property
+    def passes(self):
+        return self.end - self.start
+
+    def passes_of(self, path, parcel_points):
+        """The sortie's part of a route's path and parcel points (as Route.path / Route.parcel_points)."""
+        return path[2 * self.start:2 * self.end], parcel_points[self.start:self.end]
+
+    def to_dict(self):
+        return {
+            "sortie": self.number,
+            "passes": self.passes,
+            "liquid_l": self.liquid_l,
+            "flight_time_s": self.flight_s,
+            "ferry_s": self.ferry_s,
+        }
+
+
+class SortiePlan:
+    """The sorties of one route, in flight order."""
+
+    def __init__(self, sorties):
+        self.sorties = sorties
+
+    def __len__(self):
+        return len(self.sorties)
+
+    def __iter__(self):
+        return iter(self.sorties)
+
+    @property
+    def liquid_l(self):
+        return sum(sortie.liquid_l for sortie in self.sorties)
+
+    @property
+    def flight_s(self):
+        return sum(sortie.flight_s for sortie in self.sorties)
+
+    @property
+    def ferry_s(self):
+        return sum(sortie.ferry_s for sortie in self.sorties)
+
+    def summary(self):
+        minutes, seconds = divmod(int(round(self.flight_s)), 60)
+        ferry_minutes, ferry_seconds = divmod(int(round(self.ferry_s)), 60)
+        return (f"{len(self.sorties)} sortie(s), {self.liquid_l:.1f} L, {minutes}:{seconds:02d} min flight "
+                f"({ferry_minutes}:{ferry_seconds:02d} min to and from home)")
+
+
+def split_passes(path_xy, home_xy, flight_model, liquid_per_pass_l, tank_l=None, max_flight_s=None, altitude=None):
+    """
+    Cut a route given as local buffered start / end points (alternating, as Route.path) into
+    sorties from and back to `home_xy`. Returns a SortiePlan.
+
+    `liquid_per_pass_l` is the liquid of each pass (a number or one per pass); `tank_l` and
+    `max_flight_s` (flight time of one sortie, takeoff to landing) are the limits, None for no
+    limit. Raises ValueError when a single pass does not fit within them.
+    """
+    path_xy = np.asarray(path_xy, dtype=np.float64).reshape(-1, 2)
+    starts, ends = path_xy[0::2], path_xy[1::2]
+    n = len(starts)
+    if n == 0:
+        return SortiePlan([])
+    home_xy = np.asarray(home_xy, dtype=np.float64)
+
+    liquid = np.broadcast_to(np.asarray(liquid_per_pass_l, dtype=np.float64), (n,))
+    if tank_l is not None and tank_l <= 0:
+        raise ValueError("The tank capacity must be positive.")
+    if max_flight_s is not None and max_flight_s <= 0:
+        raise ValueError("The flight time limit must be positive.")
+
+    headings = unit_rows(ends - starts)
+    pass_times = flight_model.pass_time(planar_distance(starts, ends))
+    transition_times = flight_model.transition_time(ends[:-1], headings[:-1], starts[1:], headings[1:])
+    outbound = flight_model.outbound_time(home_xy, starts, headings)
+    inbound = flight_model.inbound_time(ends, headings, home_xy)
+    climb_s, descent_s = flight_model.takeoff_and_landing_time(altitude)
+    fixed_s = climb_s + descent_s
+
+    # Prefix sums: the sortie of passes i..j-1 sprays liquid_sum[j] - liquid_sum[i] and flies
+    #   fixed + outbound[i] + (pass_sum[j] - pass_sum[i]) + (transition_sum[j-1] - transition_sum[i]) + inbound[j-1]
+    liquid_sum = np.concatenate(([0.0], np.cumsum(liquid)))
+    pass_sum = np.concatenate(([0.0], np.cumsum(pass_times)))
+    transition_sum = np.concatenate(([0.0], np.cumsum(transition_times)))
+    # Time spent on passes i.. and their transitions before pass i, nondecreasing in i
+    before = pass_sum[:n] + transition_sum
+
+    best = np.full(n + 1, np.inf)  # best[j]: least flight time of passes 0..j-1 in whole sorties
+    best[0] = 0.0
+    cut = np.zeros(n + 1, dtype=np.intp)  # first pass of the last sortie of best[j]
+    for j in range(1, n + 1):
+        first = 0
+        if tank_l is not None:
+            # Smallest i whose sortie i..j-1 fits the tank (liquid_sum is nondecreasing)
+            first = int(np.searchsorted(liquid_sum, liquid_sum[j] - tank_l * (1 + LIMIT_TOLERANCE), side="left"))
+        if max_flight_s is not None:
+            # Passes and transitions alone already have to fit; the legs from and back to home are checked below
+            spraying_s = pass_sum[j] + transition_sum[j - 1]
+            first = max(first, int(np.searchsorted(before, spraying_s - (max_flight_s - fixed_s), side="left")))
+        if first >= j:
+            raise ValueError(f"Pass {j} does not fit within the tank / flight time limit of one sortie.")
+
+        candidates = np.arange(first, j)
+        flight = (fixed_s + outbound[candidates] + inbound[j - 1]
+                  + (pass_sum[j] - pass_sum[candidates]) + (transition_sum[j - 1] - transition_sum[candidates]))
+        total = best[candidates] + flight
+        if max_flight_s is not None:
+            total = np.where(flight <= max_flight_s * (1 + LIMIT_TOLERANCE), total, np.inf)
+        # argmin takes the first (longest) sortie on ties, i.e. the fewest sorties
+        pick = int(np.argmin(total))
+        if not np.isfinite(total[pick]):
+            raise ValueError(f"Pass {j} does not fit within the tank / flight time limit of one sortie.")
+        best[j] = total[pick]
+        cut[j] = candidates[pick]
+
+    bounds = []
+    end = n
+    while end > 0:
+        bounds.append((int(cut[end]), end))
+        end = int(cut[end])
+    bounds.reverse()
+
+    sorties = []
+    for number, (start, end) in enumerate(bounds, start=1):
+        ferry_s = float(outbound[start] + inbound[end - 1])
+        flight_s = (fixed_s + ferry_s + float(pass_sum[end] - pass_sum[start])
+                    + float(transition_sum[end - 1] - transition_sum[start]))
+        sorties.append(Sortie(
+            number, len(bounds), start, end, float(liquid_sum[end] - liquid_sum[start]), flight_s, ferry_s,
+        ))
+    return SortiePlan(sorties)
+
+
+def split_route(route, projection, flight_model, liquid_per_pass_l, home, altitude=None, tank_l=None,
+                max_flight_s=None):
+    """split_passes for a Route (its local path when it has one) and a (lat, lon) home."""
+    if not route.path:
+        return SortiePlan([])
+    path_xy = route.path_xy if route.path_xy is not None else projection.to_local(route.path)
+    return split_passes(
+        path_xy, projection.point_to_local(home), flight_model, liquid_per_pass_l,
+        tank_l=tank_l, max_flight_s=max_flight_s, altitude=altitude,
+    )
@@ -0,0 +1,295 @@
+import math
+import time
+
+import numpy as np
+from projection import extend_segments
+from planning.compaction import DEFAULT_ANGLE_TOLERANCE_DEG, DEFAULT_OFFSET_TOLERANCE_M, TOUCHING_GAP_M
+from planning.route import Route, plan_route, route_from_order
+
+# Route planners
+ROUTE_GREEDY = "greedy"  # greedy nearest neighbour refined by 2-opt / Or-opt (ScanPathOptimizer)
+ROUTE_SWEEP = "sweep"  # serpentine sweep over the parcel columns or rows, parcel by parcel
+ROUTE_MODES = (ROUTE_GREEDY, ROUTE_SWEEP)
+
+# Largest key numpy sorts with its linear radix sort (stable sort of 16-bit integers)
+RADIX_KEY_MAX = np.iinfo(np.uint16).max
+
+
+def _grid_order(major, minor, strips):
+    """Indices ordering the passes by `major`, then `minor`, then strip (stable sorts, least significant key first)."""
+    largest = max(int(major.max()), int(minor.max()), int(strips.max()))
+    key_type = np.uint16 if largest <= RADIX_KEY_MAX else np.int64
+    order = np.argsort(strips.astype(key_type), kind="stable")
+    order = order[np.argsort(minor[order].astype(key_type), kind="stable")]
+    return order[np.argsort(major[order].astype(key_type), kind="stable")]
+
+
+def _line_bounds(keys):
+    """(start, end) of the runs of equal `keys` (sorted)."""
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    return list(zip(starts.tolist(), np.append(starts[1:], len(keys)).tolist()))
+
+
+def _column_visits(parcel_columns, parcel_rows, first_down):
+    """
+    Blocks (start, end, downward) of column-major parcels in visiting order: runs of parcels in
+    consecutive rows of one column, columns left to right, alternately down and up.
+    """
+    visits = []
+    for rank, (start, end) in enumerate(_line_bounds(parcel_columns)):
+        breaks = np.flatnonzero(parcel_rows[start + 1:end] != parcel_rows[start:end - 1] + 1) + start + 1
+        edges = [start] + breaks.tolist() + [end]
+        blocks = list(zip(edges[:-1], edges[1:]))
+        downward = (rank % 2 == 0) == first_down
+        visits.extend((a, b, downward) for a, b in (blocks if downward else reversed(blocks)))
+    return visits
+
+
+def _row_visits(parcel_rows, first_right):
+    """
+    Single parcels (start, end, downward) of row-major parcels in visiting order: rows top to
+    bottom, alternately left to right and right to left.
+    """
+    visits = []
+    for rank, (start, end) in enumerate(_line_bounds(parcel_rows)):
+        parcels = range(start, end) if (rank % 2 == 0) == first_right else range(end - 1, start - 1, -1)
+        visits.extend((parcel, parcel + 1, True) for parcel in parcels)
+    return visits
+
+
+def sweep_order(tops, bottoms, columns, rows, strips, by_rows=False, first_forward=True):
+    """
+    Serpentine visiting order of the passes given by their local top/bottom centres and their
+    parcel `columns` / `rows` and `strips` (see planning.passes.pass_grid_indices).
+
+    Every parcel has its strips flown back to back, with alternating directions, and the sweep
+    never flies a strip over the parcels of other colours:
+
+    - by columns: parcel columns left to right, alternately down and up (down first unless
+      `first_forward` is False). Vertically adjacent parcels of a column form a block that is
+      sprayed strip by strip through all its parcels before the next block.
+    - `by_rows`: parcel rows top to bottom, alternately left to right and right to left (right
+      to left first when `first_forward` is False), parcel by parcel.
+
+    Each block starts at the corner nearest to where the previous one ended. Returns (order,
+    flips) like ScanPathOptimizer.solve(); flips are True for passes flown bottom-to-top.
+    """
+    columns = np.asarray(columns, dtype=np.int64)
+    rows = np.asarray(rows, dtype=np.int64)
+    strips = np.asarray(strips, dtype=np.int64)
+    n = len(columns)
+    if n == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=bool)
+
+    tops = np.asarray(tops, dtype=np.float64)
+    bottoms = np.asarray(bottoms, dtype=np.float64)
+
+    # Parcels in visiting-line order, each a row of its passes in strip order
+    num_strips = int(strips.max()) + 1
+    if n % num_strips:
+        raise ValueError("Every parcel needs the same number of strips.")
+    if by_rows:
+        parcels = _grid_order(rows, columns, strips).reshape(-1, num_strips)
+        visits = _row_visits(rows[parcels[:, 0]], first_forward)
+    else:
+        parcels = _grid_order(columns, rows, strips).reshape(-1, num_strips)
+        visits = _column_visits(columns[parcels[:, 0]], rows[parcels[:, 0]], first_forward)
+
+    visits = np.asarray(visits, dtype=np.int64).reshape(-1, 3)
+    block_starts, block_ends = visits[:, 0], visits[:, 1]
+    sizes = block_ends - block_starts
+    last_strip = num_strips - 1
+    # The last strip is flown the other way round from the first one when the strip count is even
+    last_flipped = last_strip % 2 == 1
+
+    # Four ways into every block, (reversed strips, first strip upwards): where each enters and exits
+    entries = []
+    exits = []
+    for reverse in (False, True):
+        first_strip, final_strip = (last_strip, 0) if reverse else (0, last_strip)
+        for first_up in (False, True):
+            entry = bottoms[parcels[block_ends - 1, first_strip]] if first_up else tops[parcels[block_starts, first_strip]]
+            exit_up = first_up != last_flipped
+            exit_ = tops[parcels[block_starts, final_strip]] if exit_up else bottoms[parcels[block_ends - 1, final_strip]]
+            entries.append(entry.tolist())
+            exits.append(exit_.tolist())
+
+    # Corner choice, one small decision per block on plain floats: enter nearest to the last exit.
+    # The first block starts at its left strip, in the direction of its line.
+    choices = np.empty(len(visits), dtype=np.int64)
+    choice = 0 if visits[0, 2] else 1
+    choices[0] = choice
+    exit_x, exit_y = exits[choice][0]
+    for block in range(1, len(visits)):
+        best = None
+        for option in range(4):
+            entry_x, entry_y = entries[option][block]
+            distance = math.hypot(entry_x - exit_x, entry_y - exit_y)
+            if best is None or distance < best:
+                best, choice = distance, option
+        choices[block] = choice
+        exit_x, exit_y = exits[choice][block]
+
+    # Order of every pass: by block, then strip in flight order, then parcel in flight direction
+    reverse = choices >= 2
+    first_up = choices % 2 == 1
+    parcel_block = np.repeat(np.arange(len(visits)), sizes)
+    parcel_offset = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    parcel_index = np.repeat(block_starts, sizes) + parcel_offset
+
+    block_of = np.repeat(parcel_block, num_strips)
+    strip = np.tile(np.arange(num_strips), len(parcel_block))
+    position = np.where(reverse[block_of], last_strip - strip, strip)
+    upward = (position % 2 == 1) != first_up[block_of]
+    offset = np.repeat(parcel_offset, num_strips)
+    key = (block_of * num_strips + position) * int(sizes.max()) \
+        + np.where(upward, sizes[block_of] - 1 - offset, offset)
+    flat = parcels[np.repeat(parcel_index, num_strips), strip]
+    ranked = np.argsort(key, kind="stable")
+    return flat[ranked].astype(np.intp), upward[ranked]
+
+
+def _transition_cost(buffered_tops, buffered_bottoms, order, flips, cost_model=None):
+    """
+    Length of the connections between consecutive passes (pass lengths are the same for any
+    order), or their flight time with a `cost_model`.
+    """
+    if len(order) < 2:
+        return 0.0
+    flipped = flips[:, np.newaxis]
+    entry = np.where(flipped, buffered_bottoms[order], buffered_tops[order])
+    exit_ = np.where(flipped, buffered_tops[order], buffered_bottoms[order])
+    if cost_model is not None:
+        headings = exit_ - entry
+        headings = headings / np.hypot(headings[:, 0], headings[:, 1]).clip(min=1e-12)[:, np.newaxis]
+        return float(cost_model.transition_time(exit_[:-1], headings[:-1], entry[1:], headings[1:]).sum())
+    diff = exit_[:-1] - entry[1:]
+    return float(np.hypot(diff[:, 0], diff[:, 1]).sum())
+
+
+def plan_sweep(tops, bottoms, columns, rows, strips, projection, acc_buffer, cost_model=None):
+    """
+    Grid-sweep route of the passes given by their local top/bottom centres and their grid
+    `columns` / `rows` / `strips` (see planning.passes.pass_grid_indices and sweep_order).
+
+    Deterministic and linear in the number of passes: passes are grouped with radix sorts and the
+    four serpentine variants (by columns or rows, either way first) are compared, by length or by flight time
+    with a `cost_model`; no search involved. Returns a Route like plan_route.
+
+    Not a shortening of the greedy route: on regular layouts (a colour in whole columns, stripes,
+    a checkerboard) both are equally long, with colours mixed at random the greedy optimizer's
+    local search finds routes some 25 % shorter. The sweep is for fast, predictable routes on
+    large fields; compare_routes shows what it costs.
+    """
+    tops = np.asarray(tops, dtype=np.float64).reshape(-1, 2)
+    bottoms = np.asarray(bottoms, dtype=np.float64).reshape(-1, 2)
+    if len(tops) == 0:
+        return Route([], [], 0.0, [], [])
+    if len(columns) != len(tops) or len(rows) != len(tops) or len(strips) != len(tops):
+        raise ValueError("Every pass needs a column, a row and a strip.")
+
+    buffered_tops, buffered_bottoms = extend_segments(tops, bottoms, float(acc_buffer))
+    candidates = [
+        sweep_order(buffered_tops, buffered_bottoms, columns, rows, strips, by_rows, first_forward)
+        for by_rows in (False, True) for first_forward in (True, False)
+    ]
+    order, flips = min(
+        candidates, key=lambda candidate: _transition_cost(buffered_tops, buffered_bottoms, *candidate, cost_model)
+    )
+    return route_from_order(tops, bottoms, buffered_tops, buffered_bottoms, order, flips, projection)
+
+
+def count_turns(tops, bottoms, order, flips, angle_tolerance_deg=DEFAULT_ANGLE_TOLERANCE_DEG,
+                offset_tolerance_m=DEFAULT_OFFSET_TOLERANCE_M):
+    """
+    Transitions between consecutive passes that are not a straight continuation, i.e. where the
+    drone has to stop and turn (the same test planning.compaction uses to merge passes).
+    """
+    if len(order) < 2:
+        return 0
+    tops = np.asarray(tops, dtype=np.float64).reshape(-1, 2)
+    bottoms = np.asarray(bottoms, dtype=np.float64).reshape(-1, 2)
+    order = np.asarray(order, dtype=np.intp)
+    flipped = np.asarray(flips, dtype=bool)[:, np.newaxis]
+    starts = np.where(flipped, bottoms[order], tops[order])
+    ends = np.where(flipped, tops[order], bottoms[order])
+
+    directions = ends - starts
+    lengths = np.hypot(directions[:, 0], directions[:, 1])
+    directions = directions / np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+    heading, following = directions[:-1], directions[1:]
+    step = starts[1:] - starts[:-1]
+    gap = starts[1:] - ends[:-1]
+
+    same_heading = np.einsum("ij,ij->i", heading, following) >= math.cos(math.radians(angle_tolerance_deg))
+    on_line = np.abs(heading[:, 0] * step[:, 1] - heading[:, 1] * step[:, 0]) <= offset_tolerance_m
+    ahead = np.einsum("ij,ij->i", heading, gap) > -TOUCHING_GAP_M
+    return int(np.count_nonzero(~(same_heading & on_line & ahead)))
+
+
+def route_comparison(greedy, sweep, tops, bottoms):
+    """
+    Lengths and turns of a greedy and a sweep Route of the same passes:
+
+        {"greedy_m", "sweep_m", "saving_m", "saving_pct", "greedy_turns", "sweep_turns"}
+
+    `saving_m` is positive when the sweep is shorter.
+    """
+    saving_m = greedy.length_m - sweep.length_m
+    return {
+        "greedy_m": greedy.length_m,
+        "sweep_m": sweep.length_m,
+        "saving_m": saving_m,
+        "saving_pct": 100.0 * saving_m / greedy.length_m if greedy.length_m else 0.0,
+        "greedy_turns": count_turns(tops, bottoms, greedy.order, greedy.flips),
+        "sweep_turns": count_turns(tops, bottoms, sweep.order, sweep.flips),
+    }
+
+
+def plan_routes(tops, bottoms, columns, rows, strips, projection, acc_buffer, distance_service=None,
+                cost_model=None, home=None):
+    """
+    Plan the same passes with both planners. Returns (greedy, sweep, comparison): the two Routes
+    and route_comparison plus planning times ("greedy_s", "sweep_s") and, with a `cost_model`,
+    estimated flight times ("greedy_flight_s", "sweep_flight_s", with the legs from and back to a
+    (lat, lon) `home` when given).
+    """
+    started = time.perf_counter()
+    greedy = plan_route(
+        tops, bottoms, projection, acc_buffer, distance_service=distance_service, cost_model=cost_model, home=home,
+    )
+    greedy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sweep = plan_sweep(tops, bottoms, columns, rows, strips, projection, acc_buffer, cost_model=cost_model)
+    sweep_s = time.perf_counter() - started
+
+    comparison = route_comparison(greedy, sweep, tops, bottoms)
+    if cost_model is not None:
+        comparison["greedy_flight_s"] = cost_model.estimate_route(greedy, projection, home).total_s
+        comparison["sweep_flight_s"] = cost_model.estimate_route(sweep, projection, home).total_s
+    comparison["greedy_s"] = greedy_s
+    comparison["sweep_s"] = sweep_s
+    return greedy, sweep, comparison
+
+
+def preferred_route(greedy, sweep, comparison):
+    """
+    The sweep unless it is slower (estimated flight time, when compared with a cost model) or
+    longer than the greedy route of the same passes; sets comparison["route"] to the planner kept.
+    """
+    if "sweep_flight_s" in comparison:
+        sweep_wins = comparison["sweep_flight_s"] <= comparison["greedy_flight_s"]
+    else:
+        sweep_wins = comparison["sweep_m"] <= comparison["greedy_m"]
+    comparison["route"] = ROUTE_SWEEP if sweep_wins else ROUTE_GREEDY
+    return sweep if sweep_wins else greedy
+
+
+def compare_routes(tops, bottoms, columns, rows, strips, projection, acc_buffer, distance_service=None,
+                   cost_model=None):
+    """The comparison of plan_routes (route_comparison plus planning and flight times)."""
+    return plan_routes(
+        tops, bottoms, columns, rows, strips, projection, acc_buffer, distance_service=distance_service,
+        cost_model=cost_model,
+    )[2]
@@ -0,0 +1,66 @@
+from planning.common import parse_float
+
+
+class SprayerParams:
+    """Per-colour sprayer settings as stored under 'params' in the planner state."""
+
+    def __init__(self, application_dose, nozzle_rate, nozzle_number, altitude):
+        self.application_dose = float(application_dose)
+        self.nozzle_rate = float(nozzle_rate)
+        self.nozzle_number = float(nozzle_number)
+        self.altitude = float(altitude)
+
+    @classmethod
+    def from_dict(cls, params):
+        """Parse the text values of the planner inputs. Raises ValueError/KeyError on bad input."""
+        return cls(
+            parse_float(params['application_dose']),
+            parse_float(params['nozzle_rate']),
+            parse_float(params['nozzle_number']),
+            parse_float(params['altitude']),
+        )
+
+
+def calculate_velocity(width, height, number_of_parcels, spraying_width, application_dose, nozzle_rate, nozzle_number):
+    """
+    Ground speed needed to apply `application_dose` (L/ha) over `number_of_parcels` parcels of
+    width x height meters with the given nozzles, one pass every `spraying_width` meters.
+    Returns the same dictionary the planner keeps as `velocity_results`.
+    """
+    for name, value in (
+        ("application dose", application_dose),
+        ("nozzle rate", nozzle_rate),
+        ("nozzle number", nozzle_number),
+        ("spraying width", spraying_width),
+        ("number of parcels", number_of_parcels),
+    ):
+        if value <= 0:
+            raise ValueError(f"{name} must be positive")
+
+    # Assuming width and height are in meters
+    parcel_area_m2 = width * height
+    sup_aplicada_m2 = number_of_parcels * parcel_area_m2
+
+    # Total required solution (caldo necesario) in liters
+    caldo_necesario = (application_dose * sup_aplicada_m2) / 10000  # Convert m² to hectares
+
+    # Solution needed per pass
+    caldo_per_plot = caldo_necesario / (number_of_parcels * width / spraying_width)
+
+    # Total flow rate in L/min and L/s
+    flow_rate_total_L_min = nozzle_rate * nozzle_number
+    flow_rate_total_L_s = flow_rate_total_L_min / 60
+
+    # Each pass runs the parcel height
+    time_per_plot_s = caldo_per_plot / flow_rate_total_L_s
+    ground_speed_m_s = height / time_per_plot_s
+
+    return {
+        "caldo_necesario_L": caldo_necesario,
+        "caldo_per_plot_L": caldo_per_plot,
+        "flow_rate_total_L_min": flow_rate_total_L_min,
+        "flow_rate_total_L_s": flow_rate_total_L_s,
+        "time_per_plot_s": time_per_plot_s,
+        "ground_speed_m_s": ground_speed_m_s,
+        "ground_speed_km_h": ground_speed_m_s * 3.6,
+    }
@@ -0,0 +1,100 @@
+import math
+import numpy as np
+
+# Earth's radius in meters (same spherical model as the haversine distances)
+EARTH_RADIUS_M = 6371000
+
+
+class LocalProjection:
+    """
+    Local east-north-up (ENU) tangent plane anchored at one point of the field.
+
+    A field is a few hundred meters across, so the plane is accurate to well below a millimetre.
+    Geometry is projected once, done as plain vector math in meters, and converted back to
+    (lat, lon) only when it has to leave the planner (map, mission, report).
+
+    Points are mapped with a gnomonic (central) projection, so straight lines on the plane are
+    great-circle arcs on the sphere and to_geodetic(to_local(p)) round-trips exactly.
+    """
+
+    def __init__(self, origin_lat, origin_lon):
+        self.origin_lat = float(origin_lat)
+        self.origin_lon = float(origin_lon)
+
+        lat0 = math.radians(self.origin_lat)
+        lon0 = math.radians(self.origin_lon)
+        sin_lat, cos_lat = math.sin(lat0), math.cos(lat0)
+        sin_lon, cos_lon = math.sin(lon0), math.cos(lon0)
+
+        # Rows: east, north, up unit vectors in Earth-centred coordinates
+        self.rotation = np.array([
+            [-sin_lon, cos_lon, 0.0],
+            [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+            [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat],
+        ])
+        self.up = self.rotation[2]
+        self.origin_ecef = self.up * EARTH_RADIUS_M
+
+    @classmethod
+    def from_corners(cls, corners):
+        """
+        Build the projection for a field from its corner coordinates.
+        `corners` is a sequence of (lat, lon) pairs, e.g. [A, B, C, D]; the first one is the origin.
+        """
+        first = corners[0]
+        return cls(float(first[0]), float(first[1]))
+
+    def to_local(self, points):
+        """Convert (lat, lon) points (any shape ending in 2) to (east, north) meters."""
+        points = np.asarray(points, dtype=np.float64)
+        lat = np.radians(points[..., 0])
+        lon = np.radians(points[..., 1])
+        cos_lat = np.cos(lat)
+        unit = np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+        # Scale each direction so it meets the tangent plane, then express it in the ENU frame
+        on_plane = unit * (EARTH_RADIUS_M / (unit @ self.up))[..., np.newaxis]
+        local = (on_plane - self.origin_ecef) @ self.rotation.T
+        return local[..., :2]
+
+    def to_geodetic(self, local):
+        """Convert (east, north) meters (any shape ending in 2) back to (lat, lon) degrees."""
+        local = np.asarray(local, dtype=np.float64)
+        ecef = self.origin_ecef + local[..., 0:1] * self.rotation[0] + local[..., 1:2] * self.rotation[1]
+        lat = np.degrees(np.arctan2(ecef[..., 2], np.hypot(ecef[..., 0], ecef[..., 1])))
+        lon = np.degrees(np.arctan2(ecef[..., 1], ecef[..., 0]))
+        return np.stack((lat, lon), axis=-1)
+
+    def point_to_local(self, point):
+        """Scalar convenience: (lat, lon) -> (east, north) tuple."""
+        east, north = self.to_local(point)
+        return float(east), float(north)
+
+    def point_to_geodetic(self, local):
+        """Scalar convenience: (east, north) -> (lat, lon) tuple."""
+        lat, lon = self.to_geodetic(local)
+        return float(lat), float(lon)
+
+
+def planar_distance(a, b):
+    """Vectorized Euclidean distance between (east, north) point arrays (broadcasting)."""
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+
+def unit_vector(vector):
+    """Normalize (east, north) vectors; zero-length vectors stay zero."""
+    vector = np.asarray(vector, dtype=np.float64)
+    length = np.hypot(vector[..., 0], vector[..., 1])[..., np.newaxis]
+    return np.divide(vector, length, out=np.zeros_like(vector), where=length > 0)
+
+
+def extend_segments(starts, ends, distance):
+    """
+    Push both ends of every (start -> end) segment outwards by `distance` meters along the segment.
+    Used for the acceleration buffers; returns (extended_starts, extended_ends).
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    unit = unit_vector(ends - starts)
+    return starts - unit * distance, ends + unit * distance
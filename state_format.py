@@ -0,0 +1,338 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+
+import numpy as np
+
+# Binary planner state (.ppstate), version 1. All integers little-endian.
+#
+#   header    magic (8 bytes) | format version (uint16) | flags (uint16) | metadata length (uint32)
+#   metadata  UTF-8 JSON: every scalar state key plus the table of array blocks, padded to 8 bytes
+#   blocks    raw or zlib-compressed float64 / uint16 arrays, each starting on an 8-byte boundary
+#
+# The metadata holds everything that is small (names, sizes, corners as typed, parameters); the
+# bulky parts, parcel corners and the paths of every colour, are packed arrays. Uncompressed blocks
+# are read as views into a read-only memory map, so nothing is parsed or copied until it is used.
+MAGIC = b"PPSTATE\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+ALIGNMENT = 8
+
+STATE_EXTENSION = ".ppstate"
+
+# Header flags
+FLAG_COMPRESSED = 0x1
+
+# Compressing only pays off for blocks of at least this many bytes
+MIN_COMPRESS_BYTES = 4096
+
+PARCEL_CORNERS = "parcels.corners"
+PARCEL_COLORS = "parcels.colors"
+PATH_PREFIX = "path:"
+
+
+class StateFormatError(ValueError):
+    """Raised for files that are not valid planner states of a supported version."""
+
+
+def is_binary_state(path):
+    """True when `path` starts with the binary state magic (JSON states start with '{')."""
+    with open(path, 'rb') as state_file:
+        return state_file.read(len(MAGIC)) == MAGIC
+
+
+def _padding(length):
+    return -length % ALIGNMENT
+
+
+def _encode_block(array, compress):
+    data = np.ascontiguousarray(array).tobytes()
+    if compress and len(data) >= MIN_COMPRESS_BYTES:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return packed, "zlib"
+    return data, "raw"
+
+
+def _parcel_arrays(parcel_coordinates):
+    """
+    (corners, color indices, palette) of the parcel list, or None when the parcels do not share one
+    vertex count (they are then kept in the metadata as they are).
+    """
+    if not parcel_coordinates:
+        return None
+    vertex_count = len(parcel_coordinates[0]['coordinates'])
+    if any(len(parcel['coordinates']) != vertex_count for parcel in parcel_coordinates):
+        return None
+
+    corners = np.array(
+        [[(vertex['lat'], vertex['lng']) for vertex in parcel['coordinates']] for parcel in parcel_coordinates],
+        dtype=np.float64,
+    ).reshape(len(parcel_coordinates), vertex_count, 2)
+
+    palette = []
+    palette_index = {}
+    indices = np.empty(len(parcel_coordinates), dtype=np.uint16)
+    for i, parcel in enumerate(parcel_coordinates):
+        color = parcel['color']
+        if color not in palette_index:
+            palette_index[color] = len(palette)
+            palette.append(color)
+        indices[i] = palette_index[color]
+    return corners, indices, palette
+
+
+def write_binary_state(path, data, compress=False):
+    """
+    Write a planner state dict (the keys written by save_file) in the binary format.
+
+    Parcel corners and paths are packed as float64 arrays; with `compress` every large block is
+    zlib-compressed (smaller files, but loading then has to inflate instead of memory-mapping).
+    """
+    metadata = {key: value for key, value in data.items() if key not in ('parcel_coordinates', 'paths_by_color')}
+    blocks = []
+
+    parcel_coordinates = data.get('parcel_coordinates')
+    parcel_arrays = _parcel_arrays(parcel_coordinates)
+    if parcel_arrays is None:
+        metadata['parcel_coordinates'] = parcel_coordinates
+    else:
+        corners, indices, palette = parcel_arrays
+        metadata['parcel_palette'] = palette
+        blocks.append((PARCEL_CORNERS, corners))
+        blocks.append((PARCEL_COLORS, indices))
+
+    path_colors = []
+    for color, color_path in (data.get('paths_by_color') or {}).items():
+        path_colors.append(color)
+        blocks.append((PATH_PREFIX + color, np.asarray(color_path, dtype=np.float64).reshape(-1, 2)))
+    metadata['path_colors'] = path_colors
+
+    # Lay the blocks out back to back, every one aligned for zero-copy views
+    table = {}
+    payload = []
+    offset = 0
+    for name, array in blocks:
+        encoded, codec = _encode_block(array, compress)
+        table[name] = {
+            "offset": offset,
+            "size": len(encoded),
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "codec": codec,
+        }
+        payload.append(encoded)
+        payload.append(b"\0" * _padding(len(encoded)))
+        offset += len(encoded) + _padding(len(encoded))
+    metadata['arrays'] = table
+
+    meta_bytes = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+    meta_bytes += b" " * _padding(HEADER.size + len(meta_bytes))
+    flags = FLAG_COMPRESSED if compress else 0
+
+    # Write next to the target and swap it in, so a failed save never truncates an existing state
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as state_file:
+        state_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(meta_bytes)))
+        state_file.write(meta_bytes)
+        for chunk in payload:
+            state_file.write(chunk)
+    os.replace(temp_path, path)
+
+
+class StateFile:
+    """
+    Read access to a binary planner state.
+
+    Uncompressed arrays are returned as read-only views into a memory map of the file, compressed
+    ones are inflated on access. Drop or copy the views before close() (or the end of the `with`
+    block): the memory map cannot be closed while a view into it is alive.
+    """
+
+    def __init__(self, path):
+        self.file_path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file: mmap refuses zero-length mappings
+            self._file.close()
+            raise StateFormatError(f"{path}: empty file")
+
+        try:
+            magic, version, self.flags, meta_length = HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self.close()
+            raise StateFormatError(f"{path}: truncated header")
+        if magic != MAGIC:
+            self.close()
+            raise StateFormatError(f"{path}: not a binary planner state")
+        if version > FORMAT_VERSION:
+            self.close()
+            raise StateFormatError(f"{path}: format version {version} is newer than supported ({FORMAT_VERSION})")
+        self.version = version
+
+        try:
+            self.metadata = json.loads(self._map[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+        except ValueError as e:
+            # JSONDecodeError and UnicodeDecodeError are both ValueErrors
+            self.close()
+            raise StateFormatError(f"{path}: corrupt metadata ({e})")
+        if not isinstance(self.metadata, dict):
+            self.close()
+            raise StateFormatError(f"{path}: corrupt metadata")
+        self._arrays = self.metadata.pop('arrays', {})
+        self._data_offset = HEADER.size + meta_length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the memory map and the file. Raises BufferError while views into the map are alive;
+        the file handle is closed either way (the map goes once the last view is dropped).
+        """
+        try:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+        finally:
+            self._file.close()
+
+    def has_array(self, name):
+        return name in self._arrays
+
+    def array(self, name):
+        """Array block `name` (a view into the file when it is stored uncompressed)."""
+        entry = self._arrays.get(name)
+        if entry is None:
+            raise KeyError(name)
+        start = self._data_offset + entry['offset']
+        end = start + entry['size']
+        if end > len(self._map):
+            raise StateFormatError(f"{self.file_path}: array {name!r} runs past the end of the file")
+
+        dtype = np.dtype(entry['dtype'])
+        if entry['codec'] == "raw":
+            array = np.frombuffer(self._map, dtype=dtype, count=entry['size'] // dtype.itemsize, offset=start)
+        elif entry['codec'] == "zlib":
+            array = np.frombuffer(zlib.decompress(self._map[start:end]), dtype=dtype)
+        else:
+            raise StateFormatError(f"{self.file_path}: unknown codec {entry['codec']!r}")
+        return array.reshape(entry['shape'])
+
+    def parcel_corners(self):
+        """(N, 4, 2) float64 array of parcel corners (lat, lng), or None."""
+        if not self.has_array(PARCEL_CORNERS):
+            return None
+        return self.array(PARCEL_CORNERS)
+
+    def parcel_coordinates(self):
+        """Parcels in the JSON layout: [{'coordinates': [{'lat', 'lng'}, ...], 'color'}, ...]."""
+        if not self.has_array(PARCEL_CORNERS):
+            return self.metadata.get('parcel_coordinates')
+        palette = self.metadata['parcel_palette']
+        corners = self.array(PARCEL_CORNERS).tolist()
+        colors = self.array(PARCEL_COLORS).tolist()
+        return [
+            {
+                'coordinates': [{"lat": lat, "lng": lng} for lat, lng in parcel_corners],
+                'color': palette[color],
+            }
+            for parcel_corners, color in zip(corners, colors)
+        ]
+
+    def path_colors(self):
+        return list(self.metadata.get('path_colors', []))
+
+    def path(self, color):
+        """(M, 2) float64 array of the path of `color`, (lat, lon) per point."""
+        return self.array(PATH_PREFIX + color)
+
+    def to_state(self):
+        """State dict with the same keys and values json.load gives for the JSON format."""
+        state = {
+            key: value for key, value in self.metadata.items()
+            if key not in ('parcel_palette', 'path_colors', 'parcel_coordinates')
+        }
+        state['parcel_coordinates'] = self.parcel_coordinates()
+        state['paths_by_color'] = LazyPaths(self)
+        return state
+
+
+class LazyPaths(Mapping):
+    """
+    Read-only colour -> path mapping over an open StateFile that decodes a path on first access.
+
+    Paths come back as lists of [lat, lon] (what json.load gives) and are cached. close() releases
+    the file; paths that were not read by then are no longer available.
+    """
+
+    def __init__(self, state_file):
+        self._state_file = state_file
+        self._colors = state_file.path_colors()
+        self._cache = {}
+
+    def __getitem__(self, color):
+        if color not in self._cache:
+            if color not in self._colors:
+                raise KeyError(color)
+            self._cache[color] = self._state_file.path(color).tolist()
+        return self._cache[color]
+
+    def __iter__(self):
+        return iter(self._colors)
+
+    def __len__(self):
+        return len(self._colors)
+
+    def load_all(self):
+        """Decode every path and return them as a plain dict."""
+        return {color: self[color] for color in self._colors}
+
+    def close(self):
+        self._state_file.close()
+
+
+def load_state(path, lazy_paths=False):
+    """
+    Read a planner state in either format (detected from the file, not the extension).
+
+    JSON files are parsed as before. Binary files are memory-mapped; with `lazy_paths` the
+    'paths_by_color' entry is a LazyPaths that keeps the file open and decodes each path on first
+    access (close it when done), otherwise all paths are decoded and the file is closed before
+    returning.
+    """
+    if not is_binary_state(path):
+        with open(path, 'r') as state_file:
+            return json.load(state_file)
+
+    state_file = StateFile(path)
+    if lazy_paths:
+        return state_file.to_state()
+    with state_file:
+        state = state_file.to_state()
+        state['paths_by_color'] = state['paths_by_color'].load_all()
+    return state
+
+
+def save_state(path, data, compress=False):
+    """
+    Write a planner state; `.ppstate` files get the binary format, anything else the JSON one.
+    """
+    if os.path.splitext(path)[1].lower() == STATE_EXTENSION:
+        write_binary_state(path, data, compress=compress)
+        return
+
+    data = dict(data)
+    paths = data.get('paths_by_color')
+    if isinstance(paths, LazyPaths):
+        data['paths_by_color'] = paths.load_all()
+    with open(path, 'w') as state_file:
+        json.dump(data, state_file, indent=4)
@@ -0,0 +1,97 @@
+import email.utils
+import threading
+from collections import OrderedDict
+
+# Default memory budget for tile bytes (a z20 satellite tile is typically 10-40 KB)
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class CachedTile:
+    """Tile bytes with the response headers precomputed once."""
+    __slots__ = ('data', 'etag', 'last_modified', 'content_length')
+
+    def __init__(self, data, updated_at):
+        self.data = data
+        self.etag = f"\"{updated_at}-{len(data)}\""
+        self.last_modified = email.utils.formatdate(updated_at, usegmt=True)
+        self.content_length = str(len(data))
+
+
+class TileMemoryCache:
+    """
+    Process-wide LRU cache of tiles bounded by the total number of tile bytes.
+
+    Repeated pans and zooms over the current field are answered from here without touching the
+    tile store. Hit, miss and eviction counters are kept for tuning the budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the CachedTile for `key` (e.g. (z, x, y)) and mark it recently used, or None."""
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key, data, updated_at):
+        """Cache tile bytes and return the CachedTile. Tiles larger than the whole budget are not kept."""
+        tile = CachedTile(data, updated_at)
+        size = len(data)
+        if size > self.max_bytes:
+            return tile
+
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous.data)
+            self._tiles[key] = tile
+            self.current_bytes += size
+
+            # Evict least recently used tiles until the budget is met
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self.current_bytes -= len(evicted.data)
+                self.evictions += 1
+        return tile
+
+    def discard(self, key):
+        with self._lock:
+            tile = self._tiles.pop(key, None)
+            if tile is not None:
+                self.current_bytes -= len(tile.data)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._tiles),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / requests) if requests else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
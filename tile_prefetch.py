@@ -0,0 +1,211 @@
+import configparser
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+
+# Same imagery source as the local tile server
+TILE_URL = 'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}'
+
+# Zoom range prefetched for a field (the map allows up to 20)
+DEFAULT_MIN_ZOOM = 14
+DEFAULT_MAX_ZOOM = 20
+
+# Extra margin around the field so panning near the edges stays cached
+DEFAULT_MARGIN_M = 100.0
+
+DEFAULT_MAX_WORKERS = 8
+
+# Web Mercator latitude limit
+MAX_LATITUDE = 85.0511287798
+
+
+def lat_lon_to_tile(lat, lon, zoom):
+    """Slippy-map (XYZ) tile containing a point at the given zoom."""
+    lat = max(min(float(lat), MAX_LATITUDE), -MAX_LATITUDE)
+    n = 2 ** zoom
+    x = int((float(lon) + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def bounds_from_corners(corners, margin_m=DEFAULT_MARGIN_M):
+    """(south, west, north, east) of a set of (lat, lon) corners, grown by `margin_m` meters."""
+    lats = [float(corner[0]) for corner in corners]
+    lons = [float(corner[1]) for corner in corners]
+    south, north = min(lats), max(lats)
+    west, east = min(lons), max(lons)
+
+    # Meters to degrees (the margin does not need to be exact)
+    dlat = margin_m / 111320.0
+    dlon = margin_m / (111320.0 * max(math.cos(math.radians((south + north) / 2.0)), 1e-6))
+    return south - dlat, west - dlon, north + dlat, east + dlon
+
+
+def tiles_for_bounds(bounds, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+    """Yield every (z, x, y) tile covering `bounds` = (south, west, north, east), zoom by zoom."""
+    south, west, north, east = bounds
+    for z in range(int(min_zoom), int(max_zoom) + 1):
+        x_min, y_min = lat_lon_to_tile(north, west, z)
+        x_max, y_max = lat_lon_to_tile(south, east, z)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                yield z, x, y
+
+
+def count_tiles(bounds, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM):
+    """Number of tiles `tiles_for_bounds` will yield, without enumerating them."""
+    south, west, north, east = bounds
+    total = 0
+    for z in range(int(min_zoom), int(max_zoom) + 1):
+        x_min, y_min = lat_lon_to_tile(north, west, z)
+        x_max, y_max = lat_lon_to_tile(south, east, z)
+        total += (x_max - x_min + 1) * (y_max - y_min + 1)
+    return total
+
+
+def corners_from_config(config_file):
+    """Field corners [A, B, C, D] as (lat, lon) from the [Location] section of config.ini, or None."""
+    config = configparser.ConfigParser()
+    if not os.path.exists(config_file):
+        return None
+    config.read(config_file)
+    if 'Location' not in config:
+        return None
+    try:
+        return [
+            (float(config.get("Location", f"{name}-lat")), float(config.get("Location", f"{name}-lon")))
+            for name in ("a", "b", "c", "d")
+        ]
+    except (configparser.Error, ValueError):
+        return None
+
+
+class PrefetchResult:
+    """Counters of a prefetch run."""
+
+    def __init__(self, total):
+        self.total = total
+        self.downloaded = 0
+        self.cached = 0
+        self.failed = 0
+        self.cancelled = False
+
+    @property
+    def done(self):
+        return self.downloaded + self.cached + self.failed
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "downloaded": self.downloaded,
+            "cached": self.cached,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
+
+
+class TilePrefetcher:
+    """
+    Downloads every tile of a bounding box and zoom range into the tile store.
+
+    Work runs on a bounded pool of worker threads; only a small window of requests is in flight
+    at any time, so very large areas do not queue thousands of futures. Tiles already in the
+    store are skipped. Progress is reported through a callback and the run stops early when the
+    cancel event is set.
+    """
+
+    def __init__(self, tile_store, max_workers=DEFAULT_MAX_WORKERS, tile_url=TILE_URL, timeout=(3, 20)):
+        self.tile_store = tile_store
+        self.max_workers = max(1, int(max_workers))
+        self.tile_url = tile_url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def is_cached(self, z, x, y):
+        return self.tile_store.has_tile(z, x, y)
+
+    def prefetch_corners(self, corners, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM,
+                         margin_m=DEFAULT_MARGIN_M, progress=None, cancel_event=None):
+        """Prefetch the tiles covering a field given by its (lat, lon) corners."""
+        bounds = bounds_from_corners(corners, margin_m)
+        return self.prefetch(
+            tiles_for_bounds(bounds, min_zoom, max_zoom),
+            count_tiles(bounds, min_zoom, max_zoom),
+            progress=progress,
+            cancel_event=cancel_event,
+        )
+
+    def prefetch(self, tiles, total, progress=None, cancel_event=None):
+        """
+        Fetch `tiles` (an iterable of (z, x, y)) into the store.
+        `progress(done, total)` is called from the calling thread after every finished tile.
+        """
+        result = PrefetchResult(total)
+        tiles = iter(tiles)
+        in_flight = set()
+        window = 2 * self.max_workers
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tile-prefetch") as executor:
+            while True:
+                cancelled = cancel_event is not None and cancel_event.is_set()
+                if cancelled:
+                    # Let the requests already running finish, but start no new ones
+                    result.cancelled = True
+
+                # Keep the window of pending downloads full; checked per tile, since a mostly cached
+                # field can run through many store lookups without starting a download
+                while not cancelled and len(in_flight) < window:
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = result.cancelled = True
+                        break
+                    tile = next(tiles, None)
+                    if tile is None:
+                        break
+                    if self.is_cached(*tile):
+                        result.cached += 1
+                        if progress is not None:
+                            progress(result.done, total)
+                        continue
+                    in_flight.add(executor.submit(self._download, *tile))
+
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        result.downloaded += 1
+                    else:
+                        result.failed += 1
+                    if progress is not None:
+                        progress(result.done, total)
+
+        return result
+
+    def _session(self):
+        # requests.Session is not safe to share between threads; keep one per worker
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _download(self, z, x, y):
+        """Download one tile; returns True when it was stored."""
+        url = self.tile_url.format(z=z, x=x, y=y)
+        try:
+            response = self._session().get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Error prefetching tile {z}/{x}/{y}: {e}")
+            return False
+        if response.status_code != 200 or not response.content:
+            return False
+
+        try:
+            self.tile_store.put_tile(z, x, y, response.content)
+        except Exception as e:
+            print(f"Error storing tile {z}/{x}/{y}: {e}")
+            return False
+        return True
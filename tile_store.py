@@ -0,0 +1,271 @@
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Flat cache file names written by older versions: map_tiles/{z}_{x}_{y}.png
+LEGACY_TILE_NAME = re.compile(r'^(\d+)_(\d+)_(\d+)\.png$')
+
+# Tiles written per transaction during bulk imports
+IMPORT_BATCH_SIZE = 500
+
+# Idle connections kept open for reuse by the tile server's request threads
+MAX_POOLED_CONNECTIONS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_data BLOB NOT NULL,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+"""
+
+DEFAULT_METADATA = {
+    "name": "Parcel Planner tile cache",
+    "format": "png",
+    "type": "baselayer",
+    "version": "1",
+    "attribution": "Esri World Imagery",
+}
+
+
+def tms_row(z, y):
+    """MBTiles stores rows bottom-up (TMS); Leaflet asks top-down (XYZ). The flip is its own inverse."""
+    return (1 << int(z)) - 1 - int(y)
+
+
+class TileStore:
+    """
+    Single-file SQLite tile store in the MBTiles layout.
+
+    Tiles are looked up through the (zoom, column, row) unique index instead of one file per tile.
+    Connections are pooled and shared by the tile server's request threads, so serving a tile does
+    not open anything. The database runs in WAL mode: readers are never blocked by a writer, and
+    writes are serialized by a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=MAX_POOLED_CONNECTIONS)
+        self._write_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            for name, value in DEFAULT_METADATA.items():
+                conn.execute("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)", (name, value))
+            conn.commit()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def get_tile(self, z, x, y):
+        """Return (tile_bytes, updated_at) for an XYZ tile, or None if it is not stored."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT tile_data, updated_at FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (int(z), int(x), tms_row(z, y)),
+            ).fetchone()
+        if row is None:
+            return None
+        return bytes(row[0]), row[1]
+
+    def has_tile(self, z, x, y):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (int(z), int(x), tms_row(z, y)),
+            ).fetchone()
+        return row is not None
+
+    def put_tile(self, z, x, y, data, updated_at=None):
+        """Store (or replace) one XYZ tile. Returns the timestamp it was stored with."""
+        updated_at = time.time() if updated_at is None else float(updated_at)
+        self.put_tiles([(z, x, y, data, updated_at)])
+        return updated_at
+
+    def put_tiles(self, tiles):
+        """Store many (z, x, y, data[, updated_at]) tiles in batched transactions. Returns the count."""
+        count = 0
+        batch = []
+        for tile in tiles:
+            z, x, y, data = tile[:4]
+            updated_at = tile[4] if len(tile) > 4 and tile[4] is not None else time.time()
+            batch.append((int(z), int(x), tms_row(z, y), sqlite3.Binary(data), float(updated_at)))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                count += self._write_batch(batch)
+                batch = []
+        if batch:
+            count += self._write_batch(batch)
+        return count
+
+    def _write_batch(self, rows):
+        with self._write_lock, self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+        return len(rows)
+
+    def count(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def iter_tiles(self):
+        """Yield (z, x, y, data, updated_at) for every stored tile, in XYZ addressing."""
+        with self._connection() as conn:
+            for z, column, row, data, updated_at in conn.execute(
+                "SELECT zoom_level, tile_column, tile_row, tile_data, updated_at FROM tiles"
+            ):
+                yield z, column, tms_row(z, row), bytes(data), updated_at
+
+    def import_directory(self, directory, remove=False, cancel_event=None):
+        """
+        Import a flat `{z}_{x}_{y}.png` cache directory. Tiles already in the store are kept.
+        With `remove=True` each imported file is deleted afterwards (used for the migration).
+        Returns the number of tiles imported.
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        imported = 0
+        batch = []
+        batch_files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                match = LEGACY_TILE_NAME.match(entry.name)
+                if match is None or not entry.is_file():
+                    continue
+                z, x, y = (int(part) for part in match.groups())
+                try:
+                    with open(entry.path, 'rb') as tile_file:
+                        data = tile_file.read()
+                    mtime = entry.stat().st_mtime
+                except OSError as e:
+                    print(f"Skipping unreadable tile {entry.name}: {e}")
+                    continue
+                if not data:
+                    continue
+                batch.append((int(z), int(x), tms_row(z, y), sqlite3.Binary(data), mtime))
+                batch_files.append(entry.path)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    imported += self._import_batch(batch, batch_files, remove)
+                    batch, batch_files = [], []
+        if batch:
+            imported += self._import_batch(batch, batch_files, remove)
+        return imported
+
+    def _import_batch(self, rows, files, remove):
+        with self._write_lock, self._connection() as conn:
+            # Count only the rows actually inserted; tiles already in the store are ignored
+            changes_before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tiles (zoom_level, tile_column, tile_row, tile_data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            inserted = conn.total_changes - changes_before
+        if remove:
+            for path in files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return inserted
+
+    def export_directory(self, directory):
+        """Write every stored tile as `{z}_{x}_{y}.png` into a directory. Returns the count."""
+        os.makedirs(directory, exist_ok=True)
+        exported = 0
+        for z, x, y, data, updated_at in self.iter_tiles():
+            tile_path = os.path.join(directory, f'{z}_{x}_{y}.png')
+            with open(tile_path, 'wb') as tile_file:
+                tile_file.write(data)
+            os.utime(tile_path, (updated_at, updated_at))
+            exported += 1
+        return exported
+
+    def import_mbtiles(self, path):
+        """
+        Merge another MBTiles file into this store. Tiles already in the store are kept, whatever
+        their age; only missing tiles are copied. Returns the number of tiles copied.
+        """
+        with self._write_lock, self._connection() as conn:
+            conn.execute("ATTACH DATABASE ? AS source", (path,))
+            try:
+                columns = [row[1] for row in conn.execute("PRAGMA source.table_info(tiles)")]
+                updated = "updated_at" if "updated_at" in columns else "0"
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO main.tiles (zoom_level, tile_column, tile_row, tile_data, updated_at) "
+                    f"SELECT zoom_level, tile_column, tile_row, tile_data, {updated} FROM source.tiles"
+                )
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.execute("DETACH DATABASE source")
+
+    def export_mbtiles(self, path):
+        """Write a standalone, compacted copy of the store (e.g. for backups or another machine)."""
+        if os.path.exists(path):
+            os.remove(path)
+        with self._write_lock, self._connection() as conn:
+            conn.execute("VACUUM INTO ?", (path,))
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+if __name__ == "__main__":
+    # Bulk tools: python tile_store.py import|export|merge|backup <store.mbtiles> <path>
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export", "merge", "backup"):
+        print("Usage: python tile_store.py import|export|merge|backup <store.mbtiles> <directory or .mbtiles>")
+        sys.exit(1)
+
+    command, store_path, target = sys.argv[1:]
+    store = TileStore(store_path)
+    if command == "import":
+        print(f"Imported {store.import_directory(target)} tiles from {target}")
+    elif command == "export":
+        print(f"Exported {store.export_directory(target)} tiles to {target}")
+    elif command == "merge":
+        print(f"Merged {store.import_mbtiles(target)} tiles from {target}")
+    else:
+        store.export_mbtiles(target)
+        print(f"Backed up {store.count()} tiles to {target}")
+    store.close()
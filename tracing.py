@@ -0,0 +1,168 @@
+import atexit
+import configparser
+import itertools
+import logging
+import queue
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+# Root level used when config.ini has no [Logging] section
+DEFAULT_LEVEL = logging.INFO
+
+# Per-point calls are logged on the first call and then once every N calls
+DEFAULT_SAMPLE_EVERY = 1000
+
+# Collections longer than this are summarized instead of written out in full
+MAX_ITEMS_SHOWN = 3
+
+_tracers = {}
+
+
+class _Abbrev:
+    """Lazy, size-bounded repr of a field value (coordinate lists can hold thousands of points)."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = self.value
+        if hasattr(value, 'shape') and hasattr(value, 'dtype'):
+            return f"<array shape={value.shape} dtype={value.dtype}>"
+        if isinstance(value, (list, tuple, dict, set)) and len(value) > MAX_ITEMS_SHOWN:
+            items = list(value.items()) if isinstance(value, dict) else list(value)
+            shown = ", ".join(repr(item) for item in items[:MAX_ITEMS_SHOWN])
+            return f"<{type(value).__name__} len={len(value)} [{shown}, ...]>"
+        return repr(value)
+
+
+class _Event:
+    """
+    Structured log message: an event name plus key=value fields.
+    It is only turned into a string when a handler actually emits the record.
+    """
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        if not self.fields:
+            return self.event
+        return self.event + " " + " ".join(f"{key}={_Abbrev(value)}" for key, value in self.fields.items())
+
+
+class Tracer:
+    """
+    Level-gated tracing for one subsystem (a logger name such as "planner.path").
+
+    Nothing is formatted unless the subsystem is enabled for the level, so calls can stay in hot
+    paths. Verbosity is set per subsystem from the [Logging] section of config.ini.
+    """
+
+    def __init__(self, subsystem):
+        self.subsystem = subsystem
+        self.logger = logging.getLogger(subsystem)
+        self._counters = {}
+
+    def enabled(self, level=logging.DEBUG):
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, event, **fields):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s", _Event(event, fields), stacklevel=2)
+
+    def info(self, event, **fields):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("%s", _Event(event, fields), stacklevel=2)
+
+    def warning(self, event, **fields):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning("%s", _Event(event, fields), stacklevel=2)
+
+    def error(self, event, **fields):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error("%s", _Event(event, fields), stacklevel=2)
+
+    def sampled(self, event, every=DEFAULT_SAMPLE_EVERY, level=logging.DEBUG, **fields):
+        """Log a per-point event on its first call and then once every `every` calls."""
+        if not self.logger.isEnabledFor(level):
+            return
+        count = next(self._counters.setdefault(event, itertools.count(1)))
+        if count == 1 or count % every == 0:
+            fields['calls'] = count
+            self.logger.log(level, "%s", _Event(event, fields), stacklevel=2)
+
+    @contextmanager
+    def span(self, event, level=logging.DEBUG, **fields):
+        """Time a block and log its duration when it finishes (only if the level is enabled)."""
+        if not self.logger.isEnabledFor(level):
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            fields['elapsed_ms'] = round((time.perf_counter() - start) * 1000.0, 3)
+            self.logger.log(level, "%s", _Event(event, fields), stacklevel=3)
+
+
+def get_tracer(subsystem):
+    """Return the shared Tracer for a subsystem."""
+    tracer = _tracers.get(subsystem)
+    if tracer is None:
+        tracer = _tracers[subsystem] = Tracer(subsystem)
+    return tracer
+
+
+def configure_levels(config_file, root_logger=None):
+    """
+    Apply verbosity from the [Logging] section of config.ini:
+
+        [Logging]
+        level = INFO            ; root level
+        planner.path = WARNING  ; per-subsystem levels
+
+    Returns the root level that was applied.
+    """
+    root_logger = root_logger or logging.getLogger()
+    config = configparser.ConfigParser()
+    config.read(config_file)
+
+    levels = dict(config['Logging']) if 'Logging' in config else {}
+    root_level = _parse_level(levels.pop('level', None), DEFAULT_LEVEL)
+    root_logger.setLevel(root_level)
+
+    for subsystem, value in levels.items():
+        level = _parse_level(value, None)
+        if level is None:
+            root_logger.warning("Ignoring unknown log level %r for %s", value, subsystem)
+            continue
+        logging.getLogger(subsystem).setLevel(level)
+    return root_level
+
+
+def start_queue_logging(handler, root_logger=None):
+    """
+    Route records through a queue so file I/O happens on a background listener thread
+    instead of in the caller (e.g. the GUI thread while a path is generated).
+    """
+    root_logger = root_logger or logging.getLogger()
+    record_queue = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(record_queue))
+    listener = QueueListener(record_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def _parse_level(value, default):
+    if value is None:
+        return default
+    value = value.strip().upper()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else default
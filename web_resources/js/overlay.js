@@ -0,0 +1,309 @@
+// Keyed overlay registry for the planner map.
+//
+// Python (map_overlay.py) sends compact JSON diffs:
+//   { upsert: {key: layerData}, remove: [key], show: [key], hide: [key] }
+// Every key owns one L.layerGroup, e.g. "parcels:#ff0000" or "route:#ff0000".
+// Coordinates arrive as flat [lat, lng, lat, lng, ...] arrays.
+//
+// Layers with renderer 'canvas' are drawn on one shared L.canvas instead of one SVG/DOM element per
+// feature: each colour's parcels become a single multi-polygon and all pass endpoints of a route are
+// one PassPoints layer that draws in a single canvas path and hit-tests through a pixel grid.
+(function () {
+    'use strict';
+
+    if (window.ParcelOverlay) {
+        return;
+    }
+
+    var registry = {};
+    var canvasRenderer = null;
+
+    // Grid cell size (px) used to bucket pass points for hit-testing
+    var HIT_CELL = 16;
+
+    function sharedCanvas() {
+        if (!canvasRenderer) {
+            canvasRenderer = L.canvas({ padding: 0.5, tolerance: 3 });
+        }
+        return canvasRenderer;
+    }
+
+    function pairs(flat) {
+        var points = new Array(flat.length / 2);
+        for (var i = 0, j = 0; i < flat.length; i += 2, j++) {
+            points[j] = [flat[i], flat[i + 1]];
+        }
+        return points;
+    }
+
+    function labelMarker(latlng, text, color, title) {
+        return L.marker(latlng, {
+            title: title,
+            icon: L.divIcon({
+                className: 'custom-' + (text === 'S' ? 'start' : 'end') + '-marker',
+                html: '<div style="background-color:' + color + '; border-radius:50%; width:20px; height:20px; line-height:20px; text-align:center; color:white;">' + text + '</div>',
+                iconSize: [20, 20]
+            })
+        });
+    }
+
+    // Every pass endpoint of a route as one canvas layer: flat [lat, lng, ...], even index = start
+    var PassPoints = L.Path.extend({
+        options: {
+            radius: 2.5,
+            stroke: false,
+            fill: true,
+            fillColor: '#000000',
+            fillOpacity: 1.0
+        },
+
+        initialize: function (flat, options) {
+            L.setOptions(this, options);
+            this._latlngs = pairs(flat);
+            this._points = [];
+            this._grid = {};
+            this.hitIndex = -1;
+        },
+
+        label: function (index) {
+            var n = Math.floor(index / 2) + 1;
+            return (index % 2 === 0 ? 'Parcel Start Point ' : 'Parcel End Point ') + n;
+        },
+
+        _project: function () {
+            var map = this._map;
+            var r = this.options.radius;
+            var grid = {};
+            var minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+            this._points = new Array(this._latlngs.length);
+            for (var i = 0; i < this._latlngs.length; i++) {
+                var p = map.latLngToLayerPoint(this._latlngs[i]);
+                this._points[i] = p;
+                if (p.x < minX) { minX = p.x; }
+                if (p.y < minY) { minY = p.y; }
+                if (p.x > maxX) { maxX = p.x; }
+                if (p.y > maxY) { maxY = p.y; }
+                var cell = Math.floor(p.x / HIT_CELL) + ':' + Math.floor(p.y / HIT_CELL);
+                (grid[cell] = grid[cell] || []).push(i);
+            }
+            this._grid = grid;
+            if (this._points.length) {
+                this._pxBounds = L.bounds([minX - r, minY - r], [maxX + r, maxY + r]);
+            }
+        },
+
+        _update: function () {
+            if (this._map) {
+                this._updatePath();
+            }
+        },
+
+        _updatePath: function () {
+            var renderer = this._renderer;
+            if (!renderer._drawing || this._empty()) {
+                return;
+            }
+            var ctx = renderer._ctx;
+            var bounds = renderer._redrawBounds;
+            var r = Math.max(Math.round(this.options.radius), 1);
+            ctx.beginPath();
+            for (var i = 0; i < this._points.length; i++) {
+                var p = this._points[i];
+                if (bounds && !bounds.contains(p)) {
+                    continue;
+                }
+                ctx.moveTo(p.x + r, p.y);
+                ctx.arc(p.x, p.y, r, 0, 2 * Math.PI, false);
+            }
+            renderer._fillStroke(ctx, this);
+        },
+
+        _empty: function () {
+            return !this._points.length;
+        },
+
+        // Called by the canvas renderer on mouse move/click; remembers the nearest point under the cursor
+        _containsPoint: function (p) {
+            var reach = this.options.radius + this._clickTolerance();
+            var cx = Math.floor(p.x / HIT_CELL), cy = Math.floor(p.y / HIT_CELL);
+            var span = Math.ceil(reach / HIT_CELL);
+            var best = -1, bestDist = reach * reach;
+            for (var gx = cx - span; gx <= cx + span; gx++) {
+                for (var gy = cy - span; gy <= cy + span; gy++) {
+                    var bucket = this._grid[gx + ':' + gy];
+                    if (!bucket) {
+                        continue;
+                    }
+                    for (var k = 0; k < bucket.length; k++) {
+                        var q = this._points[bucket[k]];
+                        var d = (q.x - p.x) * (q.x - p.x) + (q.y - p.y) * (q.y - p.y);
+                        if (d <= bestDist) {
+                            best = bucket[k];
+                            bestDist = d;
+                        }
+                    }
+                }
+            }
+            this.hitIndex = best;
+            return best >= 0;
+        }
+    });
+
+    function passPointsLayer(flat) {
+        var layer = new PassPoints(flat, { renderer: sharedCanvas() });
+        var shown = -1;
+        layer.bindTooltip(function (source) {
+            shown = source.hitIndex;
+            return source.label(Math.max(shown, 0));
+        }, { sticky: true });
+        // Moving from one point to a neighbouring one stays inside the layer; refresh the text
+        layer.on('mousemove', function () {
+            if (layer.hitIndex >= 0 && layer.hitIndex !== shown) {
+                shown = layer.hitIndex;
+                layer.setTooltipContent(layer.label(shown));
+            }
+        });
+        return layer;
+    }
+
+    var builders = {
+        // { type: 'parcels', color, polygons: [[8 numbers per parcel], ...] }
+        parcels: function (data, group) {
+            if (data.renderer === 'canvas') {
+                // One multi-polygon per colour, drawn as a single canvas path
+                var rings = new Array(data.polygons.length);
+                for (var r = 0; r < data.polygons.length; r++) {
+                    rings[r] = [pairs(data.polygons[r])];
+                }
+                L.polygon(rings, {
+                    renderer: sharedCanvas(),
+                    color: data.color,
+                    weight: 1,
+                    fillOpacity: 0.30,
+                    interactive: false
+                }).addTo(group);
+                return;
+            }
+            for (var i = 0; i < data.polygons.length; i++) {
+                L.polygon(pairs(data.polygons[i]), {
+                    color: data.color,
+                    weight: 1,
+                    fillOpacity: 0.30
+                }).addTo(group);
+            }
+        },
+
+        // { type: 'route', color, path: [flat], passes: [s_lat, s_lng, e_lat, e_lng, ...] }
+        route: function (data, group) {
+            var path = pairs(data.path);
+            if (path.length === 0) {
+                return;
+            }
+            var canvas = data.renderer === 'canvas';
+            var lineOptions = {
+                color: '#FF0000',
+                weight: 2,
+                opacity: 1.0,
+                smoothFactor: 1
+            };
+            if (canvas) {
+                lineOptions.renderer = sharedCanvas();
+                lineOptions.interactive = false;
+            }
+            L.polyline(path, lineOptions).addTo(group);
+
+            var passes = data.passes;
+            if (canvas) {
+                passPointsLayer(passes).addTo(group);
+                passes = [];
+            }
+            for (var i = 0, n = 1; i < passes.length; i += 4, n++) {
+                L.circleMarker([passes[i], passes[i + 1]], {
+                    radius: 2.5, stroke: false, fillColor: '#000000', fillOpacity: 1.0
+                }).bindTooltip('Parcel Start Point ' + n).addTo(group);
+                L.circleMarker([passes[i + 2], passes[i + 3]], {
+                    radius: 2.5, stroke: false, fillColor: '#000000', fillOpacity: 1.0
+                }).bindTooltip('Parcel End Point ' + n).addTo(group);
+            }
+
+            labelMarker(path[0], 'S', '#FF0000', 'Start Point').addTo(group);
+            labelMarker(path[path.length - 1], 'F', '#0000FF', 'End Point').addTo(group);
+        }
+    };
+
+    function removeLayer(key) {
+        var entry = registry[key];
+        if (entry) {
+            entry.group.remove();
+            delete registry[key];
+        }
+    }
+
+    function upsertLayer(key, data) {
+        // Upserted layers are always (re)created visible; hide/show in the same diff apply afterwards
+        removeLayer(key);
+
+        var group = L.layerGroup();
+        var build = builders[data.type];
+        if (build) {
+            build(data, group);
+        }
+        registry[key] = { group: group, visible: true };
+        group.addTo(window.mapObject);
+    }
+
+    function setVisible(key, visible) {
+        var entry = registry[key];
+        if (!entry || entry.visible === visible) {
+            return;
+        }
+        entry.visible = visible;
+        if (visible) {
+            entry.group.addTo(window.mapObject);
+        } else {
+            entry.group.remove();
+        }
+    }
+
+    window.ParcelOverlay = {
+        builders: builders,
+
+        apply: function (diff) {
+            if (!window.mapObject) {
+                (window._pendingOverlayDiffs = window._pendingOverlayDiffs || []).push(diff);
+                return;
+            }
+            var i;
+            var remove = diff.remove || [];
+            for (i = 0; i < remove.length; i++) {
+                removeLayer(remove[i]);
+            }
+            var upsert = diff.upsert || {};
+            for (var key in upsert) {
+                if (Object.prototype.hasOwnProperty.call(upsert, key)) {
+                    upsertLayer(key, upsert[key]);
+                }
+            }
+            var hide = diff.hide || [];
+            for (i = 0; i < hide.length; i++) {
+                setVisible(hide[i], false);
+            }
+            var show = diff.show || [];
+            for (i = 0; i < show.length; i++) {
+                setVisible(show[i], true);
+            }
+        },
+
+        flushPending: function () {
+            var pending = window._pendingOverlayDiffs || [];
+            window._pendingOverlayDiffs = [];
+            for (var i = 0; i < pending.length; i++) {
+                this.apply(pending[i]);
+            }
+        },
+
+        keys: function () {
+            return Object.keys(registry);
+        }
+    };
+})();